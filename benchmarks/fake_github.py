@@ -0,0 +1,323 @@
+"""
+Local stand-in for api.github.com used by the benchmarks.
+
+Serves a synthetic repository whose commit history is computed from the
+commit index instead of stored, so histories of 1M commits cost no memory:
+commit k (0 = newest) is dated `end - k * step`, written by author
+k % authors and has sha '%040x' % k.
+
+Endpoints: /repos/<o>/<r>, /languages, /contributors, /commits (since,
+until, author, path, per_page, page), /commits/<sha>, /orgs/<org>/repos.
+Responses carry Link (next/last), ETag (answered with 304 on If-None-Match)
+and X-RateLimit-* headers; `latency` adds a fixed delay per request.
+
+POST /graphql answers the operations src/graphql_backend.py sends (RepoMeta,
+History, HistoryCount, UserId), told apart by operation name and answered
+from the variables; it is not a GraphQL implementation.
+
+    python -m benchmarks.fake_github --commits 100000 --port 8765 --latency 0.02
+    GITHUB_API_URL=http://127.0.0.1:8765 python -m src.app o/r --since 2020-01-01
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DIRS = ("src", "docs", "tests", "tools", "ci")
+LANGUAGES = {"Python": 5_000_000, "C": 800_000, "Cython": 300_000, "Shell": 20_000}
+
+
+def _parse(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class FakeGitHub:
+    """The synthetic dataset plus request counters; shared by all handler threads."""
+
+    def __init__(
+        self,
+        commits: int = 10_000,
+        authors: int = 50,
+        step: timedelta = timedelta(minutes=30),
+        end: datetime = END,
+        latency: float = 0.0,
+        rate_limit: int = 1_000_000,
+        org_repos: Sequence[str] = ("o/r",),
+    ):
+        self.commits = commits
+        self.authors = authors
+        self.step = step
+        self.end = end
+        self.latency = latency
+        # generous by default: the client paces itself to the advertised budget
+        self.rate_limit = rate_limit
+        self.org_repos = list(org_repos)
+        self.reset_at = int(time.time()) + 3600
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    # ----- dataset -----
+    def author(self, k: int):
+        a = k % self.authors
+        return f"Dev {a}", f"dev{a}@example.com", f"dev{a}"
+
+    def files(self, k: int) -> List[str]:
+        return [f"{DIRS[k % len(DIRS)]}/m{k % 13}/f{k % 7}.py", f"{DIRS[(k + 1) % len(DIRS)]}/README.md"]
+
+    def date(self, k: int) -> str:
+        return (self.end - k * self.step).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def commit(self, k: int, repo: str, files: bool = False) -> Dict:
+        name, email, login = self.author(k)
+        sha = "%040x" % k
+        person = {"name": name, "email": email, "date": self.date(k)}
+        out = {
+            "sha": sha,
+            "html_url": f"https://github.com/{repo}/commit/{sha}",
+            "commit": {
+                "message": f"{('fix', 'feat', 'docs', 'refactor')[k % 4]}: change {k}\n\nDetails for change {k}.",
+                "author": person,
+                "committer": person,
+            },
+            "author": {"login": login},
+            "committer": {"login": login},
+        }
+        if files:
+            out["files"] = [{"filename": f} for f in self.files(k)]
+        return out
+
+    def graphql_commit(self, k: int, repo: str) -> Dict:
+        name, email, login = self.author(k)
+        person = {"name": name, "email": email, "user": {"login": login}}
+        rest = self.commit(k, repo)
+        return {
+            "oid": rest["sha"], "url": rest["html_url"], "message": rest["commit"]["message"],
+            "authoredDate": self.date(k), "committedDate": self.date(k),
+            "additions": (k * 7) % 200, "deletions": (k * 3) % 50, "changedFilesIfAvailable": len(self.files(k)),
+            "author": person, "committer": person,
+        }
+
+    def graphql_repo(self, repo: str) -> Dict:
+        owner, name = repo.split("/", 1)
+        return {
+            "nameWithOwner": repo, "name": name, "owner": {"login": owner}, "description": None,
+            "url": f"https://github.com/{repo}", "homepageUrl": None, "stargazerCount": 1234, "forkCount": 56,
+            "isFork": False, "isArchived": False, "createdAt": "2015-01-01T00:00:00Z",
+            "updatedAt": self.date(0), "pushedAt": self.date(0), "primaryLanguage": {"name": "Python"},
+            "defaultBranchRef": {"name": "main"},
+            "languages": {"edges": [{"size": n, "node": {"name": lang}} for lang, n in LANGUAGES.items()]},
+        }
+
+    def graphql(self, query: str, v: Dict) -> Dict:
+        op = re.match(r"\s*query\s+(\w+)", query)
+        op = op.group(1) if op else ""
+        if op == "RepoMeta":
+            return {f"r{i}": self.graphql_repo(f"{v[f'o{i}']}/{v[f'n{i}']}") for i in range(len(v) // 2)}
+        if op == "UserId":
+            m = re.fullmatch(r"dev(\d+)", v["login"])
+            return {"user": {"id": f"U_{v['login']}"} if m and int(m.group(1)) < self.authors else None}
+        q = {k: [v[k]] for k in ("since", "until", "path") if v.get(k)}
+        who = v.get("author") or {}
+        if who.get("emails"):
+            q["author"] = who["emails"][:1]
+        elif who.get("id"):
+            q["author"] = [who["id"][len("U_"):]]
+        ks = self.select(q)
+        repo = f"{v['owner']}/{v['name']}"
+        if op == "HistoryCount":
+            history: Dict = {"totalCount": len(ks)}
+        elif op == "History":
+            start = int(v.get("after") or 0)
+            end = start + min(100, int(v["first"]))
+            history = {
+                "totalCount": len(ks),
+                "pageInfo": {"hasNextPage": end < len(ks), "endCursor": str(end)},
+                "nodes": [self.graphql_commit(k, repo) for k in ks[start:end]],
+            }
+        else:
+            raise ValueError(f"unsupported GraphQL operation: {op or query[:40]!r}")
+        return {"repository": {"defaultBranchRef": {"target": {"history": history}}}}
+
+    def window(self, q: Dict[str, List[str]]) -> range:
+        """Indices of the commits inside since/until, newest first."""
+        lo, hi = 0, self.commits - 1
+        step = self.step.total_seconds()
+        if "until" in q:
+            ahead = (self.end - _parse(q["until"][0])).total_seconds()
+            lo = max(lo, -int(-ahead // step))  # ceil
+        if "since" in q:
+            back = (self.end - _parse(q["since"][0])).total_seconds()
+            hi = min(hi, int(back // step))
+        return range(lo, hi + 1)
+
+    def select(self, q: Dict[str, List[str]]) -> Sequence[int]:
+        ks: Sequence[int] = self.window(q)
+        if "author" in q:
+            who = q["author"][0]
+            a = next((i for i in range(self.authors) if who in (f"dev{i}", f"dev{i}@example.com")), None)
+            if a is None:
+                return []
+            first = ks.start + (a - ks.start) % self.authors
+            ks = range(first, ks.stop, self.authors)
+        if "path" in q:
+            p = q["path"][0].rstrip("/")
+            ks = [k for k in ks if any(f == p or f.startswith(p + "/") for f in self.files(k))]
+        return ks
+
+    # ----- bookkeeping -----
+    def count(self, sent: int, not_modified: bool) -> int:
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.not_modified += not_modified
+            if time.time() >= self.reset_at:
+                self.reset_at = int(time.time()) + 3600
+            return self.requests
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "not_modified": self.not_modified, "bytes_sent": self.bytes_sent}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    gh: FakeGitHub
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def send_json(self, obj, links: Optional[Dict[str, str]] = None, resource: str = "core") -> None:
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        tag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == tag:
+            self.gh.count(0, True)
+            self.send_response(304)
+            self.send_header("ETag", tag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        used = self.gh.count(len(body), False)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", tag)
+        self.send_header("X-RateLimit-Limit", str(self.gh.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(max(0, self.gh.rate_limit - used)))
+        self.send_header("X-RateLimit-Used", str(used))
+        self.send_header("X-RateLimit-Reset", str(self.gh.reset_at))
+        self.send_header("X-RateLimit-Resource", resource)
+        if links:
+            self.send_header("Link", ", ".join(f'<{u}>; rel="{r}"' for r, u in links.items()))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_page(self, items: Sequence, q: Dict[str, List[str]], path: str, render=lambda x: x) -> None:
+        per = min(100, int(q.get("per_page", ["30"])[0]))
+        page = int(q.get("page", ["1"])[0])
+        last = max(1, -(-len(items) // per))
+        base = f"http://{self.headers['Host']}{path}"
+
+        def link(p: int) -> str:
+            qq = {k: v[0] for k, v in q.items()}
+            qq["page"] = str(p)
+            return f"{base}?{urlencode(qq)}"
+
+        links = {}
+        if page < last:
+            links.update(next=link(page + 1), last=link(last))
+        if page > 1:
+            links.update(prev=link(page - 1), first=link(1))
+        self.send_json([render(x) for x in items[(page - 1) * per: page * per]], links)
+
+    def do_GET(self) -> None:
+        if self.gh.latency:
+            time.sleep(self.gh.latency)
+        u = urlsplit(self.path)
+        q = parse_qs(u.query)
+        parts = u.path.strip("/").split("/")
+        if parts[:1] == ["orgs"] and parts[2:3] == ["repos"]:
+            return self.send_page([{"full_name": r} for r in self.gh.org_repos], q, u.path)
+        if parts[:1] != ["repos"] or len(parts) < 3:
+            return self.not_found()
+        repo = f"{parts[1]}/{parts[2]}"
+        if len(parts) == 3:
+            return self.send_json({"full_name": repo, "stargazers_count": 1234, "forks_count": 56})
+        if parts[3] == "languages":
+            return self.send_json(LANGUAGES)
+        if parts[3] == "contributors":
+            counts = [self.gh.commits // self.gh.authors + (a < self.gh.commits % self.gh.authors)
+                      for a in range(self.gh.authors)]
+            people = [{"login": f"dev{a}", "contributions": n} for a, n in enumerate(counts) if n]
+            people.sort(key=lambda p: -p["contributions"])
+            return self.send_page(people, q, u.path)
+        if parts[3] == "commits" and len(parts) == 5:
+            try:
+                k = int(parts[4], 16)
+            except ValueError:
+                return self.not_found()
+            if k >= self.gh.commits:
+                return self.not_found()
+            return self.send_json(self.gh.commit(k, repo, files=True))
+        if parts[3] == "commits":
+            return self.send_page(self.gh.select(q), q, u.path, render=lambda k: self.gh.commit(k, repo))
+        self.not_found()
+
+    def do_POST(self) -> None:
+        if self.gh.latency:
+            time.sleep(self.gh.latency)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlsplit(self.path).path != "/graphql":
+            return self.not_found()
+        try:
+            req = json.loads(body)
+            data = self.gh.graphql(req["query"], req.get("variables") or {})
+        except (ValueError, KeyError) as e:
+            return self.send_json({"data": None, "errors": [{"message": str(e)}]}, resource="graphql")
+        self.send_json({"data": data}, resource="graphql")
+
+    def not_found(self) -> None:
+        body = b'{"message":"Not Found"}'
+        self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(gh: FakeGitHub, port: int = 0):
+    """Start the server on a daemon thread; returns (server, base_url)."""
+    handler = type("BoundHandler", (Handler,), {"gh": gh})
+    srv = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Fake GitHub REST API for benchmarks")
+    p.add_argument("--commits", type=int, default=10_000)
+    p.add_argument("--authors", type=int, default=50)
+    p.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    p.add_argument("--port", type=int, default=8765)
+    args = p.parse_args()
+    srv, base = serve(FakeGitHub(commits=args.commits, authors=args.authors, latency=args.latency), args.port)
+    print(f"fake GitHub API on {base} ({args.commits} commits); GITHUB_API_URL={base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Benchmark runner: drives the analyzer against benchmarks/fake_github.py and
+writes one JSON result file per run, comparable across versions.
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --label v0.3
+    python -m benchmarks.run --compare benchmarks/results/v0.2.json
+
+Each history size runs in its own child process (so peak RSS is per size)
+in a scratch directory, and measures:
+
+- paged_*: pages/s walking the full history through GitHubClient.iter_pages,
+  cold (every page from the server) and warm (every page from the cache)
+- rows_*: rows/s of RepoAnalyzer.commits_to_rows, CommitFilter.apply_rows
+  and write_csv (on at most ROWS_SAMPLE commits)
+- e2e_*: AppController.run_with_args over the whole history, cold and warm,
+  then cold again with --backend graphql; *_requests counts what the server saw
+- charts_s: rendering the three charts in-process
+- peak_rss_mb: peak resident set size of the child
+
+With --compare, metrics that got worse by more than --threshold are listed
+and the exit status is 1.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+ROWS_SAMPLE = 200_000
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def measure(size: int, latency: float, workers: int) -> Dict[str, float]:
+    """One history size, in the current process (meant to be a fresh child)."""
+    from benchmarks.fake_github import FakeGitHub, serve
+
+    gh = FakeGitHub(commits=size, latency=latency)
+    srv, base = serve(gh)
+    os.environ["GITHUB_API_URL"] = base
+    for var in ("GITHUB_TOKEN", "GITHUB_TOKENS"):
+        # never send real credentials to the stand-in (set, so load_dotenv won't fill them in)
+        os.environ[var] = ""
+
+    from src import reports
+    from src.analyzer import RepoAnalyzer
+    from src.cache import ResponseCache
+    from src.controller import AppController
+    from src.filters import CommitFilter
+    from src.github_client import GitHubClient
+    from src.models import COMMIT_FIELDS
+    from src.util import EXPORTS_DIR, HTTP_CACHE_DIR, write_csv
+
+    oldest = gh.end - size * gh.step
+    since, until = oldest.isoformat(), gh.end.isoformat()
+    params = {"since": since, "until": until, "per_page": "100"}
+    m: Dict[str, float] = {"commits": size}
+
+    # end to end, cold then warm (responses cached, commits already stored)
+    args = SimpleNamespace(repo="o/r", since=since, until=until, msg="fix", author=None, path=None,
+                           charts=False, gui=False)
+    for phase, backend in (("cold", "rest"), ("warm", "rest"), ("graphql", "graphql")):
+        before = gh.stats()["requests"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            controller = AppController(workers=workers)
+            result, secs = _timed(lambda: controller.run_with_args(SimpleNamespace(**vars(args), backend=backend)))
+            controller.close()
+        if not result or not result.get("ok"):
+            raise RuntimeError(f"run_with_args failed: {result}")
+        m[f"e2e_{phase}_s"] = secs
+        m[f"e2e_{phase}_commits_per_s"] = size / secs
+        m[f"e2e_{phase}_requests"] = gh.stats()["requests"] - before
+
+    # pagination alone, on a fresh cache
+    for phase in ("cold", "warm"):
+        client = GitHubClient(cache=ResponseCache(root=HTTP_CACHE_DIR.parent / "bench"), max_workers=workers)
+        pages, secs = _timed(lambda: sum(1 for _ in client.iter_pages("/repos/o/r/commits", params)))
+        m[f"paged_{phase}_pages_per_s"] = pages / secs
+    m["pages"] = pages
+
+    # row pipeline on a sample held in memory
+    sample = []
+    for page in client.iter_pages("/repos/o/r/commits", params):
+        sample.extend(page)
+        if len(sample) >= ROWS_SAMPLE:
+            break
+    n = len(sample)
+    analyzer = RepoAnalyzer(client, "o", "r")
+    rows, secs = _timed(lambda: analyzer.commits_to_rows(sample))
+    m["rows_flatten_per_s"] = n / secs
+    cf = CommitFilter(message_regex="fix|feat", author_regex="dev1")
+    _, secs = _timed(lambda: cf.apply_rows(rows))
+    m["rows_filter_per_s"] = n / secs
+    _, secs = _timed(lambda: write_csv(EXPORTS_DIR / "bench.csv", rows, COMMIT_FIELDS))
+    m["rows_csv_per_s"] = n / secs
+    del sample, rows
+
+    # charts, in-process so the number doesn't depend on the core count
+    controller = AppController()
+    counts = controller.store.rollup("o/r", "day", oldest, gh.end)
+    languages = {"Python": 5_000_000, "C": 800_000}
+    contributors = controller.store.rollup_authors("o/r", oldest, gh.end)
+    with reports.ChartPool(workers=1) as pool:
+        _, m["charts_s"] = _timed(lambda: pool.render_all([
+            ("commits_over_time", dict(out_path=EXPORTS_DIR / "bench_a.png", counts=counts)),
+            ("top_contributors", dict(contribs=contributors, out_path=EXPORTS_DIR / "bench_b.png")),
+            ("language_share", dict(languages=languages, out_path=EXPORTS_DIR / "bench_c.png")),
+        ]))
+    controller.close()
+
+    srv.shutdown()
+    m.update({f"server_{k}": v for k, v in gh.stats().items()})
+    m["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return m
+
+
+def run_child(size: int, latency: float, workers: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", str(size),
+             "--latency", str(latency), "--workers", str(workers), "--workdir", tmp],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"size {size} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_label() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+
+def lower_is_better(metric: str) -> bool:
+    # seconds, megabytes and request counts; rates ('..._per_s') are higher-is-better
+    return (metric.endswith("_s") and not metric.endswith("_per_s")) or metric.endswith(("_mb", "_requests"))
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> List[str]:
+    """Metrics that got worse by more than `threshold` (relative), as printable lines."""
+    regressions = []
+    for size, metrics in new["results"].items():
+        old = base["results"].get(size)
+        if not old:
+            continue
+        for metric, value in metrics.items():
+            was = old.get(metric)
+            if not was or metric.startswith("server_") or metric in ("commits", "pages"):
+                continue
+            change = (value - was) / was
+            worse = change > threshold if lower_is_better(metric) else change < -threshold
+            flag = "  REGRESSION" if worse else ""
+            print(f"{size:>9} {metric:<30} {was:>14.3f} {value:>14.3f} {change:+8.1%}{flag}")
+            if worse:
+                regressions.append(f"{size} {metric}: {was:.3f} -> {value:.3f} ({change:+.1%})")
+    return regressions
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark the analyzer against a local fake GitHub API")
+    p.add_argument("--sizes", default="1000,10000,100000", help="comma-separated commit history sizes")
+    p.add_argument("--latency", type=float, default=0.0, help="per-request server latency, seconds")
+    p.add_argument("--workers", type=int, default=4, help="client --workers")
+    p.add_argument("--label", help="result name (default: git describe)")
+    p.add_argument("--out", help="result file (default: benchmarks/results/<label>.json)")
+    p.add_argument("--compare", help="earlier result file to compare against")
+    p.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    p.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    p.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child is not None:
+        os.chdir(args.workdir)
+        print(json.dumps(measure(args.child, args.latency, args.workers)))
+        return
+
+    label = args.label or git_label()
+    result = {
+        "label": label,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "latency": args.latency,
+        "workers": args.workers,
+        "results": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"⏱️  {size} commits ...", flush=True)
+        result["results"][str(size)] = metrics = run_child(size, args.latency, args.workers)
+        print(f"   e2e {metrics['e2e_cold_s']:.2f}s cold / {metrics['e2e_warm_s']:.2f}s warm, "
+              f"{metrics['paged_cold_pages_per_s']:.0f} pages/s, peak RSS {metrics['peak_rss_mb']:.0f} MB")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{label}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"✅ Results → {out}")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\nvs {base['label']}:")
+        regressions = compare(base, result, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,91 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from src.github_client import GitHubClient
+from src.models import CommitRow
+from src.store import CommitStore
+from src.util import STATE_DIR, as_utc, load_json, parse_iso, save_json
+
+
+def _commit_date(c: Dict) -> Optional[datetime]:
+    # GitHub's since/until filter on the committer date, so sync on it too
+    return parse_iso(((c.get("commit") or {}).get("committer") or {}).get("date") or "")
+
+
+SHARD_STEPS = {"daily": timedelta(days=1), "weekly": timedelta(days=7)}
+
+
+def merge_commits(batches: Iterable[List[Dict]]) -> List[Dict]:
+    """
+    Merge commit lists from overlapping windows: dedupe by sha, newest first,
+    ties broken by sha so the order is stable across runs.
+    """
+    by_sha: Dict[str, Dict] = {}
+    for batch in batches:
+        for c in batch:
+            by_sha[c["sha"]] = c
+    floor = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(by_sha.values(), key=lambda c: (_commit_date(c) or floor, c["sha"]), reverse=True)
 
 
 class RepoAnalyzer:
-    def __init__(self, client: GitHubClient, owner: str, repo: str):
-        # ensure client knows owner/repo for cache paths
-        client.owner, client.repo = owner, repo
+    def __init__(
+        self,
+        client: GitHubClient,
+        owner: str,
+        repo: str,
+        store: Optional[CommitStore] = None,
+    ):
+        # the client is repo-agnostic (every request carries its path), so one can serve many analyzers
         self.client = client
         self.owner = owner
         self.repo = repo
+        self.store = store  # when set, everything fetched is also written to the local store
+        self._files: Optional[Dict[str, List[str]]] = None  # sha -> changed files, loaded lazily
+        self._files_lock = threading.Lock()
 
     # ----- fetchers -----
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.repo}"
+
     def fetch_repo(self) -> Dict:
-        return self.client.get(f"/repos/{self.owner}/{self.repo}")
+        info = self.client.get(f"/repos/{self.owner}/{self.repo}")
+        if self.store:
+            self.store.save_repo(self.full_name, info)
+        return info
 
     def fetch_languages(self) -> Dict[str, int]:
-        return self.client.get(f"/repos/{self.owner}/{self.repo}/languages")
+        languages = self.client.get(f"/repos/{self.owner}/{self.repo}/languages")
+        if self.store:
+            self.store.save_languages(self.full_name, languages)
+        return languages
 
     def fetch_contributors(self) -> List[Dict]:
         # per_page not supported here; GitHub uses default=30; paged() follows Link headers
-        return self.client.paged(f"/repos/{self.owner}/{self.repo}/contributors")
+        contributors = self.client.paged(f"/repos/{self.owner}/{self.repo}/contributors")
+        if self.store:
+            self.store.save_contributors(self.full_name, contributors)
+        return contributors
 
-    def fetch_commits(
+    def iter_commit_pages(
         self,
         since: Optional[str] = None,
         until: Optional[str] = None,
         author: Optional[str] = None,
         path: Optional[str] = None,
-    ) -> List[Dict]:
+        prefetch: bool = True,
+    ) -> Iterator[List[Dict]]:
+        """
+        Stream raw commit JSON one page (list) at a time; nothing is fetched
+        until iterated. `prefetch=False` walks the pages one by one (see
+        GitHubClient.iter_pages).
+        """
         params: Dict[str, str] = {}
         if since:
             params["since"] = since  # ISO 8601
@@ -41,35 +97,248 @@ class RepoAnalyzer:
             params["path"] = path
         # improvement: request larger pages to reduce total API calls
         params["per_page"] = "100"
-        return self.client.paged(f"/repos/{self.owner}/{self.repo}/commits", params=params)
+        return self.client.iter_pages(f"/repos/{self.owner}/{self.repo}/commits", params=params, prefetch=prefetch)
+
+    def iter_commits(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        author: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Stream raw commit JSON commit by commit; nothing is fetched until iterated.
+        """
+        for page in self.iter_commit_pages(since=since, until=until, author=author, path=path):
+            yield from page
+
+    def fetch_commits(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        author: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> List[Dict]:
+        return list(self.iter_commits(since=since, until=until, author=author, path=path))
+
+    # ----- sharded fetch -----
+    def _commit_count(self, since: datetime, until: datetime) -> int:
+        return self.client.count(
+            f"/repos/{self.owner}/{self.repo}/commits",
+            params={"since": since.isoformat(), "until": until.isoformat()},
+        )
+
+    def shard_windows(
+        self,
+        since: datetime,
+        until: datetime,
+        shard: str = "weekly",
+        target: int = 1000,
+        min_span: timedelta = timedelta(hours=1),
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Split [since, until] into sub-windows. "daily"/"weekly" use fixed steps;
+        "adaptive" bisects any window holding more than `target` commits (probed
+        with a one-item request), so busy periods get narrow shards and quiet
+        ones stay wide.
+        """
+        since, until = as_utc(since), as_utc(until)
+        if shard in SHARD_STEPS:
+            step = SHARD_STEPS[shard]
+            windows = []
+            lo = since
+            while lo < until:
+                hi = min(lo + step, until)
+                windows.append((lo, hi))
+                lo = hi
+            return windows or [(since, until)]
+        if shard != "adaptive":
+            raise ValueError(f"Unknown shard mode: {shard}")
+
+        windows = []
+        pending = [(since, until)]
+        while pending:
+            lo, hi = pending.pop()
+            if hi - lo > min_span and self._commit_count(lo, hi) > target:
+                mid = lo + (hi - lo) / 2
+                pending.extend([(mid, hi), (lo, mid)])
+            else:
+                windows.append((lo, hi))
+        return sorted(windows)
+
+    def fetch_commits_sharded(
+        self,
+        since: datetime,
+        until: Optional[datetime],
+        shard: str = "weekly",
+        workers: Optional[int] = None,
+        author: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Sub-windows fetched in parallel, merged and deduplicated by sha (window
+        edges are inclusive on both ends, so boundary commits can show up
+        twice). An open `until` (None) leaves the last shard open too. Each
+        shard walks its pages without prefetch, so at most `workers` requests
+        are in flight.
+        """
+        windows = self.shard_windows(since, until or datetime.now(timezone.utc), shard)
+        last = len(windows) - 1
+        workers = workers or self.client.max_workers
+
+        def fetch(i: int) -> List[Dict]:
+            lo, hi = windows[i]
+            pages = self.iter_commit_pages(
+                since=lo.isoformat(),
+                until=None if until is None and i == last else hi.isoformat(),
+                author=author,
+                path=path,
+                prefetch=False,
+            )
+            return [c for page in pages for c in page]
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return merge_commits(pool.map(fetch, range(len(windows))))
+
+    def fetch_window(
+        self,
+        since: datetime,
+        until: Optional[datetime],
+        shard: Optional[str] = None,
+        author: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Commits in [since, until]; `until` None leaves the window open ("up to
+        now") without sending a timestamp, so the request URL, its cache key
+        and its resume checkpoint stay the same from one run to the next.
+        """
+        if shard:
+            return self.fetch_commits_sharded(since, until, shard, author=author, path=path)
+        return self.fetch_commits(
+            since=since.isoformat(), until=until.isoformat() if until else None, author=author, path=path
+        )
+
+    # ----- incremental sync -----
+    def sync_commits(
+        self,
+        since: datetime,
+        until: Optional[datetime],
+        overlap: timedelta = timedelta(hours=24),
+        shard: Optional[str] = None,
+    ) -> List[CommitRow]:
+        """
+        Incremental variant of fetch_commits, backed by the local store (which
+        must be set). Keeps every commit row seen (deduplicated by sha) plus a
+        high-water mark: the newest committer date/sha seen. Only commits newer
+        than the mark (minus `overlap`, for late pushes of older commits) are
+        requested, and anything before the earliest window synced so far is
+        backfilled once. The synced range is kept as one interval: a window
+        beyond it also fetches the gap, so nothing counts as synced unfetched.
+        `until` None is an open window: up to now, requested without an
+        `until` (see fetch_window).
+        Returns the merged rows inside [since, until] (committer date), newest first.
+        """
+        if self.store is None:
+            raise RuntimeError("Incremental sync needs a CommitStore")
+        open_end = until is None
+        since, until = as_utc(since), datetime.now(timezone.utc) if open_end else as_utc(until)
+        state = self.store.sync_state(self.full_name)
+
+        synced_since = parse_iso(state.get("since") or "")
+        hwm = parse_iso(state.get("hwm_date") or "")
+        synced_until = parse_iso(state.get("until") or "")
+
+        windows = []
+        if synced_since is None or synced_until is None:
+            windows.append((since, until))
+        else:
+            if since < synced_since:
+                windows.append((since, synced_since))
+            # from the mark even when `since` is later: the synced range stays one interval,
+            # so a window that starts past it also fetches the gap in between
+            forward_from = min(hwm or synced_until, synced_until) - overlap
+            if until > forward_from:
+                windows.append((forward_from, until))
+
+        for lo, hi in windows:
+            hi = None if open_end and hi == until else hi
+            self.store.add_commits(self.full_name, self.iter_rows(self.fetch_window(lo, hi, shard)))
+
+        newest = self.store.newest_commit(self.full_name)
+        self.store.save_sync_state(
+            self.full_name,
+            since=min(since, synced_since or since),
+            until=max(until, synced_until or until),
+            hwm_date=newest["committed_at"] if newest else None,
+            hwm_sha=newest["sha"] if newest else None,
+        )
+        return self.store.query_commits(self.full_name, since, until, by="committed_at")
+
+    # ----- commit details -----
+    def _files_path(self) -> Path:
+        return STATE_DIR / f"{self.owner}_{self.repo}_files.json"
+
+    def fetch_commit_files(self, sha: str) -> List[str]:
+        """
+        Files changed by one commit. Commit contents are immutable, so the list
+        is kept per sha forever and each commit is only downloaded once.
+        Only the file names are persisted, not the (large) detail body.
+        """
+        with self._files_lock:
+            if self._files is None:
+                self._files = load_json(self._files_path()) or {}
+            known = self._files.get(sha)
+        if known is not None:
+            return known
+        detail = self.client.get(f"/repos/{self.owner}/{self.repo}/commits/{sha}", use_cache=False)
+        files = [f.get("filename") for f in detail.get("files") or [] if f.get("filename")]
+        with self._files_lock:
+            self._files[sha] = files
+        return files
+
+    def save_commit_files(self) -> None:
+        with self._files_lock:
+            if self._files is not None:
+                save_json(self._files_path(), self._files)
+
+    def iter_with_files(
+        self,
+        rows: Iterable[CommitRow],
+        want: Optional[Callable[[CommitRow], bool]] = None,
+        workers: Optional[int] = None,
+        chunk: int = 100,
+    ) -> Iterator[CommitRow]:
+        """
+        Fill in `files` on every row accepted by `want` (default: all), fetching
+        commit details on a bounded worker pool one chunk at a time. Rows keep
+        their order; rows not wanted pass through untouched.
+        """
+        rows = iter(rows)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers or self.client.max_workers)) as pool:
+                while True:
+                    batch = list(islice(rows, chunk))
+                    if not batch:
+                        break
+                    todo = [i for i, r in enumerate(batch) if want is None or want(r)]
+                    found = pool.map(lambda i: self.fetch_commit_files(batch[i].sha), todo)
+                    for i, files in zip(todo, found):
+                        batch[i] = batch[i]._replace(files=tuple(files))
+                    yield from batch
+        finally:
+            self.save_commit_files()
 
     # ----- transforms -----
-    def commits_to_rows(self, commits: List[Dict]) -> List[Dict]:
+    def iter_rows(self, commits: Iterable[Dict]) -> Iterator[CommitRow]:
         """
-        Flatten commit JSON into a simple row dict for CSV/DF.
+        Flatten commit JSON into compact CommitRow records for CSV/DF, lazily.
         """
-        rows: List[Dict] = []
         for c in commits:
-            sha = c.get("sha")
-            commit = c.get("commit", {})
-            author = c.get("author") or {}
-            committer = c.get("committer") or {}
-            commit_author = commit.get("author") or {}
-            commit_committer = commit.get("committer") or {}
-            message = (commit.get("message") or "").splitlines()[0][:500]
-
-            rows.append(
-                {
-                    "sha": sha,
-                    "date": commit_author.get("date"),
-                    "author_name": commit_author.get("name"),
-                    "author_email": commit_author.get("email"),
-                    "author_login": author.get("login"),
-                    "committer_name": commit_committer.get("name"),
-                    "committer_email": commit_committer.get("email"),
-                    "committer_login": committer.get("login"),
-                    "message": message,
-                    "url": c.get("html_url"),
-                }
-            )
-        return rows
+            yield CommitRow.from_api(c)
+
+    def commits_to_rows(self, commits: Iterable[Dict]) -> List[CommitRow]:
+        """
+        Flatten commit JSON into a simple row record for CSV/DF.
+        """
+        return list(self.iter_rows(commits))
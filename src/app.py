@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import argparse
+import sys
+from pathlib import Path
+from typing import List
 from src.controller import AppController
 
 def parse_args() -> argparse.Namespace:
@@ -11,8 +14,38 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--until", help="ISO date/time")
     p.add_argument("--msg", help="regex for commit message")
     p.add_argument("--author", help="regex for author name/email/login")
-    p.add_argument("--path", help="regex for file path (becomes active once commit-file fetch is added)")
+    p.add_argument("--path",
+                   help="case-sensitive regex for changed file paths ('^dir/' or '^file$' is sent to the API as-is)")
     p.add_argument("--charts", action="store_true", help="render charts (PNG) into data/exports/")
+    p.add_argument("--parquet", action="store_true",
+                   help="also export commits as a Parquet dataset (typed, compressed; appended per --incremental sync)")
+    p.add_argument("--incremental", action="store_true",
+                   help="only fetch commits newer than the last sync; export from the merged local set")
+    p.add_argument("--local", action="store_true",
+                   help="answer from the local store (data/store.sqlite3) only, no API calls")
+    p.add_argument("--shard", choices=("daily", "weekly", "adaptive"),
+                   help="split the commit window into sub-windows fetched in parallel")
+    p.add_argument("--engine", choices=("rows", "pandas"), default="rows",
+                   help="commit processing: per-row streaming (default) or vectorized pandas frames")
+    p.add_argument("--backend", choices=("rest", "graphql"), default="rest",
+                   help="API for repo metadata and commit history: REST (default) or GraphQL (fewer requests, "
+                        "adds additions/deletions/changed_files; needs a token)")
+    p.add_argument("--mailmap", metavar="PATH",
+                   help="git .mailmap merging contributor emails/names (default: data/mailmap if present)")
+    p.add_argument("--offline", action="store_true",
+                   help="serve API responses only from data/cache/ (no network)")
+    p.add_argument("--workers", type=int, default=4,
+                   help="max concurrent page requests per paginated fetch (default: 4)")
+    p.add_argument("--repos-file", help="batch: analyze every owner/repo listed in this file (one per line, # comments)")
+    p.add_argument("--org", help="batch: analyze every repository of this organization")
+    p.add_argument("--batch-workers", type=int, default=4,
+                   help="batch: repos analyzed concurrently (default: 4)")
+    p.add_argument("--profile", nargs="?", const="data/exports/profile.json", metavar="PATH",
+                   help="write a JSON run report (requests, latency, cache, retries, rate limit, stage times)")
+    p.add_argument("--search", metavar="REGEX",
+                   help="search commit messages of every synced repo (or --repos-file/--org) in the local store")
+    p.add_argument("--serve", nargs="?", const="127.0.0.1:8000", metavar="HOST:PORT",
+                   help="run as a local HTTP/JSON analysis service (see src/server.py)")
     p.add_argument("--gui", action="store_true", help="launch minimal Tkinter GUI")
     return p.parse_args()
 
@@ -22,8 +55,64 @@ def main():
         from src.ui.widgets import launch_gui
         launch_gui()
         return
+    if args.serve:
+        serve(args)
+        return
     print("🔍 GitHub Repository Analyzer starting...")
-    AppController().run_with_args(args)
+    batch = bool(args.repos_file or args.org)
+    controller = AppController(
+        offline=args.offline, workers=args.workers, batch_workers=args.batch_workers if batch else 1,
+        mailmap=args.mailmap,
+    )
+    try:
+        if not batch and not args.search:
+            controller.run_with_args(args)
+            return
+        repos = read_repos_file(args.repos_file) if args.repos_file else []
+        if args.org:
+            repos += controller.org_repos(args.org)
+        repos = list(dict.fromkeys(repos))  # dedupe, keep order
+        if args.search:
+            controller.search(args, repos)
+            return
+        results = controller.run_batch(args, repos, workers=args.batch_workers)
+        if not all(r["ok"] for r in results):
+            sys.exit(1)
+    finally:
+        controller.close()
+        if args.profile:
+            report = controller.metrics.snapshot()
+            path = controller.metrics.write_json(Path(args.profile))
+            req = report["requests"]
+            print(f"📊 {req['count']} requests (p50 {req['latency_ms']['p50']} ms, p99 {req['latency_ms']['p99']} ms), "
+                  f"cache hit ratio {report['cache']['hit_ratio']}, rate-limit wait {report['rate_limit']['wait_s']}s "
+                  f"→ {path}")
+
+def serve(args: argparse.Namespace) -> None:
+    from src import server
+    host, port = server.parse_address(args.serve)
+    # --batch-workers sizes the connection pool for that many concurrent requests
+    controller = AppController(
+        offline=args.offline, workers=args.workers, batch_workers=args.batch_workers, mailmap=args.mailmap
+    )
+    srv = server.make_server(server.AnalysisService(controller), host, port)
+    print(f"🛰  Serving on http://{host}:{srv.server_address[1]} (Ctrl+C to stop)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        controller.close()
+
+def read_repos_file(path: str) -> List[str]:
+    repos = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                repos.append(line)
+    return repos
 
 if __name__ == "__main__":
     main()
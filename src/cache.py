@@ -0,0 +1,490 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.util import HTTP_CACHE_DIR, parse_iso
+
+
+# (endpoint regex, ttl seconds). First match wins; None means "never expires".
+DEFAULT_TTLS: List[Tuple[str, Optional[float]]] = [
+    (r"^/repos/[^/]+/[^/]+/commits/[0-9a-f]{7,40}$", None),  # commit contents are immutable
+    (r"^/repos/[^/]+/[^/]+$", 6 * 3600),
+    (r"^/repos/[^/]+/[^/]+/languages$", 6 * 3600),
+    (r"^/repos/[^/]+/[^/]+/contributors$", 3600),
+    (r"^/repos/[^/]+/[^/]+/commits$", 600),  # open windows; closed ones are handled in ttl_for()
+]
+DEFAULT_TTL: Optional[float] = 600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Segment record: sha1 of the canonical URL (raw), payload length, then the
+# zlib-compressed compact JSON entry.
+_HEADER = struct.Struct(">20sI")
+COMPACT_MIN_BYTES = 1024 * 1024  # segments smaller than this are never compacted
+COMPACT_DEAD_RATIO = 0.5  # ... and bigger ones once half their bytes are superseded records
+EXPIRY_SLACK = 1024  # superseded .exp lines tolerated before the file is rewritten
+
+
+def endpoint_of(url: str) -> str:
+    """
+    The endpoint a request belongs to, i.e. its segment: the path cut after
+    '/repos/<owner>/<repo>/<resource>', so all pages of a listing (and all
+    '/commits/<sha>' details) of a repo share one segment.
+    """
+    return "/".join(urlsplit(url).path.split("/")[:5])
+
+
+def canonical_url(url: str, params: Optional[Dict] = None) -> str:
+    """
+    Merge `params` into the query string of `url` and sort the keys, so the
+    same request always maps to the same cache key no matter how it was built.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((k, str(v)) for k, v in params.items() if v is not None)
+    query.sort()
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def _read_lines(path: Path, start: int) -> Tuple[List[str], int]:
+    """Complete lines appended to `path` since byte `start` (a torn last line is left for later)."""
+    try:
+        with path.open("rb") as f:
+            f.seek(start)
+            tail = f.read()
+    except OSError:
+        tail = b""
+    complete = tail[: tail.rfind(b"\n") + 1]
+    return complete.decode("ascii", "replace").splitlines(), start + len(complete)
+
+
+class _Segment:
+    """
+    One endpoint's append-only record file (`<name>.seg`) and its offset index
+    (`<name>.idx`, one 'key offset length' line per put; the last line for a
+    key wins). Records carry their key, so a lost or torn index is rebuilt by
+    scanning the record headers.
+
+    Revalidated entries get a new expiry without rewriting their record: it is
+    appended to `<name>.exp` as 'key offset expires_at' and only applies while
+    the key's record is still the one at that offset.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.idx_path = path.with_suffix(".idx")
+        self.exp_path = path.with_suffix(".exp")
+        self.index: Dict[str, Tuple[int, int]] = {}  # key -> (payload offset, payload length)
+        self.expiry: Dict[str, Tuple[int, Optional[float]]] = {}  # key -> (payload offset, expires_at)
+        self.size = 0  # bytes in the .seg file
+        self.live = 0  # bytes of records the index still points at
+        self.touched = 0.0
+        self._idx_read = 0  # how much of the .idx file has been applied
+        self._exp_read = 0  # ... and of the .exp file
+        self._exp_lines = 0
+        self.refresh()
+
+    def _set(self, key: str, offset: int, length: int) -> None:
+        old = self.index.get(key)
+        if old is not None:
+            self.live -= _HEADER.size + old[1]
+        self.index[key] = (offset, length)
+        self.live += _HEADER.size + length
+
+    def refresh(self) -> None:
+        """Apply index lines appended since the last look (e.g. by another process)."""
+        try:
+            self.size = self.path.stat().st_size
+        except OSError:
+            self.size = 0
+        lines, self._idx_read = _read_lines(self.idx_path, self._idx_read)
+        for line in lines:
+            try:
+                key, offset, length = line.split()
+                self._set(key, int(offset), int(length))
+            except ValueError:
+                continue
+        lines, self._exp_read = _read_lines(self.exp_path, self._exp_read)
+        self._exp_lines += len(lines)
+        for line in lines:
+            try:
+                key, offset, expires = line.split()
+                self.expiry[key] = (int(offset), None if expires == "-" else float(expires))
+            except ValueError:
+                continue
+        end = max((offset + length for offset, length in self.index.values()), default=0)
+        if end != self.size:
+            self.rebuild()  # records the index doesn't cover, or an index pointing past the end
+
+    def rebuild(self) -> None:
+        """Recreate the index from the record headers (drops a torn final record)."""
+        self.index, self.live = {}, 0
+        lines = []
+        if not self.path.exists():
+            self.size = self._idx_read = 0
+            self.idx_path.unlink(missing_ok=True)
+            return
+        with self.path.open("rb") as f:
+            offset = 0
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                digest, length = _HEADER.unpack(header)
+                if offset + _HEADER.size + length > self.size:
+                    break
+                key = digest.hex()
+                self._set(key, offset + _HEADER.size, length)
+                lines.append(f"{key} {offset + _HEADER.size} {length}\n")
+                offset += _HEADER.size + length
+                f.seek(offset)
+        self.size = offset
+        os.truncate(self.path, offset)
+        data = "".join(lines).encode("ascii")
+        self.idx_path.write_bytes(data)
+        self._idx_read = len(data)
+
+    def read(self, key: str) -> Optional[bytes]:
+        loc = self.index.get(key)
+        if loc is None:
+            return None
+        offset, length = loc
+        with self.path.open("rb") as f:
+            f.seek(offset - _HEADER.size)
+            raw = f.read(_HEADER.size + length)
+        if len(raw) < _HEADER.size + length or _HEADER.unpack(raw[: _HEADER.size]) != (bytes.fromhex(key), length):
+            return None
+        return raw[_HEADER.size:]
+
+    def append(self, key: str, payload: bytes) -> int:
+        """Append one record; returns the bytes added to disk."""
+        with self.path.open("ab") as f:
+            start = f.tell()
+            f.write(_HEADER.pack(bytes.fromhex(key), len(payload)) + payload)
+        line = f"{key} {start + _HEADER.size} {len(payload)}\n".encode("ascii")
+        with self.idx_path.open("ab") as f:
+            f.write(line)
+        self._idx_read += len(line)
+        self.size = start + _HEADER.size + len(payload)
+        self._set(key, start + _HEADER.size, len(payload))
+        return _HEADER.size + len(payload) + len(line)
+
+    def override(self, key: str) -> Optional[Tuple[int, Optional[float]]]:
+        """The latest revalidated expiry of the key's current record, if any."""
+        found = self.expiry.get(key)
+        loc = self.index.get(key)
+        if found is None or loc is None or found[0] != loc[0]:
+            return None
+        return found
+
+    def set_expiry(self, key: str, expires_at: Optional[float]) -> int:
+        """Give the key's current record a new expiry; returns the bytes added to disk."""
+        offset = self.index[key][0]
+        self.expiry[key] = (offset, expires_at)
+        if self._exp_lines > 2 * len(self.expiry) + EXPIRY_SLACK:
+            before = self.exp_path.stat().st_size if self.exp_path.exists() else 0
+            self._write_expiry()
+            return self._exp_read - before
+        line = f"{key} {offset} {'-' if expires_at is None else repr(expires_at)}\n".encode("ascii")
+        with self.exp_path.open("ab") as f:
+            f.write(line)
+        self._exp_read += len(line)
+        self._exp_lines += 1
+        return len(line)
+
+    def _write_expiry(self) -> None:
+        """Rewrite the .exp file with only the overrides that still apply."""
+        self.expiry = {k: v for k, v in self.expiry.items() if k in self.index and self.index[k][0] == v[0]}
+        data = "".join(
+            f"{k} {offset} {'-' if exp is None else repr(exp)}\n" for k, (offset, exp) in self.expiry.items()
+        ).encode("ascii")
+        tmp = self.path.with_suffix(f".exp.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.exp_path)
+        self._exp_read, self._exp_lines = len(data), len(self.expiry)
+
+    def disk_size(self) -> int:
+        return sum(p.stat().st_size for p in (self.path, self.idx_path, self.exp_path) if p.exists())
+
+    def needs_compaction(self) -> bool:
+        return self.size >= COMPACT_MIN_BYTES and self.live < self.size * (1 - COMPACT_DEAD_RATIO)
+
+    def compact(self) -> None:
+        """Rewrite only the live records (raw, no re-compression) and a fresh index."""
+        tmp_seg = self.path.with_suffix(f".seg.{threading.get_ident()}.tmp")
+        tmp_idx = self.path.with_suffix(f".idx.{threading.get_ident()}.tmp")
+        index: Dict[str, Tuple[int, int]] = {}
+        moved: Dict[int, int] = {}  # old payload offset -> new one, for the expiry overrides
+        lines = []
+        with self.path.open("rb") as src, tmp_seg.open("wb") as dst:
+            for key, (offset, length) in sorted(self.index.items(), key=lambda kv: kv[1][0]):
+                src.seek(offset - _HEADER.size)
+                dst.write(src.read(_HEADER.size + length))
+                index[key] = (dst.tell() - length, length)
+                moved[offset] = dst.tell() - length
+                lines.append(f"{key} {dst.tell() - length} {length}\n")
+        data = "".join(lines).encode("ascii")
+        tmp_idx.write_bytes(data)
+        os.replace(tmp_seg, self.path)
+        os.replace(tmp_idx, self.idx_path)
+        self.expiry = {
+            k: (moved[offset], exp) for k, (offset, exp) in self.expiry.items()
+            if k in self.index and self.index[k][0] == offset
+        }
+        self.index = index
+        self.size = self.live = sum(_HEADER.size + length for _, length in index.values())
+        self._idx_read = len(data)
+        if self.expiry or self.exp_path.exists():
+            self._write_expiry()
+
+
+class ResponseCache:
+    """
+    Read-through cache for GitHub API responses.
+
+    Entries are keyed on the canonical URL (path + sorted query params) and
+    carry the ETag / Last-Modified validators used to revalidate them once
+    stale. Every entry records when it expires.
+
+    Storage is one append-only segment per endpoint (see `endpoint_of`) of
+    zlib-compressed compact JSON records, with a small offset index so a
+    single page is read with one seek and one decompress. Rewritten entries
+    leave dead records behind until the segment is compacted. Segment mtimes
+    are the LRU clock for eviction once the total size goes over `max_bytes`.
+    Writes assume one writing process per cache directory.
+    """
+
+    def __init__(
+        self,
+        root: Path = HTTP_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[List[Tuple[str, Optional[float]]]] = None,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(p), ttl) for p, ttl in (ttls or DEFAULT_TTLS)]
+        self._lock = threading.Lock()
+        self._segments: Dict[str, _Segment] = {}
+        self._total: Optional[int] = None  # running size estimate, filled lazily
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ----- keys & policy -----
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        return hashlib.sha1(canonical_url(url, params).encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url: str, params: Optional[Dict] = None) -> Optional[float]:
+        parts = urlsplit(canonical_url(url, params))
+        query = dict(parse_qsl(parts.query))
+        path = parts.path
+        # GraphQL history queries are keyed with their `until` too (GitHubClient.graphql)
+        if (path.endswith("/commits") or path.endswith("/graphql")) and query.get("until"):
+            until = parse_iso(query["until"])
+            # a window that closed in the past can no longer gain commits
+            if until and until < datetime.now(timezone.utc):
+                return None
+        for pattern, ttl in self.ttls:
+            if pattern.match(path):
+                return ttl
+        return DEFAULT_TTL
+
+    def _segment(self, url: str) -> _Segment:
+        # caller holds the lock
+        name = hashlib.sha1(endpoint_of(url).encode("utf-8")).hexdigest()[:16]
+        seg = self._segments.get(name)
+        if seg is None:
+            seg = self._segments[name] = _Segment(self.root / f"{name}.seg")
+        return seg
+
+    def _legacy_path(self, key: str) -> Path:
+        # one-JSON-file-per-entry layout of older versions; migrated on first read
+        return self.root / key[:2] / f"{key}.json"
+
+    # ----- read / write -----
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored entry (fresh or stale) or None. Callers decide whether
+        a stale entry is usable via `is_fresh`.
+        """
+        key = self.key(url, params)
+        with self._lock:
+            seg = self._segment(url)
+            if key not in seg.index:
+                seg.refresh()
+            try:
+                payload = seg.read(key)
+            except OSError:
+                payload = None
+            override = seg.override(key)
+            now = time.time()
+            if payload is not None and now - seg.touched > 60:
+                seg.touched = now
+                try:
+                    os.utime(seg.path)  # LRU touch
+                except OSError:
+                    pass
+        if payload is None:
+            return self._migrate(url, params, key)
+        try:
+            entry = json.loads(zlib.decompress(payload))
+        except (zlib.error, ValueError):
+            return None
+        if override is not None:
+            entry["expires_at"] = override[1]
+        return entry
+
+    def _migrate(self, url: str, params: Optional[Dict], key: str) -> Optional[Dict[str, Any]]:
+        path = self._legacy_path(key)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._store(url, key, entry)
+        path.unlink(missing_ok=True)
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        expires = entry.get("expires_at")
+        return expires is None or time.time() < expires
+
+    def put(
+        self,
+        url: str,
+        params: Optional[Dict],
+        body: Any,
+        links: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        ttl = self.ttl_for(url, params)
+        now = time.time()
+        entry = {
+            "url": canonical_url(url, params),
+            "stored_at": now,
+            "expires_at": None if ttl is None else now + ttl,
+            "etag": etag,
+            "last_modified": last_modified,
+            "links": links or {},
+            "body": body,
+        }
+        self._store(url, self.key(url, params), entry)
+        return entry
+
+    def _store(self, url: str, key: str, entry: Dict[str, Any]) -> None:
+        payload = zlib.compress(json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            if self._total is None:
+                self._total = self.size()
+            seg = self._segment(url)
+            self._total += seg.append(key, payload)
+            seg.touched = time.time()
+            if seg.needs_compaction():
+                before = seg.disk_size()
+                seg.compact()
+                self._total += seg.disk_size() - before
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def revalidated(self, url: str, params: Optional[Dict], entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The server answered 304 for a stale entry: keep the body and validators,
+        restart its TTL. Only the new expiry is written (see `_Segment`); the
+        record itself is left where it is.
+        """
+        ttl = self.ttl_for(url, params)
+        expires = None if ttl is None else time.time() + ttl
+        key = self.key(url, params)
+        with self._lock:
+            if self._total is None:
+                self._total = self.size()
+            seg = self._segment(url)
+            if key in seg.index:
+                self._total += seg.set_expiry(key, expires)
+                seg.touched = time.time()
+                return {**entry, "expires_at": expires}
+        # not stored in a segment (e.g. evicted meanwhile): write it out in full
+        return self.put(
+            url, params, entry["body"], entry.get("links"),
+            etag=entry.get("etag"), last_modified=entry.get("last_modified"),
+        )
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if not entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # ----- maintenance -----
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.iterdir() if p.suffix in (".seg", ".idx", ".exp"))
+
+    def compact(self) -> int:
+        """Compact every segment with superseded records; returns bytes reclaimed."""
+        reclaimed = 0
+        with self._lock:
+            for p in self.root.glob("*.seg"):
+                seg = self._segments.setdefault(p.stem, _Segment(p))
+                if seg.live < seg.size:
+                    before = seg.disk_size()
+                    seg.compact()
+                    reclaimed += before - seg.disk_size()
+            if self._total is not None:
+                self._total -= reclaimed
+        return reclaimed
+
+    def evict(self) -> int:
+        """
+        Drop least-recently-used segments until the cache fits in `max_bytes`,
+        leaving ~10% headroom so the next few puts don't trigger another scan.
+        Returns the number of segments removed.
+        """
+        with self._lock:
+            segs = []
+            total = 0
+            for p in self.root.glob("*.seg"):
+                try:
+                    st = p.stat()
+                    size = st.st_size + sum(
+                        q.stat().st_size for q in (p.with_suffix(".idx"), p.with_suffix(".exp")) if q.exists()
+                    )
+                except OSError:
+                    continue
+                segs.append((st.st_mtime, size, p))
+                total += size
+            self._total = total
+            if total <= self.max_bytes:
+                return 0
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for _, size, p in sorted(segs):
+                if total <= target:
+                    break
+                self._segments.pop(p.stem, None)
+                try:
+                    p.unlink()
+                    p.with_suffix(".idx").unlink(missing_ok=True)
+                    p.with_suffix(".exp").unlink(missing_ok=True)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._total = total
+            return removed
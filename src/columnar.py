@@ -0,0 +1,171 @@
+from __future__ import annotations
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from src.filters import CommitFilter
+from src.models import COMMIT_FIELDS, PEOPLE_COLUMNS, STAT_FIELDS, STORED_FIELDS, CommitRow
+
+# CommitRow field -> dotted path in the REST /commits JSON (as flattened by json_normalize)
+API_COLUMNS: Dict[str, str] = {
+    "sha": "sha",
+    "date": "commit.author.date",
+    "committed_at": "commit.committer.date",
+    "author_name": "commit.author.name",
+    "author_email": "commit.author.email",
+    "author_login": "author.login",
+    "committer_name": "commit.committer.name",
+    "committer_email": "commit.committer.email",
+    "committer_login": "committer.login",
+    "message": "commit.message",
+    "url": "html_url",
+    "additions": "stats.additions",  # stats: only in GraphQL-backed pages (see graphql_backend.commit_to_rest)
+    "deletions": "stats.deletions",
+    "changed_files": "changed_files",
+}
+FRAME_COLUMNS: Tuple[str, ...] = tuple(API_COLUMNS)
+CSV_EOL = "\r\n"  # the csv module's line ending, used by the row engine: both engines write the same bytes
+
+
+def _pd():
+    # optional engine: pandas is only imported when --engine pandas is used
+    try:
+        import pandas as pd  # type: ignore
+    except ImportError as e:
+        raise RuntimeError("The pandas engine needs pandas: pip install -r requirements.txt") from e
+    return pd
+
+
+def commits_frame(commits: List[Dict]):
+    """
+    Commit table for one batch of raw /commits JSON (typically one page),
+    built in bulk by json_normalize instead of a per-commit loop. Columns are
+    the CommitRow fields; people columns are categoricals.
+    """
+    pd = _pd()
+    if not commits:
+        return empty_frame()
+    flat = pd.json_normalize(commits)
+    df = pd.DataFrame({
+        name: flat[path] if path in flat.columns else pd.Series([None] * len(flat), dtype=object)
+        for name, path in API_COLUMNS.items()
+    })
+    df["message"] = df["message"].fillna("").str.split("\n", n=1).str[0].str.slice(0, 500)
+    return _compact(df)
+
+
+def rows_frame(rows: Iterable[CommitRow]):
+    """Commit table from already-flattened rows (store, incremental sync)."""
+    pd = _pd()
+    df = pd.DataFrame.from_records(
+        [tuple(r.get(c) for c in FRAME_COLUMNS) for r in rows], columns=list(FRAME_COLUMNS)
+    )
+    return _compact(df)
+
+
+def empty_frame():
+    pd = _pd()
+    return pd.DataFrame({c: pd.Series([], dtype=object) for c in FRAME_COLUMNS})
+
+
+def _compact(df):
+    pd = _pd()
+    for c in PEOPLE_COLUMNS:
+        df[c] = df[c].astype("category")
+    for c in STAT_FIELDS:
+        # nullable ints: no float upcast from missing values, so CSVs print '12' like the row engine
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
+    return df
+
+
+def filter_mask(df, cf: CommitFilter):
+    """
+    CommitFilter's message/author regexes as vectorized string ops over whole
+    columns; same semantics as CommitFilter.matches_without_path.
+    """
+    pd = _pd()
+    mask = pd.Series(True, index=df.index)
+    if cf.message_re is not None:
+        mask &= df["message"].astype(str).str.contains(
+            cf.message_re.pattern, flags=cf.message_re.flags, regex=True, na=False
+        )
+    if cf.author_re is not None:
+        pat, flags = cf.author_re.pattern, cf.author_re.flags
+        fields = [df[c].astype(object).fillna("").astype(str) for c in ("author_name", "author_email", "author_login")]
+        blob = fields[0] + " " + fields[1] + " " + fields[2]
+        author = blob.str.contains(pat, flags=flags, regex=True)
+        for f in fields:
+            author |= f.str.contains(pat, flags=flags, regex=True)
+        mask &= author
+    return mask
+
+
+def daily_counts(df) -> Dict[datetime, int]:
+    """Commits per (author) day, the columnar replacement for DailyCounter."""
+    pd = _pd()
+    dates = pd.to_datetime(df["date"], utc=True, errors="coerce").dropna()
+    if dates.empty:
+        return {}
+    counts = dates.dt.tz_localize(None).dt.floor("D").value_counts()
+    return {ts.to_pydatetime(): int(n) for ts, n in counts.items()}
+
+
+def store_frame(store, repo: str, df) -> int:
+    """Bulk-insert a commit frame into a CommitStore (dates normalized column-wise)."""
+    pd = _pd()
+    out = pd.DataFrame({c: df[c].astype(object) for c in STORED_FIELDS})
+    for c in ("date", "committed_at"):
+        ts = pd.to_datetime(out[c], utc=True, errors="coerce")
+        out[c] = ts.dt.strftime("%Y-%m-%dT%H:%M:%SZ").astype(object).where(ts.notna(), None)
+    out = out.astype(object).where(out.notna(), None)
+    out.insert(0, "repo", repo)
+    store.insert_values(out.itertuples(index=False, name=None))
+    return len(out)
+
+
+def export_frames(
+    frames: Iterable[Any],
+    cf: CommitFilter,
+    full_path: Path,
+    filtered_path: Path,
+    fields: Tuple[str, ...] = COMMIT_FIELDS,
+    on_frame=None,
+) -> Tuple[int, int, Dict[datetime, int]]:
+    """
+    Columnar counterpart of the row fan-out: each frame (e.g. one page) is
+    filtered with one vectorized mask and appended to both CSVs, daily counts
+    are accumulated per frame. `on_frame(df)` lets callers add sinks (store).
+    Returns (rows, filtered rows, daily counts).
+    """
+    n_full = n_filt = 0
+    daily: Dict[datetime, int] = {}
+    parts = []
+    for path in (full_path, filtered_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        parts.append(path.with_name(path.name + ".part"))
+    ok = False
+    try:
+        header = True
+        for df in frames:
+            mask = filter_mask(df, cf)
+            mode = "w" if header else "a"
+            df.loc[:, list(fields)].to_csv(parts[0], mode=mode, header=header, index=False, lineterminator=CSV_EOL)
+            df.loc[mask, list(fields)].to_csv(parts[1], mode=mode, header=header, index=False, lineterminator=CSV_EOL)
+            header = False
+            n_full += len(df)
+            n_filt += int(mask.sum())
+            for day, n in daily_counts(df).items():
+                daily[day] = daily.get(day, 0) + n
+            if on_frame is not None:
+                on_frame(df)
+        if header:  # no frames at all: still write header-only files
+            for part in parts:
+                empty_frame().loc[:, list(fields)].to_csv(part, index=False, lineterminator=CSV_EOL)
+        ok = True
+    finally:
+        for part, final in zip(parts, (full_path, filtered_path)):
+            if ok:
+                part.replace(final)
+            else:
+                part.unlink(missing_ok=True)
+    return n_full, n_filt, daily
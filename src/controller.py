@@ -1,122 +1,403 @@
 from __future__ import annotations
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
+from types import SimpleNamespace
+from typing import Callable, List, Dict, Optional
 
 from src.github_client import GitHubClient
+from src.metrics import Metrics
 from src.analyzer import RepoAnalyzer
-from src.filters import CommitFilter
-from src.util import ensure_dirs, write_csv, EXPORTS_DIR
+from src.identity import ContributorTally, Mailmap
+from src.models import COMMIT_FIELDS, STAT_FIELDS
+from src.planner import plan_query
+from src.store import CommitStore
+from src.util import ensure_dirs, parse_iso, write_csv, fan_out, CsvSink, EXPORTS_DIR, MAILMAP_PATH
 from src import reports  # new
 
 
+class _ExportProgress:
+    """
+    Last sink of the row fan-out: emits a 'rows' event every `every` rows with
+    the running counts, and a 'match' event per filtered row (spotted by the
+    filtered sink's count moving, so the filter isn't evaluated twice).
+    """
+
+    def __init__(self, metrics: Metrics, repo: str, full_sink, filt_sink, every: int = 500):
+        self.metrics = metrics
+        self.repo = repo
+        self.full_sink = full_sink
+        self.filt_sink = filt_sink
+        self.every = every
+        self._filtered = 0
+
+    def write(self, r) -> None:
+        if self.filt_sink.count != self._filtered:
+            self._filtered = self.filt_sink.count
+            self.metrics.emit("match", {"repo": self.repo, "row": r})
+        if self.full_sink.count % self.every == 0:
+            self.emit()
+
+    def emit(self) -> None:
+        self.metrics.emit("rows", {"repo": self.repo, "rows": self.full_sink.count, "filtered": self._filtered})
+
+
 class AppController:
-    def __init__(self):
+    def __init__(
+        self,
+        offline: bool = False,
+        workers: int = 4,
+        batch_workers: int = 1,
+        log: Callable[[str], None] = print,
+        mailmap: Optional[str] = None,
+    ):
         ensure_dirs()
-        self.client = GitHubClient()
+        self.log = log  # progress messages; the GUI routes them to its window
+        # one client (connection pool + rate-limit budget) for every repo, sized for concurrent batch repos
+        self.metrics = Metrics()  # whole-run instrumentation; add_hook() to forward it elsewhere
+        self.client = GitHubClient(
+            offline=offline, max_workers=workers, pool_size=workers * max(1, batch_workers), metrics=self.metrics
+        )
+        self.store = CommitStore()
+        self.charts = reports.ChartPool()  # worker processes start on the first --charts run
+        self._prefetched: Dict[str, Dict] = {}  # GraphQL backend: repo metadata fetched in batches
+        self.mailmap = Mailmap.load(mailmap or MAILMAP_PATH)  # merges a contributor's emails/names
+
+    def close(self) -> None:
+        self.charts.close()
+
+    def cancel(self) -> None:
+        """Stop the run(s) in progress: they raise github_client.Cancelled at the next request or wait."""
+        self.client.cancel()
 
     def _resolve_dates(self, since: Optional[str], until: Optional[str]):
+        """(since, until) as UTC-aware datetimes; date-only or naive input is taken as UTC."""
         if until:
-            try:
-                until_dt = datetime.fromisoformat(until.replace("Z", "+00:00"))
-            except Exception:
+            until_dt = parse_iso(until)
+            if until_dt is None:
                 raise ValueError(f"Invalid --until format: {until}")
         else:
             until_dt = datetime.now(timezone.utc)
 
         if since:
-            try:
-                since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
-            except Exception:
+            since_dt = parse_iso(since)
+            if since_dt is None:
                 raise ValueError(f"Invalid --since format: {since}")
         else:
             since_dt = until_dt - timedelta(days=30)
         return since_dt, until_dt
 
+    def _analyzer(self, args, owner: str, repo: str) -> RepoAnalyzer:
+        if getattr(args, "backend", "rest") == "graphql":
+            from src.graphql_backend import GraphQLRepoAnalyzer
+            return GraphQLRepoAnalyzer(
+                self.client, owner, repo, store=self.store, prefetched=self._prefetched.get(f"{owner}/{repo}")
+            )
+        return RepoAnalyzer(self.client, owner, repo, store=self.store)
+
+    @staticmethod
+    def _chart_period(since_dt: datetime, until_dt: datetime) -> str:
+        """Rollup granularity that keeps a chart readable: days up to ~6 months, then weeks, then months."""
+        span = until_dt - since_dt
+        if span <= timedelta(days=183):
+            return "day"
+        if span <= timedelta(days=3 * 366):
+            return "week"
+        return "month"
+
+    def _export_rows(self, rows, cf, full_csv, filt_csv, fields, analyzer, stored: bool, extra=()):
+        """
+        Row engine: one pass, every row fanned out to all sinks (`extra` take
+        every row too). Returns (rows, filtered rows, daily counts).
+        """
+        daily = reports.DailyCounter()
+        # freshly fetched rows also land in the local store (store-backed modes already have them)
+        store_sink = None if stored else self.store.writer(analyzer.full_name)
+        with CsvSink(full_csv, fields) as full_sink, CsvSink(filt_csv, fields) as filt_sink:
+            routes = [(None, full_sink), (self.metrics.timed_call("filter", cf.matches), filt_sink), (None, daily)]
+            if store_sink:
+                routes.append((None, store_sink))
+            routes.extend((None, sink) for sink in extra)
+            progress = _ExportProgress(self.metrics, analyzer.full_name, full_sink, filt_sink)
+            routes.append((None, progress))
+            try:
+                fan_out(rows, routes)
+                progress.emit()
+            finally:
+                if store_sink:
+                    store_sink.close()
+        return full_sink.count, filt_sink.count, daily.counts
+
+    def _failed(self, repo: str, message: str) -> Dict:
+        self.log(f"❌ {message}")
+        return {"repo": repo, "ok": False, "error": message}
+
     def run_with_args(self, args):
         if "/" not in args.repo:
             raise ValueError("repo must look like owner/repo, e.g., pandas-dev/pandas")
         owner, repo = args.repo.split("/", 1)
 
-        if not os.getenv("GITHUB_TOKEN"):
-            print("⚠️  No GITHUB_TOKEN found (.env). You may hit rate limits on busy repos.")
+        if not (os.getenv("GITHUB_TOKEN") or os.getenv("GITHUB_TOKENS")):
+            self.log("⚠️  No GITHUB_TOKEN found (.env). You may hit rate limits on busy repos.")
 
-        analyzer = RepoAnalyzer(self.client, owner, repo)
+        analyzer = self._analyzer(args, owner, repo)
+        # --local answers everything from the store, without touching the API
+        local = getattr(args, "local", False)
 
-        try:
-            repo_info = analyzer.fetch_repo()
-        except Exception as e:
-            print(f"❌ Failed to fetch repository: {e}")
-            return
+        if local:
+            repo_info = self.store.repo_meta(analyzer.full_name)
+            if repo_info is None:
+                return self._failed(
+                    args.repo, f"{owner}/{repo} is not in the local store yet (run once without --local)"
+                )
+            languages = self.store.languages(analyzer.full_name)
+        else:
+            try:
+                repo_info = analyzer.fetch_repo()
+            except Exception as e:
+                return self._failed(args.repo, f"Failed to fetch repository: {e}")
 
-        try:
-            languages = analyzer.fetch_languages()
-        except Exception as e:
-            print(f"❌ Failed to fetch languages: {e}")
-            languages = {}
+            try:
+                languages = analyzer.fetch_languages()
+            except Exception as e:
+                self.log(f"❌ Failed to fetch languages: {e}")
+                languages = {}
 
-        print(f"📦 {owner}/{repo} — ⭐ {repo_info.get('stargazers_count')}  🍴 {repo_info.get('forks_count')}")
-        print(f"🗣 languages: {', '.join(languages.keys()) or 'unknown'}")
+        self.log(f"📦 {owner}/{repo} — ⭐ {repo_info.get('stargazers_count')}  🍴 {repo_info.get('forks_count')}")
+        self.log(f"🗣 languages: {', '.join(languages.keys()) or 'unknown'}")
 
         try:
             since_dt, until_dt = self._resolve_dates(args.since, args.until)
         except ValueError as ve:
-            print(f"❌ {ve}")
-            return
+            return self._failed(args.repo, str(ve))
 
-        print(f"⏱️  commits window: {since_dt.isoformat()} → {until_dt.isoformat()}")
+        self.log(f"⏱️  commits window: {since_dt.isoformat()} → {until_dt.isoformat()}")
+        # an open window ("up to now") is requested without `until`, so its URLs, cache keys and
+        # checkpoints don't change with the clock and a rerun (or --offline) finds them again
+        api_until = until_dt if args.until else None
+        until_param = api_until.isoformat() if api_until else None
+        shard = getattr(args, "shard", None)
+        incremental = getattr(args, "incremental", False)
+
+        # Filters: whatever the API (or the store's indexes) can narrow is sent as
+        # query params, the full regexes still run locally on the reduced set
+        try:
+            plan = plan_query(args.msg, args.author, args.path, pushdown=not incremental)
+        except ValueError as ve:
+            return self._failed(args.repo, str(ve))
+        cf = plan.residual
+        if plan.api_params:
+            self.log(f"🔎 server-side filters: {plan.describe()}")
+        engine = getattr(args, "engine", "rows")
+        if engine == "pandas" and cf.needs_files:
+            self.log("ℹ️  --path needs per-commit file lists; using the row engine")
+            engine = "rows"
+        if engine == "pandas":
+            from src import columnar  # pandas is only imported for this engine
+        frames = None
         try:
-            commits = analyzer.fetch_commits(since=since_dt.isoformat(), until=until_dt.isoformat())
+            if engine == "pandas" and not (local or incremental or shard):
+                # one DataFrame per fetched page, built in bulk from the raw JSON
+                frames = self.metrics.timed_iter("transform", (
+                    columnar.commits_frame(page) for page in analyzer.iter_commit_pages(
+                        since=since_dt.isoformat(), until=until_param, **plan.api_params
+                    )
+                ))
+            elif local:
+                if args.path:
+                    raise RuntimeError("--path needs commit file lists from the API; not available with --local")
+                rows = self.store.query_commits(
+                    analyzer.full_name, since_dt, until_dt, author=plan.author, by="committed_at"
+                )
+            elif incremental:
+                rows = analyzer.sync_commits(since_dt, api_until, shard=shard)
+            elif shard:
+                rows = self.metrics.timed_iter("transform", analyzer.iter_rows(
+                    analyzer.fetch_window(since_dt, api_until, shard=shard, **plan.api_params)
+                ))
+            else:
+                # streamed: pages are fetched lazily while the exports below consume them
+                rows = self.metrics.timed_iter("transform", analyzer.iter_rows(analyzer.iter_commits(
+                    since=since_dt.isoformat(), until=until_param, **plan.api_params
+                )))
         except Exception as e:
-            print(f"❌ Failed to fetch commits: {e}")
-            return
+            return self._failed(args.repo, f"Failed to fetch commits: {e}")
 
-        rows = analyzer.commits_to_rows(commits)
+        if engine == "pandas" and frames is None:
+            frames = [columnar.rows_frame(rows)]
 
-        # Filters
-        cf = CommitFilter(message_regex=args.msg, author_regex=args.author, path_regex=args.path)
-        filtered = cf.apply_rows(rows)
+        # The store holds every commit of the window unless server-side filters narrowed the fetch;
+        # then activity and contributors are counted from this run's rows instead
+        store_window = local or incremental or not plan.api_params
+        tally = None if store_window else ContributorTally()
 
-        # Exports
+        if cf.needs_files:
+            # only rows that pass the cheap filters are worth a commit-detail request
+            rows = analyzer.iter_with_files(rows, want=cf.matches_without_path)
+
+        # Exports: CSVs, daily counts for the chart, and the local store
         base = f"{owner}_{repo}"
         full_csv = EXPORTS_DIR / f"{base}_commits.csv"
         filt_csv = EXPORTS_DIR / f"{base}_commits_filtered.csv"
-        fields = (
-            "sha","date","author_name","author_email","author_login",
-            "committer_name","committer_email","committer_login","message","url",
-        )
-        write_csv(full_csv, rows, fields)
-        write_csv(filt_csv, filtered, fields)
-        print(f"✅ Saved {len(rows)} commits → {full_csv}")
-        print(f"✅ Saved {len(filtered)} filtered commits → {filt_csv}")
-
+        fields = COMMIT_FIELDS + STAT_FIELDS if getattr(args, "backend", "rest") == "graphql" else COMMIT_FIELDS
+        parquet = None
+        if getattr(args, "parquet", False):
+            from src.parquet_export import ParquetSink
+            # incremental syncs append a partition of new commits; other runs replace the dataset
+            parquet = ParquetSink(EXPORTS_DIR / f"{base}_commits.parquet", append=incremental)
+        daily_counts = None
         try:
-            contributors: List[Dict] = analyzer.fetch_contributors()
-            contrib_rows = [
-                {"login": c.get("login"), "contributions": c.get("contributions")}
-                for c in contributors
-            ]
-            contrib_csv = EXPORTS_DIR / f"{base}_contributors.csv"
-            write_csv(contrib_csv, contrib_rows, ("login", "contributions"))
-            print(f"✅ Saved {len(contrib_rows)} contributors → {contrib_csv}")
+            with self.metrics.stage("export"):
+                if frames is not None:
+                    store_frames = not (local or incremental)
+
+                    seen = 0
+
+                    def on_frame(df):
+                        nonlocal seen
+                        seen += len(df)
+                        self.metrics.emit("rows", {"repo": analyzer.full_name, "rows": seen, "filtered": None})
+                        if store_frames:
+                            columnar.store_frame(self.store, analyzer.full_name, df)
+                        if parquet:
+                            parquet.write_frame(df)
+                        if tally:
+                            tally.write_frame(df)
+                    n_full, n_filt, daily_counts = columnar.export_frames(
+                        frames, cf, full_csv, filt_csv, fields, on_frame=on_frame
+                    )
+                else:
+                    n_full, n_filt, daily_counts = self._export_rows(
+                        rows, cf, full_csv, filt_csv, fields, analyzer, local or incremental,
+                        extra=[s for s in (parquet, tally) if s],
+                    )
         except Exception as e:
-            print(f"❌ Failed to fetch contributors: {e}")
-            contributors = []
+            return self._failed(args.repo, f"Failed to fetch commits: {e}")
+        finally:
+            if parquet:
+                parquet.close(ok=daily_counts is not None)
+        self.log(f"✅ Saved {n_full} commits → {full_csv}")
+        self.log(f"✅ Saved {n_filt} filtered commits → {filt_csv}")
+        if parquet:
+            self.log(f"✅ Saved {parquet.count} commits (Parquet, {len(parquet.parts())} part(s)) → {parquet.root}")
+
+        # Activity over time from the store's rollups (cost per bucket, not per commit)
+        period = "day"
+        activity = daily_counts
+        if store_window:
+            period = self._chart_period(since_dt, until_dt)
+            activity = self.store.rollup(analyzer.full_name, period, since_dt, until_dt)
+            activity_csv = EXPORTS_DIR / f"{base}_commits_per_{period}.csv"
+            write_csv(
+                activity_csv,
+                [{f"{period}": d.date().isoformat(), "commits": n} for d, n in activity.items()],
+                (period, "commits"),
+            )
+            self.log(f"✅ Saved commits per {period} → {activity_csv}")
+
+        # Contributors of the window, counted locally (no /contributors pages), identities merged
+        if store_window:
+            contributors = self.store.contributor_stats(analyzer.full_name, since_dt, until_dt, mailmap=self.mailmap)
+        else:
+            contributors = tally.contributors(self.mailmap)
+        contrib_csv = EXPORTS_DIR / f"{base}_contributors.csv"
+        write_csv(
+            contrib_csv,
+            [{**c, "emails": " ".join(c["emails"])} for c in contributors],
+            ("login", "name", "contributions", "emails"),
+        )
+        self.log(f"✅ Saved {len(contributors)} contributors → {contrib_csv}")
 
         if languages:
             lang_rows = [{"language": k, "bytes": v} for k, v in languages.items()]
             lang_csv = EXPORTS_DIR / f"{base}_languages.csv"
             write_csv(lang_csv, lang_rows, ("language", "bytes"))
-            print(f"✅ Saved languages → {lang_csv}")
+            self.log(f"✅ Saved languages → {lang_csv}")
 
         # Charts
         if getattr(args, "charts", False):
-            print("📈 Rendering charts ...")
-            p1 = reports.commits_over_time(rows, EXPORTS_DIR / f"{base}_commits_over_time.png")
-            p2 = reports.top_contributors(contributors, 10, EXPORTS_DIR / f"{base}_top_contributors.png")
-            p3 = reports.language_share(languages, EXPORTS_DIR / f"{base}_language_share.png")
-            print(f"🖼  {p1}")
-            print(f"🖼  {p2}")
-            print(f"🖼  {p3}")
-
-        print("🎉 Done.")
+            self.client.check_cancelled()  # rendering can't be interrupted; don't start it
+            self.log("📈 Rendering charts ...")
+            with self.metrics.stage("charts"):
+                paths = self.charts.render_all([
+                    ("commits_over_time", dict(
+                        out_path=EXPORTS_DIR / f"{base}_commits_over_time.png", counts=activity, period=period
+                    )),
+                    ("top_contributors", dict(
+                        contribs=contributors, k=10, out_path=EXPORTS_DIR / f"{base}_top_contributors.png"
+                    )),
+                    ("language_share", dict(
+                        languages=languages, out_path=EXPORTS_DIR / f"{base}_language_share.png"
+                    )),
+                ])
+            for p in paths:
+                self.log(f"🖼  {p}")
+
+        self.log("🎉 Done.")
+        return {"repo": args.repo, "ok": True, "error": None, "commits": n_full, "filtered": n_filt}
+
+    # ----- search -----
+    def search(self, args, repos: Optional[List[str]] = None) -> List:
+        """
+        --search: commit messages matching a regex across every synced repo
+        (or `repos`), answered from the store's trigram index without any API
+        call. --since/--until/--author narrow it; with no window, all history.
+        """
+        since_dt = until_dt = None
+        if args.since or args.until:
+            since_dt, until_dt = self._resolve_dates(args.since, args.until)
+        started = time.perf_counter()
+        rows = self.store.search_commits(args.search, repos=repos or None, since=since_dt, until=until_dt)
+        if args.author:
+            rows = plan_query(author_regex=args.author, pushdown=False).residual.apply_rows(rows)
+        ms = (time.perf_counter() - started) * 1000
+        out_csv = EXPORTS_DIR / "search_results.csv"
+        write_csv(out_csv, rows, ("repo",) + COMMIT_FIELDS)
+        n_repos = len({r.repo for r in rows})
+        self.log(f"🔎 {len(rows)} commits in {n_repos} repo(s) match /{args.search}/ ({ms:.0f} ms) → {out_csv}")
+        for r in rows[:20]:
+            self.log(f"   {r.repo}  {r.sha[:8]}  {(r.date or '')[:10]}  {r.message}")
+        if len(rows) > 20:
+            self.log(f"   ... {len(rows) - 20} more in {out_csv}")
+        return rows
+
+    # ----- batch -----
+    def org_repos(self, org: str) -> List[str]:
+        """'owner/repo' names of every repository of an organization."""
+        return [r["full_name"] for r in self.client.paged(f"/orgs/{org}/repos", {"per_page": "100"})]
+
+    def run_batch(self, args, repos: List[str], workers: int = 4) -> List[Dict]:
+        """
+        Analyze many repos concurrently (at most `workers` at a time) with the
+        same options. Everything is shared: the HTTP connection pool and
+        rate-limit budget of one client, the store, the chart pool. A failing
+        repo only fails its own entry; returns one summary per repo, in order.
+        """
+        def one(name: str) -> Dict:
+            started = time.monotonic()
+            try:
+                result = self.run_with_args(SimpleNamespace(**{**vars(args), "repo": name}))
+            except Exception as e:  # isolate: one broken repo must not end the batch
+                result = self._failed(name, str(e))
+            result["seconds"] = round(time.monotonic() - started, 2)
+            return result
+
+        if getattr(args, "backend", "rest") == "graphql" and not getattr(args, "local", False):
+            from src.graphql_backend import prefetch_repos
+            try:
+                # metadata + languages of many repos per query instead of two requests per repo
+                self._prefetched.update(prefetch_repos(self.client, repos))
+            except Exception as e:
+                self.log(f"⚠️  Batched repo metadata query failed ({e}); fetching per repo")
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(one, repos))
+
+        summary_csv = EXPORTS_DIR / "batch_summary.csv"
+        write_csv(summary_csv, results, ("repo", "ok", "commits", "filtered", "seconds", "error"))
+        failed = [r for r in results if not r["ok"]]
+        self.log(f"\n📋 Batch: {len(results) - len(failed)}/{len(results)} repos OK → {summary_csv}")
+        for r in failed:
+            self.log(f"   ❌ {r['repo']}: {r['error']}")
+        return results
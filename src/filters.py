@@ -1,32 +1,69 @@
 from __future__ import annotations
 import re
-from typing import Dict, Iterable, List, Optional
+from typing import Iterable, List, Optional, Tuple
+
+from src.models import CommitRow
+
+AUTHOR_FIELDS: Tuple[str, ...] = ("author_name", "author_email", "author_login")
+# what an exact login/email pattern is matched against: the API's `author` param never matches names
+ACCOUNT_FIELDS: Tuple[str, ...] = ("author_email", "author_login")
+
+
+def compile_regex(pattern: str, flags: int = re.IGNORECASE, what: str = "") -> "re.Pattern":
+    """re.compile, with a bad pattern reported as a ValueError (user input, not a bug)."""
+    try:
+        return re.compile(pattern, flags)
+    except re.error as e:
+        raise ValueError(f"Invalid {what + ' ' if what else ''}regex {pattern!r}: {e}") from None
+
 
 class CommitFilter:
     def __init__(
         self,
         message_regex: Optional[str] = None,
         author_regex: Optional[str] = None,
-        path_regex: Optional[str] = None,  # placeholder; needs commit-file API calls to be effective
+        path_regex: Optional[str] = None,  # matched against row.files; see RepoAnalyzer.iter_with_files
         flags: int = re.IGNORECASE,
+        path_pushed_down: bool = False,
+        author_fields: Tuple[str, ...] = AUTHOR_FIELDS,
     ):
-        self.message_re = re.compile(message_regex, flags) if message_regex else None
-        self.author_re = re.compile(author_regex, flags) if author_regex else None
-        self.path_re = re.compile(path_regex, flags) if path_regex else None
-
-    def apply_rows(self, rows: Iterable[Dict]) -> List[Dict]:
-        out: List[Dict] = []
-        for r in rows:
-            if self.message_re and not self.message_re.search(r.get("message") or ""):
-                continue
-            if self.author_re:
-                blob = " ".join([
-                    str(r.get("author_name") or ""),
-                    str(r.get("author_email") or ""),
-                    str(r.get("author_login") or "")
-                ])
-                if not self.author_re.search(blob):
-                    continue
-            # path filter requires augmenting rows with 'files' -> skip for now
-            out.append(r)
-        return out
+        self.message_re = compile_regex(message_regex, flags, "message") if message_regex else None
+        self.author_re = compile_regex(author_regex, flags, "author") if author_regex else None
+        # file paths are case-sensitive, in git and in the API's `path` param
+        self.path_re = compile_regex(path_regex, flags & ~re.IGNORECASE, "path") if path_regex else None
+        # the API already answered the path filter exactly (see planner.api_path_for)
+        self.path_pushed_down = path_pushed_down
+        self.author_fields = author_fields
+
+    @property
+    def needs_files(self) -> bool:
+        return self.path_re is not None and not self.path_pushed_down
+
+    def matches(self, r: CommitRow) -> bool:
+        if not self.matches_without_path(r):
+            return False
+        if self.needs_files:
+            files = r.files or ()
+            if not any(self.path_re.search(f) for f in files):
+                return False
+        return True
+
+    def matches_without_path(self, r: CommitRow) -> bool:
+        """
+        Cheap part of the filter; used to decide which rows are worth a
+        commit-detail request.
+        """
+        if self.message_re and not self.message_re.search(r.message or ""):
+            return False
+        if self.author_re:
+            fields = [getattr(r, f) or "" for f in self.author_fields]
+            # the joined blob keeps old cross-field patterns working; per-field
+            # checks let anchored ones like '^login$' match a single field
+            if not self.author_re.search(" ".join(fields)) and not any(
+                self.author_re.search(f) for f in fields
+            ):
+                return False
+        return True
+
+    def apply_rows(self, rows: Iterable[CommitRow]) -> List[CommitRow]:
+        return [r for r in rows if self.matches(r)]
@@ -1,39 +1,104 @@
 from __future__ import annotations
 import os
 import datetime
+import hashlib
+import json
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import requests # type: ignore
+from requests.adapters import HTTPAdapter # type: ignore
 from dotenv import load_dotenv # type: ignore
 
-from src.util import ensure_dirs, cache_subdir, parse_link_header, save_json
+from src.cache import ResponseCache
+from src.metrics import Metrics
+from src.ratelimit import RateLimiter
+from src.util import STATE_DIR, ensure_dirs, load_json, parse_link_header, save_json
+
+CURSORS_DIR = STATE_DIR / "cursors"
+
+
+class Cancelled(BaseException):
+    """
+    Raised inside client calls once `GitHubClient.cancel()` was called. A
+    BaseException (like KeyboardInterrupt) so the `except Exception` handlers
+    that keep a run going on partial failures let it through.
+    """
 
 
 class GitHubClient:
     BASE = "https://api.github.com"
 
-    def __init__(self, owner: Optional[str] = None, repo: Optional[str] = None):
+    def __init__(
+        self,
+        owner: Optional[str] = None,
+        repo: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        offline: bool = False,
+        max_workers: int = 4,
+        max_retries: int = 5,
+        wait_on_limit: bool = True,
+        resume_max_age: float = 24 * 3600,
+        pool_size: Optional[int] = None,
+        base_url: Optional[str] = None,
+        metrics: Optional[Metrics] = None,
+    ):
         load_dotenv()
         ensure_dirs()
+        # GITHUB_API_URL points the client at GitHub Enterprise or a local stand-in (benchmarks/)
+        self.base = (base_url or os.getenv("GITHUB_API_URL") or self.BASE).rstrip("/")
+        # api.github.com/graphql; GitHub Enterprise serves REST under /api/v3 and GraphQL at /api/graphql
+        self.graphql_url = (self.base[:-len("/v3")] if self.base.endswith("/api/v3") else self.base) + "/graphql"
         self.owner = owner
         self.repo = repo
+        self.cache = cache or ResponseCache()
+        self.metrics = metrics or Metrics()  # requests, cache, retries, budget; see src/metrics.py
+        self.offline = offline  # serve from cache only, never touch the network
+        self.max_workers = max(1, max_workers)  # concurrent page fetches in paged()
         self.session = requests.Session()
-        token = os.getenv("GITHUB_TOKEN")
-        if token:
-            # GitHub accepts either "token" or "Bearer" for classic/fine-grained PATs
-            self.session.headers["Authorization"] = f"token {token}"
+        # one pooled connection per worker so prefetching threads don't queue on the pool;
+        # `pool_size` covers several repos fetched at once through this client (batch mode)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, self.max_workers, pool_size or 0))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # GITHUB_TOKENS=a,b,c spreads load over several tokens; GITHUB_TOKEN is the single-token form
+        tokens = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()]
+        if not tokens and os.getenv("GITHUB_TOKEN"):
+            tokens = [os.environ["GITHUB_TOKEN"]]
+        # every wait (pacing, Retry-After, backoff) goes through _sleep, so cancel() cuts it short
+        self.limiter = RateLimiter(tokens or None, sleep=self._sleep)
+        # GraphQL has its own points budget per token, paced separately
+        self.graphql_limiter = RateLimiter(tokens or None, sleep=self._sleep)
+        self.cancelled = threading.Event()
+        self.max_retries = max_retries
+        self.wait_on_limit = wait_on_limit  # False: fail fast like before instead of waiting for reset
+        # older cursors are ignored: open windows may have shifted under the saved pages
+        self.resume_max_age = resume_max_age
         self.session.headers["Accept"] = "application/vnd.github+json"
         self.session.headers["User-Agent"] = "repo-analyzer/0.1"
 
-    def _cache_path(self, endpoint: str, page_idx: int) -> Path:
-        owner = self.owner or "unknown_owner"
-        repo = self.repo or "unknown_repo"
-        safe_ep = endpoint.strip("/").replace("/", "_")
-        return cache_subdir(owner, repo) / f"{safe_ep}_p{page_idx}.json"
+    # ----- cancellation -----
+    def cancel(self) -> None:
+        """Make every call in flight (and every new one) raise Cancelled, until reset_cancel()."""
+        self.cancelled.set()
+
+    def reset_cancel(self) -> None:
+        self.cancelled.clear()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise Cancelled("cancelled")
+
+    def _sleep(self, seconds: float) -> None:
+        if self.cancelled.wait(seconds):
+            raise Cancelled("cancelled")
 
     def _rate_limit_error(self, resp: requests.Response) -> None:
-        reset_ts = int(resp.headers.get("X-RateLimit-Reset", "0"))
+        reset_ts = int(resp.headers.get("X-RateLimit-Reset", "0") or 0)
         reset_dt = datetime.datetime.utcfromtimestamp(reset_ts).isoformat() + "Z"
         remaining = resp.headers.get("X-RateLimit-Remaining", "?")
         raise RuntimeError(
@@ -41,46 +106,300 @@ class GitHubClient:
             f"Set GITHUB_TOKEN in .env to avoid this."
         )
 
-    def get(self, path: str, params: Optional[Dict] = None) -> Dict:
-        url = f"{self.BASE}{path}"
-        resp = self.session.get(url, params=params, timeout=20)
-        if resp.status_code == 403 and resp.headers.get("X-RateLimit-Remaining") == "0":
-            self._rate_limit_error(resp)
+    def _send(
+        self,
+        url: str,
+        params: Optional[Dict],
+        headers: Dict[str, str],
+        timeout: float,
+        json_body: Optional[Dict] = None,
+    ) -> requests.Response:
+        """
+        One logical GET (or POST of `json_body`, for GraphQL) through the
+        rate-limit scheduler: paced by the token budget, waits out secondary
+        limits (Retry-After) and primary limit resets, and retries 5xx /
+        connection errors with jittered backoff.
+        """
+        limiter = self.limiter if json_body is None else self.graphql_limiter
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            budget = limiter.acquire()
+            waited = time.perf_counter() - t0
+            if waited > 0.001:
+                self.metrics.rate_limit_wait(waited)
+            h = dict(headers)
+            if budget.token:
+                # GitHub accepts either "token" or "Bearer" for classic/fine-grained PATs
+                h["Authorization"] = f"token {budget.token}"
+            t0 = time.perf_counter()
+            try:
+                if json_body is None:
+                    resp = self.session.get(url, params=params, headers=h, timeout=timeout)
+                else:
+                    resp = self.session.post(url, json=json_body, headers=h, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.request(url, 0, time.perf_counter() - t0, 0)
+                if attempt >= self.max_retries:
+                    raise
+                wait = limiter.backoff(attempt)
+                self.metrics.retry(type(e).__name__, url, wait)
+                limiter.sleep(wait)
+                attempt += 1
+                continue
+            self.metrics.request(
+                url, resp.status_code, time.perf_counter() - t0, len(resp.content), resp.headers,
+                token=limiter.budgets.index(budget),
+            )
+            limiter.update(budget, resp.headers)
+
+            if resp.status_code in (403, 429):
+                retry_after = resp.headers.get("Retry-After")
+                primary = resp.headers.get("X-RateLimit-Remaining") == "0"
+                if retry_after or primary:
+                    if not self.wait_on_limit or attempt >= self.max_retries:
+                        self._rate_limit_error(resp)
+                    if retry_after:
+                        # secondary (abuse) limit: GitHub says exactly how long to back off
+                        wait = float(retry_after) if retry_after.isdigit() else 60.0
+                        self.metrics.retry(f"secondary limit {resp.status_code}", url, wait)
+                        limiter.sleep(wait)
+                    else:
+                        self.metrics.retry(f"primary limit {resp.status_code}", url, 0.0)
+                    # primary limit: acquire() now sees the spent budget and waits for reset
+                    # (or moves to another token)
+                    attempt += 1
+                    continue
+            if resp.status_code >= 500 and attempt < self.max_retries:
+                wait = limiter.backoff(attempt)
+                self.metrics.retry(f"HTTP {resp.status_code}", url, wait)
+                limiter.sleep(wait)
+                attempt += 1
+                continue
+            return resp
+
+    def _fetch(
+        self,
+        url: str,
+        params: Optional[Dict],
+        timeout: float,
+        use_cache: bool = True,
+        stale_ok: bool = False,
+    ) -> Tuple[Any, Dict[str, str]]:
+        """
+        Read-through fetch: serve a fresh cache entry if there is one, otherwise
+        hit the API (conditionally, when a stale entry has validators) and store
+        the response. Returns (json body, Link rels). `use_cache=False` is for
+        callers that keep their own, smaller copy of the response; `stale_ok`
+        accepts any cached copy (used when resuming an interrupted walk).
+        """
+        self.check_cancelled()
+        entry = self.cache.get(url, params) if use_cache else None
+        if entry is not None and (self.offline or stale_ok or self.cache.is_fresh(entry)):
+            self.metrics.cache(True, url)
+            return entry["body"], entry.get("links") or {}
+        if use_cache:
+            self.metrics.cache(False, url)
+        if self.offline:
+            raise RuntimeError(f"Offline mode: no cached response for {url}")
+
+        # stale entry: revalidate; GitHub doesn't count 304s against the rate limit
+        headers = self.cache.conditional_headers(entry)
+        resp = self._send(url, params, headers, timeout)
+        if resp.status_code == 304 and entry is not None:
+            self.metrics.incr("cache_revalidated")
+            entry = self.cache.revalidated(url, params, entry)
+            return entry["body"], entry.get("links") or {}
         if not resp.ok:
             raise RuntimeError(f"GitHub API error {resp.status_code}: {resp.text[:300]}")
-        return resp.json()
 
-    def paged(self, path: str, params: Optional[Dict] = None) -> List[Dict]:
+        data = resp.json()
+        links = parse_link_header(resp.headers.get("Link"))
+        if not use_cache:
+            return data, links
+        self.cache.put(
+            url, params, data, links,
+            etag=resp.headers.get("ETag"), last_modified=resp.headers.get("Last-Modified"),
+        )
+        return data, links
+
+    def get(self, path: str, params: Optional[Dict] = None, use_cache: bool = True) -> Dict:
+        with self.metrics.stage("fetch"):
+            data, _ = self._fetch(f"{self.base}{path}", params, timeout=20, use_cache=use_cache)
+        return data
+
+    def graphql(
+        self,
+        query: str,
+        variables: Optional[Dict] = None,
+        use_cache: bool = True,
+        allow_partial: bool = False,
+    ) -> Dict:
         """
-        Iterate all pages for list endpoints, cache each page to JSON.
-        Returns a flat list of items.
+        POST a GraphQL query; returns its `data`. Errors raise, unless
+        `allow_partial` and some data came back (e.g. a batched query where one
+        aliased repository doesn't exist: its field is null). Answers go
+        through the response cache keyed on query + variables, with the TTL of
+        a REST commit window when there is an `until` variable. GraphQL has no
+        ETags, so stale entries are simply refetched.
         """
-        url = f"{self.BASE}{path}"
-        page_idx = 1
-        items: List[Dict] = []
-
-        while True:
-            resp = self.session.get(url, params=params, timeout=30)
-            if resp.status_code == 403 and resp.headers.get("X-RateLimit-Remaining") == "0":
-                self._rate_limit_error(resp)
+        variables = variables or {}
+        digest = hashlib.sha1(json.dumps([query, variables], sort_keys=True).encode("utf-8")).hexdigest()
+        key = {"q": digest, "until": variables.get("until")}
+        url = self.graphql_url
+        with self.metrics.stage("fetch"):
+            self.check_cancelled()
+            entry = self.cache.get(url, key) if use_cache else None
+            if entry is not None and (self.offline or self.cache.is_fresh(entry)):
+                self.metrics.cache(True, url)
+                return entry["body"]
+            if use_cache:
+                self.metrics.cache(False, url)
+            if self.offline:
+                raise RuntimeError(f"Offline mode: no cached response for GraphQL query {digest[:12]}")
+            resp = self._send(url, None, {}, timeout=60, json_body={"query": query, "variables": variables})
             if not resp.ok:
-                raise RuntimeError(f"GitHub API error {resp.status_code}: {resp.text[:300]}")
+                raise RuntimeError(f"GitHub GraphQL error {resp.status_code}: {resp.text[:300]}")
+            payload = resp.json()
+        data, errors = payload.get("data"), payload.get("errors")
+        if errors and (data is None or not allow_partial):
+            raise RuntimeError("GitHub GraphQL error: " + "; ".join(e.get("message", "?") for e in errors[:3]))
+        if use_cache and not errors:
+            self.cache.put(url, key, data)
+        return data
+
+    @staticmethod
+    def _page_number(url: str) -> Optional[int]:
+        for k, v in parse_qsl(urlsplit(url).query):
+            if k == "page" and v.isdigit():
+                return int(v)
+        return None
+
+    @staticmethod
+    def _with_page(url: str, page: int) -> str:
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page"]
+        query.append(("page", str(page)))
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
 
-            data = resp.json()
-            save_json(self._cache_path(path, page_idx), data)
+    @staticmethod
+    def _items(data: Any) -> List[Dict]:
+        if isinstance(data, list):
+            return data
+        # Some endpoints return dicts with 'items'
+        return data.get("items", [])
 
-            if isinstance(data, list):
-                items.extend(data)
-            else:
-                # Some endpoints return dicts with 'items'
-                items.extend(data.get("items", []))
+    def count(self, path: str, params: Optional[Dict] = None) -> int:
+        """
+        Cheap item count for a list endpoint: request one item per page and read
+        the page number of rel="last".
+        """
+        probe = dict(params or {})
+        probe["per_page"] = "1"
+        with self.metrics.stage("fetch"):
+            data, links = self._fetch(f"{self.base}{path}", probe, timeout=20)
+        last = self._page_number(links["last"]) if links.get("last") else None
+        return last if last is not None else len(self._items(data))
+
+    # ----- checkpoints -----
+    def _checkpoint_path(self, url: str, params: Optional[Dict]) -> Path:
+        # fingerprint = the first request's canonical URL, same as its cache key
+        return CURSORS_DIR / f"{self.cache.key(url, params)}.json"
+
+    def _resume_from(self, cp_path: Path) -> int:
+        """Pages completed by an earlier, interrupted walk (0 = start fresh)."""
+        cp = load_json(cp_path)
+        if not cp or time.time() - cp.get("updated_at", 0) > self.resume_max_age:
+            return 0
+        return int(cp.get("page", 0))
+
+    @staticmethod
+    def _save_checkpoint(cp_path: Path, url: str, page: int, next_url: Optional[str]) -> None:
+        save_json(
+            cp_path,
+            {"fingerprint": cp_path.stem, "url": url, "page": page, "next": next_url, "updated_at": time.time()},
+            indent=None,
+        )
+
+    def iter_pages(self, path: str, params: Optional[Dict] = None, prefetch: bool = True) -> Iterator[List[Dict]]:
+        """
+        Yield the items of each page of a list endpoint (see _iter_pages); the
+        time the caller waits for pages is charged to the 'fetch' stage.
+        """
+        return self.metrics.timed_iter("fetch", self._counted(path, self._iter_pages(path, params, prefetch)))
+
+    def _counted(self, path: str, pages: Iterator[List[Dict]]) -> Iterator[List[Dict]]:
+        for items in pages:
+            self.metrics.page(path, len(items))
+            yield items
+
+    def _iter_pages(self, path: str, params: Optional[Dict] = None, prefetch: bool = True) -> Iterator[List[Dict]]:
+        """
+        Yield the items of each page of a list endpoint, in page order, as soon
+        as that page is available. Every page goes through the response cache.
 
-            links = parse_link_header(resp.headers.get("Link"))
+        When the first response carries a rel="last" link with a page number,
+        later pages are prefetched concurrently (up to `max_workers` in flight,
+        so memory stays bounded by a few pages). Otherwise, or with
+        `prefetch=False` (callers that already run several walks at once), it
+        walks rel="next" one page at a time.
+
+        After each page a cursor (fingerprint, page index, next URL) is written
+        to data/state/cursors/. If a walk with the same request dies, the next
+        one replays the pages it already completed straight from the cache
+        (fresh or not) and only hits the API from the first missing page on.
+        The cursor is removed once the last page is through.
+        """
+        url = f"{self.base}{path}"
+        cp_path = self._checkpoint_path(url, params)
+        done = 0 if self.offline else self._resume_from(cp_path)
+
+        data, links = self._fetch(url, params, timeout=30, stale_ok=done >= 1)
+        if links.get("next"):
+            self._save_checkpoint(cp_path, url, 1, links.get("next"))
+        yield self._items(data)
+
+        last_url = links.get("last")
+        last_page = self._page_number(last_url) if last_url else None
+        if prefetch and last_url and last_page and self.max_workers > 1:
+            pages = iter(range(2, last_page + 1))
+
+            def fetch(n: int):
+                return self._fetch(self._with_page(last_url, n), None, 30, stale_ok=n <= done)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                window: deque = deque()
+                for n in pages:
+                    window.append((n, pool.submit(fetch, n)))
+                    if len(window) >= self.max_workers:
+                        break
+                while window:
+                    n, fut = window.popleft()
+                    page_data, page_links = fut.result()
+                    nxt = next(pages, None)
+                    if nxt:
+                        window.append((nxt, pool.submit(fetch, nxt)))
+                    self._save_checkpoint(cp_path, url, n, page_links.get("next"))
+                    yield self._items(page_data)
+            cp_path.unlink(missing_ok=True)
+            return
+
+        page = 1
+        next_url = links.get("next")
+        while next_url:
+            page += 1
+            # next URL already includes query string
+            data, links = self._fetch(next_url, None, timeout=30, stale_ok=page <= done)
             next_url = links.get("next")
-            if not next_url:
-                break
-            url = next_url
-            params = None  # next URL already includes query string
-            page_idx += 1
+            self._save_checkpoint(cp_path, url, page, next_url)
+            yield self._items(data)
+        cp_path.unlink(missing_ok=True)
 
+    def paged(self, path: str, params: Optional[Dict] = None) -> List[Dict]:
+        """
+        All pages of a list endpoint as one flat list (see iter_pages).
+        """
+        items: List[Dict] = []
+        for page in self.iter_pages(path, params):
+            items.extend(page)
         return items
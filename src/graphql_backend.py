@@ -0,0 +1,238 @@
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.analyzer import RepoAnalyzer
+from src.github_client import GitHubClient
+from src.store import CommitStore
+
+PAGE_SIZE = 100  # GraphQL connection maximum
+BATCH_REPOS = 20  # repositories per metadata query
+
+REPO_FIELDS = """
+fragment RepoFields on Repository {
+  nameWithOwner name owner { login } description url homepageUrl
+  stargazerCount forkCount isFork isArchived createdAt updatedAt pushedAt
+  primaryLanguage { name } defaultBranchRef { name }
+  languages(first: 100, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }
+}
+"""
+
+HISTORY_QUERY = """
+query History($owner: String!, $name: String!, $first: Int!, $after: String,
+              $since: GitTimestamp, $until: GitTimestamp, $path: String, $author: CommitAuthor) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef { target { ... on Commit {
+      history(first: $first, after: $after, since: $since, until: $until, path: $path, author: $author) {
+        totalCount
+        pageInfo { hasNextPage endCursor }
+        nodes {
+          oid url message authoredDate committedDate additions deletions changedFilesIfAvailable
+          author { name email user { login } }
+          committer { name email user { login } }
+        }
+      }
+    } } }
+  }
+}
+"""
+
+HISTORY_COUNT_QUERY = """
+query HistoryCount($owner: String!, $name: String!, $since: GitTimestamp, $until: GitTimestamp) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef { target { ... on Commit { history(since: $since, until: $until) { totalCount } } } }
+  }
+}
+"""
+
+USER_ID_QUERY = """
+query UserId($login: String!) { user(login: $login) { id } }
+"""
+
+
+def repos_query(n: int) -> str:
+    """Metadata + languages of `n` repositories in one query, aliased r0..r<n-1>."""
+    params = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(n))
+    fields = "\n".join(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{ ...RepoFields }}" for i in range(n))
+    return f"query RepoMeta({params}) {{\n{fields}\n}}\n{REPO_FIELDS}"
+
+
+def repo_to_rest(node: Dict) -> Dict:
+    """Repository node -> the REST /repos/<o>/<r> fields this app reads."""
+    return {
+        "full_name": node.get("nameWithOwner"),
+        "name": node.get("name"),
+        "owner": {"login": (node.get("owner") or {}).get("login")},
+        "description": node.get("description"),
+        "html_url": node.get("url"),
+        "homepage": node.get("homepageUrl"),
+        "stargazers_count": node.get("stargazerCount"),
+        "forks_count": node.get("forkCount"),
+        "fork": node.get("isFork"),
+        "archived": node.get("isArchived"),
+        "created_at": node.get("createdAt"),
+        "updated_at": node.get("updatedAt"),
+        "pushed_at": node.get("pushedAt"),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "default_branch": (node.get("defaultBranchRef") or {}).get("name"),
+    }
+
+
+def languages_of(node: Dict) -> Dict[str, int]:
+    edges = ((node.get("languages") or {}).get("edges")) or []
+    return {e["node"]["name"]: e["size"] for e in edges}
+
+
+def commit_to_rest(node: Dict) -> Dict:
+    """History node -> one item of the REST /commits list, plus `stats` and `changed_files`."""
+    author = node.get("author") or {}
+    committer = node.get("committer") or {}
+
+    def login(person: Dict) -> Optional[Dict]:
+        user = person.get("user")
+        return {"login": user["login"]} if user else None
+
+    additions, deletions = node.get("additions"), node.get("deletions")
+    return {
+        "sha": node["oid"],
+        "html_url": node.get("url"),
+        "commit": {
+            "message": node.get("message") or "",
+            "author": {"name": author.get("name"), "email": author.get("email"), "date": node.get("authoredDate")},
+            "committer": {
+                "name": committer.get("name"), "email": committer.get("email"), "date": node.get("committedDate")
+            },
+        },
+        "author": login(author),
+        "committer": login(committer),
+        "stats": {
+            "additions": additions,
+            "deletions": deletions,
+            "total": additions + deletions if additions is not None and deletions is not None else None,
+        },
+        "changed_files": node.get("changedFilesIfAvailable"),
+    }
+
+
+def prefetch_repos(client: GitHubClient, repos: Iterable[str], batch: int = BATCH_REPOS) -> Dict[str, Dict]:
+    """
+    Metadata and languages of many 'owner/repo's, `batch` per query:
+    {'owner/repo': {'info': ..., 'languages': ...}}. Repos that don't exist
+    (or can't be seen) are left out; their analyzers then fail on their own.
+    """
+    repos = list(repos)
+    found: Dict[str, Dict] = {}
+    for start in range(0, len(repos), batch):
+        chunk = [r for r in repos[start:start + batch] if "/" in r]
+        if not chunk:
+            continue
+        variables = {}
+        for i, name in enumerate(chunk):
+            variables[f"o{i}"], variables[f"n{i}"] = name.split("/", 1)
+        data = client.graphql(repos_query(len(chunk)), variables, allow_partial=True)
+        for i, name in enumerate(chunk):
+            node = data.get(f"r{i}")
+            if node:
+                found[name] = {"info": repo_to_rest(node), "languages": languages_of(node)}
+    return found
+
+
+class GraphQLRepoAnalyzer(RepoAnalyzer):
+    """
+    RepoAnalyzer whose repo, language and commit fetchers use GraphQL
+    (`--backend graphql`): metadata and languages in one query, history in
+    pages of 100 with per-commit stats. Commits come out in the REST shape
+    (commit_to_rest); contributors and --path file lists still use REST.
+    """
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        owner: str,
+        repo: str,
+        store: Optional[CommitStore] = None,
+        prefetched: Optional[Dict] = None,
+    ):
+        super().__init__(client, owner, repo, store=store)
+        self._meta = prefetched  # {'info', 'languages'} from prefetch_repos, or filled by fetch_repo
+        self._user_ids: Dict[str, Optional[str]] = {}
+
+    def _repo_meta(self) -> Dict:
+        if self._meta is None:
+            meta = prefetch_repos(self.client, [self.full_name]).get(self.full_name)
+            if meta is None:
+                raise RuntimeError(f"Repository {self.full_name} not found")
+            self._meta = meta
+        return self._meta
+
+    def fetch_repo(self) -> Dict:
+        info = self._repo_meta()["info"]
+        if self.store:
+            self.store.save_repo(self.full_name, info)
+        return info
+
+    def fetch_languages(self) -> Dict[str, int]:
+        languages = self._repo_meta()["languages"]  # came with the repo query: no request of its own
+        if self.store:
+            self.store.save_languages(self.full_name, languages)
+        return languages
+
+    def _author_filter(self, author: str) -> Optional[Dict]:
+        """REST's `author` (email or login) as a CommitAuthor input; None = unknown login."""
+        if "@" in author:
+            return {"emails": [author]}
+        if author not in self._user_ids:
+            user = self.client.graphql(USER_ID_QUERY, {"login": author}, allow_partial=True).get("user")
+            self._user_ids[author] = user["id"] if user else None
+        user_id = self._user_ids[author]
+        return {"id": user_id} if user_id else None
+
+    def _history(self, query: str, variables: Dict) -> Optional[Dict]:
+        data = self.client.graphql(query, variables)
+        repo = data.get("repository")
+        if repo is None:
+            raise RuntimeError(f"Repository {self.full_name} not found")
+        ref = repo.get("defaultBranchRef")
+        return ref["target"]["history"] if ref else None  # no default branch: an empty repository
+
+    def iter_commit_pages(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        author: Optional[str] = None,
+        path: Optional[str] = None,
+        prefetch: bool = True,
+    ) -> Iterator[List[Dict]]:
+        """
+        Stream commits one page (up to 100, REST-shaped, with stats) at a
+        time by following the history cursor; nothing is fetched until iterated.
+        Cursor pages come one after the other, so `prefetch` changes nothing.
+        """
+        variables = {
+            "owner": self.owner, "name": self.repo, "first": PAGE_SIZE,
+            "since": since, "until": until, "path": path,
+        }
+        return self._history_pages(variables, author)
+
+    def _history_pages(self, variables: Dict, author: Optional[str]) -> Iterator[List[Dict]]:
+        if author:
+            variables["author"] = self._author_filter(author)
+            if variables["author"] is None:
+                return  # no such user: no commits by them
+        after = None
+        while True:
+            history = self._history(HISTORY_QUERY, dict(variables, after=after))
+            if history is None:
+                return
+            nodes = history.get("nodes") or []
+            self.client.metrics.page(self.client.graphql_url, len(nodes))
+            yield [commit_to_rest(n) for n in nodes]
+            if not history["pageInfo"]["hasNextPage"]:
+                return
+            after = history["pageInfo"]["endCursor"]
+
+    def _commit_count(self, since, until) -> int:
+        history = self._history(
+            HISTORY_COUNT_QUERY,
+            {"owner": self.owner, "name": self.repo, "since": since.isoformat(), "until": until.isoformat()},
+        )
+        return history["totalCount"] if history else 0
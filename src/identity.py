@@ -0,0 +1,192 @@
+from __future__ import annotations
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+NOREPLY = re.compile(r"^(?:\d+\+)?([^@]+)@users\.noreply\.github\.com$")
+# Proper Name <proper@email> [Commit Name] [<commit@email>]; names may be empty
+MAILMAP_LINE = re.compile(r"^([^<]*)<([^>]*)>\s*(?:([^<]*)<([^>]*)>)?\s*$")
+
+
+class Identity(NamedTuple):
+    """One distinct author identity on `commits` commits, under rollup key `author`."""
+
+    author: str
+    login: str
+    email: str  # lower-cased
+    name: str
+    commits: int
+
+
+def author_key(login: Optional[str], email: Optional[str], name: Optional[str]) -> str:
+    """The key per-author rollups count under (store.ROLLUP_AUTHOR, in Python)."""
+    return login or (email or "").lower() or name or "unknown"
+
+
+class Mailmap:
+    """
+    git .mailmap entries (see gitmailmap(5)): commit (name, email) -> proper
+    (name, email). Emails and names match case-insensitively; an entry with a
+    commit name only applies to that name + email pair.
+    """
+
+    def __init__(self):
+        self._by_email: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._by_name_email: Dict[Tuple[str, str], Tuple[Optional[str], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_email) + len(self._by_name_email)
+
+    @classmethod
+    def parse(cls, text: str) -> "Mailmap":
+        mm = cls()
+        for line in text.splitlines():
+            m = MAILMAP_LINE.match(line.split("#", 1)[0].strip())
+            if not m:
+                continue
+            proper_name, proper_email, commit_name, commit_email = (
+                (g or "").strip() or None for g in m.groups()
+            )
+            if commit_email is None:  # 'Proper Name <commit@email>': only the name is replaced
+                commit_email, proper_email = proper_email, None
+            if not commit_email:
+                continue
+            target = (proper_name, proper_email.lower() if proper_email else None)
+            if commit_name:
+                mm._by_name_email[(commit_name.lower(), commit_email.lower())] = target
+            else:
+                mm._by_email[commit_email.lower()] = target
+        return mm
+
+    @classmethod
+    def load(cls, path: Path) -> "Mailmap":
+        """Entries of the file at `path`; none when it doesn't exist."""
+        try:
+            return cls.parse(Path(path).read_text(encoding="utf-8"))
+        except OSError:
+            return cls()
+
+    def lookup(self, name: Optional[str], email: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """(proper name, proper email) for a commit identity; None where the mailmap has nothing."""
+        email = (email or "").lower()
+        hit = self._by_name_email.get(((name or "").lower(), email)) or self._by_email.get(email)
+        return hit or (None, None)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+
+    def find(self, x: str) -> str:
+        parent = self.parent
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # path halving
+            x = parent[x]
+        return x
+
+    def union(self, a: str, b: str) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def resolve_contributors(
+    counts: Dict[str, int],
+    identities: Iterable[Identity],
+    mailmap: Optional[Mailmap] = None,
+) -> List[Dict]:
+    """
+    Merge per-author-key commit counts (of the analysis window) into people,
+    using every identity ever seen (links found outside the window count too).
+    Returns [{'login', 'name', 'emails', 'contributions'}], most active first;
+    'login' is the GitHub login when known, else the best name or email.
+
+    Keys sharing a login, email or noreply-email login are joined (union-find),
+    and so are keys the mailmap maps to one person; a shared name alone never
+    joins two keys.
+    """
+    mailmap = mailmap or Mailmap()
+    uf = _UnionFind()
+    index: Dict[str, str] = {}  # term -> first author key seen with it
+    logins: Dict[str, Counter] = defaultdict(Counter)
+    names: Dict[str, Counter] = defaultdict(Counter)
+    proper_names: Dict[str, Counter] = defaultdict(Counter)
+    emails: Dict[str, set] = defaultdict(set)
+
+    for ident in identities:
+        key = ident.author
+        uf.find(key)
+        proper_name, proper_email = mailmap.lookup(ident.name, ident.email)
+        terms = []
+        if ident.login:
+            terms.append("login:" + ident.login.lower())
+            logins[key][ident.login] += ident.commits
+        if ident.email:
+            terms.append("email:" + ident.email)
+            emails[key].add(ident.email)
+            noreply = NOREPLY.match(ident.email)
+            if noreply:
+                terms.append("login:" + noreply.group(1).lower())
+        if proper_email:
+            terms.append("email:" + proper_email)
+            emails[key].add(proper_email)
+        if proper_name:
+            terms.append("name:" + proper_name.lower())
+            proper_names[key][proper_name] += ident.commits
+        if ident.name:
+            names[key][ident.name] += ident.commits
+        for term in terms:
+            if term in index:
+                uf.union(index[term], key)
+            else:
+                index[term] = key
+
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for key in set(counts) | set(uf.parent):
+        groups[uf.find(key)].append(key)
+
+    people = []
+    for keys in groups.values():
+        contributions = sum(counts.get(k, 0) for k in keys)
+        if contributions <= 0:
+            continue
+        merged = lambda tallies: sum((tallies[k] for k in keys if k in tallies), Counter())  # noqa: E731
+        best = lambda c: c.most_common(1)[0][0] if c else None  # noqa: E731
+        name = best(merged(proper_names)) or best(merged(names))
+        all_emails = sorted(set().union(*(emails[k] for k in keys if k in emails)))
+        login = best(merged(logins)) or name or (all_emails[0] if all_emails else min(keys))
+        people.append({"login": login, "name": name, "emails": all_emails, "contributions": contributions})
+    people.sort(key=lambda p: (-p["contributions"], p["login"].lower()))
+    return people
+
+
+class ContributorTally:
+    """
+    Streaming sink counting commits per author identity, for runs whose rows
+    never all reach the store (server-side filters narrowed the fetch).
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+
+    def write(self, r) -> None:
+        email = (r.get("author_email") or "").lower()
+        self._counts[(r.get("author_login") or "", email, r.get("author_name") or "")] += 1
+
+    def write_frame(self, df) -> None:
+        """Same for a commits DataFrame (columnar engine); missing values arrive as NA, not None."""
+        text = lambda v: v if isinstance(v, str) else ""  # noqa: E731
+        for login, email, name in zip(df["author_login"], df["author_email"], df["author_name"]):
+            self._counts[(text(login), text(email).lower(), text(name))] += 1
+
+    def identities(self) -> List[Identity]:
+        return [Identity(author_key(*ident), *ident, n) for ident, n in self._counts.items()]
+
+    def contributors(self, mailmap: Optional[Mailmap] = None) -> List[Dict]:
+        identities = self.identities()
+        counts: Counter = Counter()
+        for ident in identities:
+            counts[ident.author] += ident.commits
+        return resolve_contributors(counts, identities, mailmap)
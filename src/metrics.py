@@ -0,0 +1,255 @@
+from __future__ import annotations
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+Hook = Callable[[str, Dict[str, Any]], None]
+
+# Bounds for long-lived instances (the --serve daemon keeps one for its lifetime)
+MAX_LATENCIES = 10_000  # latency samples kept for percentiles (a uniform reservoir); count, mean, max stay exact
+MAX_BUDGETS = 64  # rate-limit windows tracked one by one; older ones are folded into a running total
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class Metrics:
+    """
+    Run instrumentation shared by the client, the analyzer and the controller:
+    HTTP requests (count, status, latency, bytes), cache hits/misses, retries,
+    rate-limit budget and waits, and time per pipeline stage.
+
+    Stage times are exclusive: time spent in a nested stage (e.g. `fetch`
+    while `transform` pulls pages) is only counted once, for the inner one.
+    They are per thread and summed, so stages run by worker threads can add
+    up to more than the wall time.
+
+    Hooks (`add_hook`) get every event as (name, data) as it happens:
+    'request', 'page', 'cache', 'retry', 'rate_limit_wait', 'stage', plus the
+    controller's export progress ('rows', 'match'). They run on the thread
+    that produced the event and must not raise (errors are dropped).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started = time.monotonic()
+        self.counters: Dict[str, float] = {}
+        self.status: Dict[str, int] = {}
+        self.latencies: List[float] = []  # reservoir sample, see MAX_LATENCIES
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._latency_max: Optional[float] = None
+        self._random = random.Random()
+        self.stages: Dict[str, float] = {}
+        self._budgets: Dict[str, Dict[str, float]] = {}
+        self._budget_used = 0.0
+        self.hooks: List[Hook] = []
+
+    # ----- hooks -----
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        self.hooks.remove(hook)
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        for hook in list(self.hooks):
+            try:
+                hook(event, data)
+            except Exception:
+                pass  # monitoring must never break a run
+
+    # ----- counters -----
+    def incr(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def cache(self, hit: bool, url: str) -> None:
+        self.incr("cache_hits" if hit else "cache_misses")
+        self.emit("cache", {"hit": hit, "url": url})
+
+    def retry(self, reason: str, url: str, wait: float) -> None:
+        self.incr("retries")
+        self.incr("retry_wait_s", wait)
+        self.emit("retry", {"reason": reason, "url": url, "wait_s": wait})
+
+    def page(self, path: str, items: int) -> None:
+        self.incr("pages")
+        self.emit("page", {"path": path, "items": items})
+
+    def rate_limit_wait(self, seconds: float) -> None:
+        self.incr("rate_limit_wait_s", seconds)
+        self.emit("rate_limit_wait", {"seconds": seconds})
+
+    def request(
+        self,
+        url: str,
+        status: int,
+        seconds: float,
+        nbytes: int,
+        headers: Optional[Dict] = None,
+        token: int = 0,
+    ) -> None:
+        """
+        One HTTP round trip (every attempt, retries included). `nbytes` is the
+        decoded body size; what crossed the wire is taken from Content-Length
+        (compressed, and absent on chunked responses). `token` is the index of
+        the credential used, whose rate-limit budget is separate.
+        """
+        wire = int(headers.get("Content-Length") or 0) if headers is not None else 0
+        with self._lock:
+            self.counters["requests"] = self.counters.get("requests", 0) + 1
+            self.counters["body_bytes"] = self.counters.get("body_bytes", 0) + nbytes
+            self.counters["wire_bytes"] = self.counters.get("wire_bytes", 0) + wire
+            self.status[str(status)] = self.status.get(str(status), 0) + 1
+            self._sample_latency(seconds)
+            if headers is not None and "X-RateLimit-Remaining" in headers:
+                self._track_budget(headers, token)
+        self.emit("request", {"url": url, "status": status, "seconds": seconds, "body_bytes": nbytes, "token": token})
+
+    def _sample_latency(self, seconds: float) -> None:
+        # caller holds the lock
+        self._latency_count += 1
+        self._latency_sum += seconds
+        self._latency_max = seconds if self._latency_max is None else max(self._latency_max, seconds)
+        if len(self.latencies) < MAX_LATENCIES:
+            self.latencies.append(seconds)
+        else:
+            j = self._random.randrange(self._latency_count)
+            if j < MAX_LATENCIES:
+                self.latencies[j] = seconds
+
+    def _track_budget(self, headers, token: int) -> None:
+        # per (resource, token, reset window): budget used = first remaining seen + 1 - last remaining seen
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers.get("X-RateLimit-Reset") or 0)
+        except ValueError:
+            return
+        key = f"{headers.get('X-RateLimit-Resource', 'core')}:{token}:{reset_at}"
+        b = self._budgets.get(key)
+        if b is None:
+            self._budgets[key] = {"first": remaining + 1, "last": remaining, "reset_at": reset_at}
+            if len(self._budgets) > MAX_BUDGETS:
+                oldest = min(self._budgets, key=lambda k: self._budgets[k]["reset_at"])
+                done = self._budgets.pop(oldest)
+                self._budget_used += done["first"] - done["last"]
+        else:
+            b["last"] = min(b["last"], remaining)
+
+    # ----- stages -----
+    def _stack(self) -> List[List[Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name: str) -> List[Any]:
+        frame = [name, time.perf_counter(), 0.0]  # name, start, time spent in nested stages
+        self._stack().append(frame)
+        return frame
+
+    def _exit(self, frame: List[Any]) -> float:
+        stack = self._stack()
+        stack.pop()
+        elapsed = time.perf_counter() - frame[1]
+        if stack:
+            stack[-1][2] += elapsed
+        own = elapsed - frame[2]
+        with self._lock:
+            self.stages[frame[0]] = self.stages.get(frame[0], 0.0) + own
+        return own
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        frame = self._enter(name)
+        try:
+            yield
+        finally:
+            own = self._exit(frame)
+            self.emit("stage", {"name": name, "seconds": own})
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Charge the time spent producing each item of `iterable` to stage `name`."""
+        it = iter(iterable)
+        total = 0.0
+        try:
+            while True:
+                frame = self._enter(name)
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    total += self._exit(frame)
+                yield item
+        finally:
+            self.emit("stage", {"name": name, "seconds": total})
+
+    def timed_call(self, name: str, fn: Callable) -> Callable:
+        """`fn` wrapped so every call is charged to stage `name` (no per-call event)."""
+        def wrapper(*args, **kwargs):
+            frame = self._enter(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._exit(frame)
+        return wrapper
+
+    # ----- report -----
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            lat = sorted(self.latencies)
+            n_lat, lat_sum, lat_max = self._latency_count, self._latency_sum, self._latency_max
+            used = self._budget_used + sum(b["first"] - b["last"] for b in self._budgets.values())
+            remaining = min((b["last"] for b in self._budgets.values()), default=None)
+            stages = dict(self.stages)
+            status = dict(self.status)
+        ms = lambda v: None if v is None else round(v * 1000, 1)  # noqa: E731
+        hits, misses = counters.get("cache_hits", 0), counters.get("cache_misses", 0)
+        return {
+            "wall_s": round(time.monotonic() - self.started, 3),
+            "requests": {
+                "count": int(counters.get("requests", 0)),
+                "pages": int(counters.get("pages", 0)),
+                "status": status,
+                "body_bytes": int(counters.get("body_bytes", 0)),  # decoded
+                "wire_bytes": int(counters.get("wire_bytes", 0)),  # as sent (Content-Length)
+                "latency_ms": {
+                    "p50": ms(percentile(lat, 50)),
+                    "p90": ms(percentile(lat, 90)),
+                    "p99": ms(percentile(lat, 99)),
+                    "max": ms(lat_max),
+                    "mean": ms(lat_sum / n_lat if n_lat else None),
+                },
+            },
+            "cache": {
+                "hits": int(hits),
+                "misses": int(misses),
+                "revalidated": int(counters.get("cache_revalidated", 0)),
+                "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            },
+            "retries": {"count": int(counters.get("retries", 0)), "wait_s": round(counters.get("retry_wait_s", 0), 3)},
+            "rate_limit": {
+                "budget_used": int(used),
+                "remaining": remaining,
+                "wait_s": round(counters.get("rate_limit_wait_s", 0), 3),
+            },
+            "stages_s": {k: round(v, 3) for k, v in sorted(stages.items())},
+        }
+
+    def write_json(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.snapshot(), indent=2), encoding="utf-8")
+        return path
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import sys
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+# Column order of the commit CSV exports.
+COMMIT_FIELDS: Tuple[str, ...] = (
+    "sha", "date", "author_name", "author_email", "author_login",
+    "committer_name", "committer_email", "committer_login", "message", "url",
+)
+# Per-commit stats; only the GraphQL backend gets them from list queries, REST list pages leave them empty,
+# so they are appended to COMMIT_FIELDS in the exports of GraphQL runs only.
+STAT_FIELDS: Tuple[str, ...] = ("additions", "deletions", "changed_files")
+# Name/email/login columns: few distinct values, repeated on every commit (dictionary-encoded in exports).
+PEOPLE_COLUMNS: Tuple[str, ...] = (
+    "author_name", "author_email", "author_login",
+    "committer_name", "committer_email", "committer_login",
+)
+
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    # names/emails/logins repeat across thousands of commits; keep one copy each
+    return sys.intern(s) if s else s
+
+
+class CommitRow(NamedTuple):
+    """
+    One flattened commit. A tuple subclass: no per-row dict, ~1/4 the memory
+    of the equivalent dict, and people fields are interned.
+    """
+
+    sha: str
+    date: Optional[str] = None  # author date, ISO 8601
+    committed_at: Optional[str] = None  # committer date; what the API's since/until filter on
+    author_name: Optional[str] = None
+    author_email: Optional[str] = None
+    author_login: Optional[str] = None
+    committer_name: Optional[str] = None
+    committer_email: Optional[str] = None
+    committer_login: Optional[str] = None
+    message: str = ""
+    url: Optional[str] = None
+    additions: Optional[int] = None
+    deletions: Optional[int] = None
+    changed_files: Optional[int] = None
+    files: Optional[Tuple[str, ...]] = None  # filled by RepoAnalyzer.iter_with_files
+    repo: Optional[str] = None  # 'owner/repo', set on rows read back from the store
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict-style access, so generic sinks (CSV, store) take rows and dicts alike."""
+        return getattr(self, key, default)
+
+    @classmethod
+    def from_api(cls, c: Mapping[str, Any]) -> "CommitRow":
+        """From one item of the REST /commits list (or a commit detail, which also has stats)."""
+        commit = c.get("commit", {})
+        author = c.get("author") or {}
+        committer = c.get("committer") or {}
+        commit_author = commit.get("author") or {}
+        commit_committer = commit.get("committer") or {}
+        message = ((commit.get("message") or "").splitlines() or [""])[0][:500]
+        stats = c.get("stats") or {}
+        files = c.get("files")
+        return cls(
+            sha=c.get("sha"),
+            date=commit_author.get("date"),
+            committed_at=commit_committer.get("date"),
+            author_name=_intern(commit_author.get("name")),
+            author_email=_intern(commit_author.get("email")),
+            author_login=_intern(author.get("login")),
+            committer_name=_intern(commit_committer.get("name")),
+            committer_email=_intern(commit_committer.get("email")),
+            committer_login=_intern(committer.get("login")),
+            message=message,
+            url=c.get("html_url"),
+            additions=stats.get("additions"),
+            deletions=stats.get("deletions"),
+            changed_files=c.get("changed_files", len(files) if files is not None else None),
+        )
+
+    @classmethod
+    def from_mapping(cls, m: Mapping[str, Any]) -> "CommitRow":
+        """From a row dict / sqlite3.Row carrying some of the fields."""
+        keys = m.keys()
+        values: Dict[str, Any] = {f: m[f] for f in cls._fields if f in keys}
+        for f in ("author_name", "author_email", "author_login",
+                  "committer_name", "committer_email", "committer_login"):
+            if f in values:
+                values[f] = _intern(values[f])
+        if values.get("message") is None:
+            values["message"] = ""
+        return cls(**values)
+
+
+# Columns persisted per commit (everything but the per-run extras).
+STORED_FIELDS: Tuple[str, ...] = tuple(f for f in CommitRow._fields if f not in ("files", "repo"))
@@ -0,0 +1,143 @@
+from __future__ import annotations
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from src.models import PEOPLE_COLUMNS, STAT_FIELDS, STORED_FIELDS
+
+TIMESTAMP_COLUMNS = ("date", "committed_at")
+
+
+def _pa():
+    # optional export: pyarrow is only imported when --parquet is used
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow: pip install -r requirements.txt") from e
+    return pa, pq
+
+
+def commit_schema():
+    """Typed commit schema: UTC timestamps, dictionary-encoded people columns, int32 stats."""
+    pa, _ = _pa()
+    fields = []
+    for c in STORED_FIELDS:
+        if c in TIMESTAMP_COLUMNS:
+            t = pa.timestamp("s", tz="UTC")
+        elif c in PEOPLE_COLUMNS:
+            t = pa.dictionary(pa.int32(), pa.string())
+        elif c in STAT_FIELDS:
+            t = pa.int32()
+        else:
+            t = pa.string()
+        fields.append(pa.field(c, t, nullable=c != "sha"))
+    return pa.schema(fields)
+
+
+class ParquetSink:
+    """
+    Streaming Parquet export of commit rows into a dataset directory
+    (`<owner>_<repo>_commits.parquet/`) of zstd-compressed part files.
+
+    - append=False: the run's rows replace the dataset with a single part.
+    - append=True (incremental syncs): each run adds one new part holding only
+      shas not already in the dataset, so earlier parts are never rewritten.
+    Like CsvSink, the part is written under a temporary name and only moved
+    into place on a clean close.
+    """
+
+    def __init__(self, root: Path, append: bool = False, batch: int = 10000, compression: str = "zstd"):
+        pa, pq = _pa()
+        self.root = root
+        self.append = append
+        self.batch = batch
+        self.compression = compression
+        self.schema = commit_schema()
+        self.count = 0
+        root.mkdir(parents=True, exist_ok=True)
+        self._seen: Set[str] = self._existing_shas() if append else set()
+        # time first so parts list in write order; the random suffix keeps runs within one second apart
+        name = f"part-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+        self.path = root / name
+        self._tmp = root / f"_{name}.tmp"  # '_' prefix: ignored by dataset readers
+        self._writer = None
+        self._buf: List[tuple] = []
+
+    def parts(self) -> List[Path]:
+        return sorted(self.root.glob("part-*.parquet"))
+
+    def _existing_shas(self) -> Set[str]:
+        _, pq = _pa()
+        seen: Set[str] = set()
+        for part in self.parts():
+            seen.update(pq.read_table(part, columns=["sha"]).column("sha").to_pylist())
+        return seen
+
+    def write(self, r: Any) -> None:
+        sha = r.get("sha")
+        if sha in self._seen:
+            return
+        self._seen.add(sha)
+        self._buf.append(tuple(r.get(c) for c in STORED_FIELDS))
+        if len(self._buf) >= self.batch:
+            self.flush()
+
+    def write_frame(self, df) -> None:
+        """Columnar path for the pandas engine (columnar.export_frames on_frame)."""
+        df = df[~df["sha"].isin(self._seen)]
+        if df.empty:
+            return
+        self._seen.update(df["sha"].tolist())
+        self._write_columns({
+            c: df[c].astype(object).where(df[c].notna(), None).tolist() for c in STORED_FIELDS
+        })
+
+    def flush(self) -> None:
+        if self._buf:
+            self._write_columns(dict(zip(STORED_FIELDS, map(list, zip(*self._buf)))))
+            self._buf = []
+
+    def _write_columns(self, columns: Dict[str, list]) -> None:
+        pa, pq = _pa()
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name in TIMESTAMP_COLUMNS:
+                arr = pa.array(values, type=pa.string()).cast(field.type)
+            elif field.name in PEOPLE_COLUMNS:
+                arr = pa.array(values, type=pa.string()).dictionary_encode()
+            else:
+                arr = pa.array(values, type=field.type)
+            arrays.append(arr)
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self._tmp), self.schema, compression=self.compression)
+        self._writer.write_table(table)
+        self.count += table.num_rows
+
+    def close(self, ok: bool = True) -> None:
+        if ok:
+            self.flush()
+        if self._writer is None and ok and not self.append:
+            # an empty window still replaces the dataset (with a schema-only part)
+            self._write_columns({c: [] for c in STORED_FIELDS})
+        if self._writer is not None:
+            self._writer.close()
+        if not ok:
+            self._tmp.unlink(missing_ok=True)
+            return
+        if self._writer is not None:
+            os.replace(self._tmp, self.path)
+        if not self.append:
+            for part in self.parts():
+                if part != self.path:
+                    part.unlink()
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(ok=exc_type is None)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+import re
+from typing import Dict, List, Optional
+
+from src.filters import ACCOUNT_FIELDS, AUTHOR_FIELDS, CommitFilter
+
+_META = set(".^$*+?{}[]|()")
+_LOGIN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})$")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _unescape_literal(pattern: str) -> Optional[str]:
+    """
+    The plain text a regex matches if it has no metacharacters (escapes like
+    '\\.' allowed), else None.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                return None  # \d, \w, ... are classes, not literals
+            out.append(pattern[i + 1])
+            i += 2
+            continue
+        if ch in _META:
+            return None
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _strip_anchors(pattern: str):
+    """-> (body, anchored_start, anchored_end)"""
+    start = pattern.startswith("^")
+    body = pattern[1:] if start else pattern
+    end = body.endswith("$") and not body.endswith("\\$")
+    if end:
+        body = body[:-1]
+    return body, start, end
+
+
+def api_path_for(path_regex: Optional[str]) -> Optional[str]:
+    """
+    GitHub's `path` param selects commits touching a file or anything under a
+    directory. Only plain anchored literals meaning exactly that are pushed
+    down: '^dir/' (-> 'dir') and '^file$' (-> 'file'); '^dir/$' matches no
+    file path, so it stays client-side. Paths are compared case-sensitively
+    server-side, like git itself.
+    """
+    if not path_regex:
+        return None
+    body, start, end = _strip_anchors(path_regex)
+    literal = _unescape_literal(body) if start else None
+    if not literal:
+        return None
+    if end:
+        return None if literal.endswith("/") else literal
+    if literal.endswith("/") and literal.strip("/"):
+        return literal.rstrip("/")
+    return None
+
+
+def api_author_for(author_regex: Optional[str]) -> Optional[str]:
+    """
+    GitHub's `author` param takes one login or email and matches it exactly,
+    so only a literal anchored at both ends is pushed down: an email
+    ('^jane@example.com$') or a login ('^jane$'). Anything else (names,
+    alternations, partial words, an unanchored 'jane@example.com' that also
+    matches 'mary-jane@example.com') could match authors the server would
+    drop, so it stays client-side only. Such a pattern is then matched
+    against emails and logins only, never names (see plan_query).
+    """
+    if not author_regex:
+        return None
+    body, start, end = _strip_anchors(author_regex)
+    if not (start and end):
+        return None
+    # people rarely escape the dots in an email; '.' vs '\.' makes no practical difference there
+    email = _unescape_literal(re.sub(r"(?<!\\)\.", r"\\.", body))
+    if email and _EMAIL.match(email):
+        return email
+    literal = _unescape_literal(body)
+    if literal and _LOGIN.match(literal):
+        return literal
+    return None
+
+
+MIN_TERM = 3  # the trigram index can't look up anything shorter
+# One escape sequence, whole: \x41 is a single character, not '\x' followed by the literal '41'
+_ESCAPE = re.compile(
+    r"\\(?:x[0-9a-fA-F]{0,2}|u[0-9a-fA-F]{0,4}|U[0-9a-fA-F]{0,8}|N\{[^}]*\}?|[0-7]{1,3}|\d{1,2}|.)?", re.S
+)
+
+
+def _top_level_branches(pattern: str) -> List[str]:
+    """Split on the '|' that are not inside a group or a character class."""
+    branches, depth, start, i = [], 0, 0, 0
+    in_class = False
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+            if pattern[i + 1:i + 2] == "]":
+                i += 1  # '[]...]': a leading ']' is a literal
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _literal_runs(branch: str) -> List[str]:
+    """
+    Literal strings every match of `branch` (no top-level '|') contains.
+    Conservative: groups, classes and anything repeated or optional end a
+    run, so a run may be shorter than what the regex requires, never longer.
+    """
+    runs: List[str] = []
+    cur: List[str] = []
+
+    def cut():
+        if cur:
+            runs.append("".join(cur))
+            cur.clear()
+
+    i = 0
+    while i < len(branch):
+        ch = branch[i]
+        if ch == "\\":
+            esc = _ESCAPE.match(branch, i)
+            nxt = esc.group()[1:]
+            if len(nxt) == 1 and not nxt.isalnum():
+                cur.append(nxt)
+            else:
+                cut()  # \d, \w, \b, backreferences, \x41, \u00e9, \N{...}: not taken as literals
+            i = esc.end()
+            continue
+        if ch in "?*{":
+            if cur:
+                cur.pop()  # the previous item may be absent
+            cut()
+            if ch == "{":
+                end = branch.find("}", i)
+                i = end if end != -1 else i
+        elif ch == "+":
+            cut()  # the previous item is there, but what follows needn't be adjacent to it
+        elif ch == "[":
+            cut()
+            j = i + 2 if branch[i + 1:i + 2] == "]" else i + 1
+            while j < len(branch) and branch[j] != "]":
+                j += 2 if branch[j] == "\\" else 1
+            i = j
+        elif ch == "(":
+            cut()
+            depth, j = 1, i + 1
+            while j < len(branch) and depth:
+                if branch[j] == "\\":
+                    j += 1
+                elif branch[j] == "(":
+                    depth += 1
+                elif branch[j] == ")":
+                    depth -= 1
+                j += 1
+            i = j - 1
+        elif ch in ".^$)":
+            cut()
+        else:
+            cur.append(ch)
+        i += 1
+    cut()
+    return runs
+
+
+def message_terms(message_regex: Optional[str]) -> Optional[List[List[str]]]:
+    """
+    Substrings a message must contain to match the regex, for narrowing a
+    search with the trigram index: a list of alternatives, each a list of
+    terms that must all be present ([['cve-2026-'], ['ghsa-', 'fix']] =
+    'cve-2026-' OR ('ghsa-' AND 'fix')). None when some alternative requires
+    nothing of MIN_TERM characters, or the regex sets inline flags: the index
+    can't help, scan instead.
+    """
+    if not message_regex or re.search(r"\(\?[aiLmsux-]", message_regex):
+        return None
+    alternatives = []
+    for branch in _top_level_branches(message_regex):
+        terms = [t for t in _literal_runs(branch) if len(t) >= MIN_TERM]
+        if not terms:
+            return None
+        alternatives.append(terms)
+    return alternatives
+
+
+class QueryPlan:
+    """
+    Split of a commit query into what the API can narrow (`api_params`, passed
+    to RepoAnalyzer.fetch_commits & co.) and the residual CommitFilter that
+    still runs every regex locally on the reduced set.
+    """
+
+    def __init__(self, api_params: Dict[str, str], residual: CommitFilter):
+        self.api_params = api_params
+        self.residual = residual
+
+    @property
+    def author(self) -> Optional[str]:
+        return self.api_params.get("author")
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.api_params.get("path")
+
+    def describe(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in self.api_params.items())
+
+
+def plan_query(
+    message_regex: Optional[str] = None,
+    author_regex: Optional[str] = None,
+    path_regex: Optional[str] = None,
+    pushdown: bool = True,
+) -> QueryPlan:
+    """
+    `pushdown=False` for sources that must stay complete regardless of the
+    filters (e.g. the incremental commit set). An exact login/email author
+    pattern matches those fields only, pushed down or not, so every source
+    answers it the same way the API does.
+    """
+    params: Dict[str, str] = {}
+    author = api_author_for(author_regex)
+    if pushdown:
+        path = api_path_for(path_regex)
+        if author:
+            params["author"] = author
+        if path:
+            params["path"] = path
+    residual = CommitFilter(
+        message_regex=message_regex,
+        author_regex=author_regex,
+        path_regex=path_regex,
+        path_pushed_down="path" in params,
+        author_fields=ACCOUNT_FIELDS if author else AUTHOR_FIELDS,
+    )
+    return QueryPlan(params, residual)
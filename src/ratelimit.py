@@ -0,0 +1,108 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from typing import Callable, List, Mapping, Optional
+
+
+class TokenBudget:
+    """
+    Rate-limit state of one credential, refreshed from the X-RateLimit-*
+    headers of every response made with it. Also a token bucket: permits
+    refill at the rate that spreads `remaining` evenly until `reset_at`.
+    """
+
+    def __init__(self, token: Optional[str], burst: float):
+        self.token = token
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None  # None until the first response
+        self.reset_at: float = 0.0
+        self.burst = burst
+        self.permits = burst
+        self.refilled_at = time.monotonic()
+
+    def rate(self, now: float) -> Optional[float]:
+        """Requests/second that would use the budget up exactly at reset."""
+        if self.remaining is None or now >= self.reset_at:
+            return None  # unknown, or the window has rolled over since we last heard
+        return self.remaining / max(1.0, self.reset_at - now)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        try:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+        except ValueError:
+            pass
+
+    def exhausted(self, now: float) -> bool:
+        return self.remaining == 0 and now < self.reset_at
+
+
+class RateLimiter:
+    """
+    Client-side request scheduler shared by all threads of a GitHubClient.
+
+    - acquire() picks the credential with the most budget left and blocks just
+      long enough to keep requests within its pace (token bucket refilled at
+      remaining / seconds-to-reset), or until reset when a budget is spent.
+    - backoff() computes jittered exponential delays for retries.
+    Budgets are learned from responses, so nothing is paced until GitHub has
+    told us where we stand.
+    """
+
+    def __init__(
+        self,
+        tokens: Optional[List[Optional[str]]] = None,
+        burst: float = 50.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.budgets = [TokenBudget(t, burst) for t in (tokens or [None])]
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.waited = 0.0  # total seconds spent waiting on the budget
+
+    def _pick(self, now: float) -> TokenBudget:
+        usable = [b for b in self.budgets if not b.exhausted(now)]
+        if usable:
+            # unknown budgets first (they are probably fresh), then most remaining
+            return max(usable, key=lambda b: float("inf") if b.remaining is None else b.remaining)
+        return min(self.budgets, key=lambda b: b.reset_at)
+
+    def acquire(self) -> TokenBudget:
+        while True:
+            with self._lock:
+                wall = time.time()
+                mono = time.monotonic()
+                budget = self._pick(wall)
+                if budget.exhausted(wall):
+                    wait = budget.reset_at - wall + 1.0
+                else:
+                    rate = budget.rate(wall)
+                    if rate is None:
+                        return budget
+                    budget.permits = min(
+                        budget.burst, float(budget.remaining or 0),
+                        budget.permits + (mono - budget.refilled_at) * rate,
+                    )
+                    budget.refilled_at = mono
+                    if budget.permits >= 1.0:
+                        budget.permits -= 1.0
+                        if budget.remaining:
+                            budget.remaining -= 1  # optimistic; corrected by the response headers
+                        return budget
+                    wait = (1.0 - budget.permits) / max(rate, 1e-6)
+                self.waited += wait
+            self.sleep(wait)
+
+    def update(self, budget: TokenBudget, headers: Mapping[str, str]) -> None:
+        with self._lock:
+            budget.update(headers)
+
+    @staticmethod
+    def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
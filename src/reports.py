@@ -1,64 +1,108 @@
 from __future__ import annotations
+import multiprocessing
+import os
+import threading
 from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
-
-import matplotlib.pyplot as plt # type: ignore
-import matplotlib.dates as mdates # type: ignore
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from src.models import CommitRow
 from src.util import EXPORTS_DIR
 
+# matplotlib is imported on first use only (see _figure), so runs without
+# --charts never pay for it.
+
 
 def _ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
+def _figure(figsize: Tuple[float, float], dpi: int = 200):
+    """
+    A standalone Figure on the non-interactive Agg canvas. No pyplot, so no
+    global figure state: safe in worker processes and threads alike.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # type: ignore
+    from matplotlib.figure import Figure  # type: ignore
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _save(fig, out_path: Path) -> Path:
+    fig.savefig(out_path, bbox_inches="tight")
+    return out_path
+
+
 # -------- Commits over time (line) --------
-def commits_over_time(rows: Iterable[Dict], out_path: Optional[Path] = None) -> Path:
+class DailyCounter:
     """
-    Line chart of commits per day. High-DPI, date-aware ticks, grid, and a
-    peak annotation for readability. No explicit colors used.
+    Streaming sink that keeps only per-day commit counts, so the chart can be
+    drawn without holding on to the rows.
     """
-    counts: Dict[datetime, int] = Counter()
 
-    for r in rows:
-        ds = r.get("date")
+    def __init__(self):
+        self.counts: Dict[datetime, int] = Counter()
+
+    def write(self, r: CommitRow) -> None:
+        ds = r.date
         if not ds:
-            continue
+            return
         try:
             dt = datetime.fromisoformat(ds.replace("Z", "+00:00")).date()
-            counts[datetime(dt.year, dt.month, dt.day)] += 1
+            self.counts[datetime(dt.year, dt.month, dt.day)] += 1
         except Exception:
-            continue
+            return
+
+
+def commits_over_time(
+    rows: Iterable[CommitRow] = (),
+    out_path: Optional[Path] = None,
+    counts: Optional[Dict[datetime, int]] = None,
+    period: str = "day",
+) -> Path:
+    """
+    Line chart of commits per day. High-DPI, date-aware ticks, grid, and a
+    peak annotation for readability. No explicit colors used.
+    Pass precomputed `counts` (e.g. from a DailyCounter, or per-`period`
+    buckets from CommitStore.rollup) instead of rows when streaming.
+    """
+    if counts is None:
+        counter = DailyCounter()
+        for r in rows:
+            counter.write(r)
+        counts = counter.counts
 
     out_path = out_path or (EXPORTS_DIR / "commits_over_time.png")
     _ensure_parent(out_path)
 
-    plt.figure(figsize=(11, 6.5), dpi=200)
+    fig = _figure((11, 6.5))
+    ax = fig.add_subplot()
     if not counts:
-        plt.title("Commits Over Time (no data)")
-        plt.savefig(out_path, bbox_inches="tight")
-        plt.close()
-        return out_path
+        ax.set_title("Commits Over Time (no data)")
+        return _save(fig, out_path)
+
+    import matplotlib.dates as mdates  # type: ignore
 
     dates = sorted(counts.keys())
     vals = [counts[d] for d in dates]
 
-    plt.plot(dates, vals, marker="o", linewidth=2, markersize=5)
-    plt.title("Commits Over Time")
-    plt.xlabel("Date")
-    plt.ylabel("Commits")
+    ax.plot(dates, vals, marker="o", linewidth=2, markersize=5)
+    ax.set_title("Commits Over Time" if period == "day" else f"Commits Over Time (per {period})")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Commits" if period == "day" else f"Commits per {period}")
 
     # Nice date ticks & formatting
-    ax = plt.gca()
     ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=6, maxticks=10))
     ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
-    plt.grid(True, linestyle="--", alpha=0.3)
+    ax.grid(True, linestyle="--", alpha=0.3)
 
     # Annotate the max point
     max_idx = max(range(len(vals)), key=lambda i: vals[i])
-    plt.annotate(
+    ax.annotate(
         f"peak: {vals[max_idx]}",
         xy=(dates[max_idx], vals[max_idx]),
         xytext=(10, 10),
@@ -66,10 +110,8 @@ def commits_over_time(rows: Iterable[Dict], out_path: Optional[Path] = None) ->
         arrowprops=dict(arrowstyle="->", shrinkA=0, shrinkB=0, lw=1),
     )
 
-    plt.tight_layout()
-    plt.savefig(out_path, bbox_inches="tight")
-    plt.close()
-    return out_path
+    fig.tight_layout()
+    return _save(fig, out_path)
 
 
 # -------- Top contributors (horizontal bar) --------
@@ -87,30 +129,27 @@ def top_contributors(contribs: Iterable[Dict], k: int = 10, out_path: Optional[P
     out_path = out_path or (EXPORTS_DIR / "top_contributors.png")
     _ensure_parent(out_path)
 
-    plt.figure(figsize=(11, 6.5), dpi=200)
+    fig = _figure((11, 6.5))
+    ax = fig.add_subplot()
     if not labels:
-        plt.title("Top Contributors (no data)")
-        plt.savefig(out_path, bbox_inches="tight")
-        plt.close()
-        return out_path
+        ax.set_title("Top Contributors (no data)")
+        return _save(fig, out_path)
 
     # Horizontal bars for readability with long labels
     y_pos = list(range(len(labels)))
-    plt.barh(y_pos, values)
-    plt.yticks(y_pos, labels)
-    plt.gca().invert_yaxis()  # largest on top
-    plt.title(f"Top {len(labels)} Contributors")
-    plt.xlabel("Contributions")
-    plt.grid(axis="x", linestyle="--", alpha=0.3)
+    ax.barh(y_pos, values)
+    ax.set_yticks(y_pos, labels)
+    ax.invert_yaxis()  # largest on top
+    ax.set_title(f"Top {len(labels)} Contributors")
+    ax.set_xlabel("Contributions")
+    ax.grid(axis="x", linestyle="--", alpha=0.3)
 
     # Value labels at bar ends
     for i, v in enumerate(values):
-        plt.text(v, i, f" {v}", va="center")
+        ax.text(v, i, f" {v}", va="center")
 
-    plt.tight_layout()
-    plt.savefig(out_path, bbox_inches="tight")
-    plt.close()
-    return out_path
+    fig.tight_layout()
+    return _save(fig, out_path)
 
 
 # -------- Language share (smart pie) --------
@@ -122,13 +161,12 @@ def language_share(languages: Dict[str, int], out_path: Optional[Path] = None, t
     out_path = out_path or (EXPORTS_DIR / "language_share.png")
     _ensure_parent(out_path)
 
-    plt.figure(figsize=(8.5, 8.5), dpi=200)
+    fig = _figure((8.5, 8.5))
+    ax = fig.add_subplot()
 
     if not languages:
-        plt.title("Language Share (no data)")
-        plt.savefig(out_path, bbox_inches="tight")
-        plt.close()
-        return out_path
+        ax.set_title("Language Share (no data)")
+        return _save(fig, out_path)
 
     # Sort & collapse into "Other" for readability
     items = sorted(languages.items(), key=lambda kv: kv[1], reverse=True)
@@ -143,7 +181,7 @@ def language_share(languages: Dict[str, int], out_path: Optional[Path] = None, t
     # Small explode on largest slice (purely visual, no specific colors)
     explode = [0.08] + [0] * (len(sizes) - 1)
 
-    wedges, texts, autotexts = plt.pie(
+    wedges, texts, autotexts = ax.pie(
         sizes,
         labels=labels,
         autopct="%1.1f%%",
@@ -151,10 +189,67 @@ def language_share(languages: Dict[str, int], out_path: Optional[Path] = None, t
         explode=explode,
         pctdistance=0.8,
     )
-    plt.title("Language Share")
-    plt.gca().set_aspect("equal")  # perfect circle
+    ax.set_title("Language Share")
+    ax.set_aspect("equal")  # perfect circle
 
-    plt.tight_layout()
-    plt.savefig(out_path, bbox_inches="tight")
-    plt.close()
-    return out_path
+    fig.tight_layout()
+    return _save(fig, out_path)
+
+
+# -------- Rendering many charts --------
+CHARTS = {
+    "commits_over_time": commits_over_time,
+    "top_contributors": top_contributors,
+    "language_share": language_share,
+}
+
+ChartJob = Tuple[str, Dict[str, Any]]  # (name in CHARTS, keyword arguments)
+
+
+def render(job: ChartJob) -> Path:
+    name, kwargs = job
+    return CHARTS[name](**kwargs)
+
+
+class ChartPool:
+    """
+    Renders chart jobs in a pool of worker processes (matplotlib rendering is
+    CPU-bound and holds the GIL). Created lazily on the first job and meant to
+    be shared: a batch over many repos submits every chart to one pool.
+    `workers=1` renders in-process instead.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()  # batch repos submit from several threads
+
+    def submit(self, job: ChartJob) -> Future:
+        if self.workers <= 1:
+            f: Future = Future()
+            try:
+                f.set_result(render(job))
+            except Exception as e:
+                f.set_exception(e)
+            return f
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the parent has live HTTP/SQLite threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool.submit(render, job)
+
+    def render_all(self, jobs: Iterable[ChartJob]) -> List[Path]:
+        """Render a batch concurrently; paths in job order."""
+        return [f.result() for f in [self.submit(job) for job in jobs]]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self) -> "ChartPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
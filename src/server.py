@@ -0,0 +1,306 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.analyzer import RepoAnalyzer
+from src.controller import AppController
+from src.models import COMMIT_FIELDS
+from src.planner import plan_query
+from src.store import ROLLUP_PERIODS
+
+DEFAULT_TTL = 30.0  # seconds a finished sync or analysis answers identical/covered requests
+OPEN = float("inf")  # window end of "until now"
+
+
+def query_params(body: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """
+    A JSON body as the str/None values a query string gives (true -> 'true',
+    5 -> '5'); a list or object value is a ValueError.
+    """
+    params: Dict[str, Optional[str]] = {}
+    for k, v in body.items():
+        if isinstance(v, bool):
+            v = "true" if v else "false"
+        elif isinstance(v, (int, float)):
+            v = str(v)
+        elif v is not None and not isinstance(v, str):
+            raise ValueError(f"{k} must be a string, number, boolean or null")
+        params[k] = v
+    return params
+
+
+class _Call:
+    def __init__(self, lo: float, hi: float):
+        self.lo = lo
+        self.hi = hi
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+
+
+class Coalescer:
+    """
+    Request coalescing ("single flight") over time windows. run(group, lo, hi,
+    fn) runs fn() unless a call of the same group covering [lo, hi] is in
+    flight or finished successfully within `ttl` seconds; then it returns
+    that call's result instead. Returns (result, shared).
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, List[_Call]] = {}
+
+    def run(self, group: Any, lo: float, hi: float, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            now = time.monotonic()
+            # forget expired calls of every group, and groups left empty: a long-running
+            # daemon sees unboundedly many distinct groups (e.g. /analyze argument sets)
+            for key in list(self._calls):
+                live = [c for c in self._calls[key] if c.finished_at is None or now - c.finished_at < self.ttl]
+                if live:
+                    self._calls[key] = live
+                else:
+                    del self._calls[key]
+            calls = self._calls.setdefault(group, [])
+            shared = next((c for c in calls if c.lo <= lo and hi <= c.hi), None)
+            if shared is None:
+                call = _Call(lo, hi)
+                calls.append(call)
+        if shared is not None:
+            shared.done.wait()
+            if shared.error is not None:
+                raise shared.error
+            return shared.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                calls.remove(call)  # failures are not remembered, only shared while in flight
+                if not calls and self._calls.get(group) is calls:
+                    del self._calls[group]
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            call.done.set()
+        return call.result, False
+
+
+class AnalysisService:
+    """
+    The endpoints, independent of HTTP: each takes the query params and returns
+    a JSON-able dict. One controller serves every query, so its connection pool,
+    cache, store and chart pool stay warm. Syncs and exports of one repo never
+    run twice at once; different repos proceed in parallel.
+    """
+
+    def __init__(self, controller: AppController, ttl: float = DEFAULT_TTL):
+        self.ctrl = controller
+        self.syncs = Coalescer(ttl)
+        self.runs = Coalescer(ttl)
+        self.started = time.monotonic()
+        self.served = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._analyzers: Dict[str, RepoAnalyzer] = {}
+
+    # ----- helpers -----
+    def _repo_lock(self, repo: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(repo, threading.Lock())
+
+    def _analyzer(self, repo: str) -> RepoAnalyzer:
+        if "/" not in repo:
+            raise ValueError("repo must look like owner/repo, e.g., pandas-dev/pandas")
+        with self._lock:
+            if repo not in self._analyzers:
+                owner, name = repo.split("/", 1)
+                self._analyzers[repo] = RepoAnalyzer(self.ctrl.client, owner, name, store=self.ctrl.store)
+            return self._analyzers[repo]
+
+    def _count(self, shared: bool) -> None:
+        with self._lock:
+            self.served += 1
+            self.coalesced += shared
+
+    def _window(self, q: Dict[str, str]) -> Tuple[datetime, datetime, float]:
+        """(since, until, coverage end); an open `until` covers whatever is synced up to now."""
+        since, until = self.ctrl._resolve_dates(q.get("since"), q.get("until"))
+        return since, until, until.timestamp() if q.get("until") else OPEN
+
+    def _sync(self, q: Dict[str, str]) -> Tuple[RepoAnalyzer, datetime, datetime, bool]:
+        """Bring the store up to date for the window (coalesced); returns (analyzer, since, until, shared)."""
+        analyzer = self._analyzer(q.get("repo") or "")
+        since, until, hi = self._window(q)
+
+        def sync():
+            with self._repo_lock(analyzer.full_name):
+                analyzer.sync_commits(since, until if q.get("until") else None)
+
+        _, shared = self.syncs.run(analyzer.full_name, since.timestamp(), hi, sync)
+        return analyzer, since, until, shared
+
+    # ----- endpoints -----
+    def commits(self, q: Dict[str, str]) -> Dict:
+        # same author semantics as the CLI; bad regexes fail before a sync
+        cf = plan_query(q.get("msg"), q.get("author"), pushdown=False).residual
+        analyzer, since, until, shared = self._sync(q)
+        rows = cf.apply_rows(self.ctrl.store.query_commits(analyzer.full_name, since, until, by="committed_at"))
+        limit = int(q.get("limit") or 1000)
+        self._count(shared)
+        return {
+            "repo": analyzer.full_name, "since": since.isoformat(), "until": until.isoformat(),
+            "count": len(rows), "commits": [{f: r.get(f) for f in COMMIT_FIELDS} for r in rows[:limit]],
+        }
+
+    def activity(self, q: Dict[str, str]) -> Dict:
+        period = q.get("period")
+        if period and period not in ROLLUP_PERIODS:
+            raise ValueError(f"period must be one of {', '.join(ROLLUP_PERIODS)}")
+        analyzer, since, until, shared = self._sync(q)
+        period = period or self.ctrl._chart_period(since, until)
+        counts = self.ctrl.store.rollup(analyzer.full_name, period, since, until, author=q.get("author"))
+        self._count(shared)
+        return {
+            "repo": analyzer.full_name, "period": period,
+            "counts": [{period: d.date().isoformat(), "commits": n} for d, n in counts.items()],
+        }
+
+    def contributors(self, q: Dict[str, str]) -> Dict:
+        analyzer, since, until, shared = self._sync(q)
+        limit = int(q.get("limit") or 0) or None
+        people = self.ctrl.store.contributor_stats(
+            analyzer.full_name, since, until, mailmap=self.ctrl.mailmap, limit=limit
+        )
+        self._count(shared)
+        return {"repo": analyzer.full_name, "contributors": people}
+
+    def search(self, q: Dict[str, str]) -> Dict:
+        if not q.get("q"):
+            raise ValueError("q (a message regex) is required")
+        since = until = None
+        if q.get("since") or q.get("until"):
+            since, until, _ = self._window(q)
+        repos = [r for r in (q.get("repos") or "").split(",") if r] or None
+        limit = int(q.get("limit") or 1000)
+        rows = self.ctrl.store.search_commits(q["q"], repos=repos, since=since, until=until, limit=limit)
+        self._count(False)
+        return {
+            "count": len(rows), "commits": [{"repo": r.repo, **{f: r.get(f) for f in COMMIT_FIELDS}} for r in rows],
+        }
+
+    def repo(self, q: Dict[str, str]) -> Dict:
+        analyzer = self._analyzer(q.get("repo") or "")
+        info = analyzer.fetch_repo()  # both go through the response cache's TTLs
+        languages = analyzer.fetch_languages()
+        self._count(False)
+        return {"repo": analyzer.full_name, "info": info, "languages": languages}
+
+    def analyze(self, q: Dict[str, Any]) -> Dict:
+        q = query_params(q)  # the args are the coalescing key: plain strings only
+        flag = lambda k: str(q.get(k) or "").lower() in ("1", "true", "yes", "on")  # noqa: E731
+        args = SimpleNamespace(
+            repo=q.get("repo") or "", since=q.get("since"), until=q.get("until"), msg=q.get("msg"),
+            author=q.get("author"), path=q.get("path"), charts=flag("charts"), parquet=flag("parquet"),
+            incremental=flag("incremental"), local=flag("local"), shard=q.get("shard"),
+            engine=q.get("engine") or "rows", backend=q.get("backend") or "rest", gui=False,
+        )
+        analyzer = self._analyzer(args.repo)
+
+        def run():
+            # one repo's exports share file names: never two pipelines for it at once
+            with self._repo_lock(analyzer.full_name):
+                return self.ctrl.run_with_args(args)
+
+        result, shared = self.runs.run(tuple(sorted(vars(args).items())), 0, 0, run)
+        self._count(shared)
+        return result
+
+    def health(self, q: Dict[str, str]) -> Dict:
+        return {"ok": True, "uptime_s": round(time.monotonic() - self.started, 1)}
+
+    def metrics(self, q: Dict[str, str]) -> Dict:
+        with self._lock:
+            service = {"served": self.served, "coalesced": self.coalesced, "repos": sorted(self._analyzers)}
+        return {**self.ctrl.metrics.snapshot(), "service": service}
+
+    ROUTES = ("commits", "activity", "contributors", "search", "repo", "analyze", "health", "metrics")
+
+
+class Handler(BaseHTTPRequestHandler):
+    """GET /<route>?params, or POST with a JSON object body; answers AnalysisService.<route>(params)."""
+
+    protocol_version = "HTTP/1.1"
+    service: AnalysisService
+
+    def send_json(self, status: int, obj: Any) -> None:
+        body = json.dumps(obj, default=str, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def dispatch(self, params: Dict[str, Any]) -> None:
+        name = urlsplit(self.path).path.strip("/")
+        if name not in AnalysisService.ROUTES:
+            return self.send_json(404, {"error": f"unknown endpoint /{name}"})
+        try:
+            self.send_json(200, getattr(self.service, name)(params))
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+
+    def do_GET(self) -> None:
+        q = parse_qs(urlsplit(self.path).query)
+        self.dispatch({k: v[-1] for k, v in q.items()})
+
+    def do_POST(self) -> None:
+        q = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self.send_json(400, {"error": "body must be a JSON object"})
+            if not isinstance(body, dict):
+                return self.send_json(400, {"error": "body must be a JSON object"})
+            try:
+                q.update(query_params(body))
+            except ValueError as e:
+                return self.send_json(400, {"error": str(e)})
+        self.dispatch(q)
+
+
+def make_server(service: AnalysisService, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    handler = type("BoundHandler", (Handler,), {"service": service})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    return srv
+
+
+def serve(service: AnalysisService, host: str = "127.0.0.1", port: int = 8000):
+    """Start the server on a daemon thread; returns (server, base_url)."""
+    srv = make_server(service, host, port)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://{host}:{srv.server_address[1]}"
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """'host:port', ':port' or 'port' -> (host, port); the host defaults to localhost."""
+    host, _, port = address.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise ValueError(f"Invalid --serve address: {address} (expected host:port)")
@@ -0,0 +1,654 @@
+from __future__ import annotations
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.filters import compile_regex
+from src.identity import Identity, Mailmap, resolve_contributors
+from src.models import STAT_FIELDS, STORED_FIELDS, CommitRow
+from src.planner import message_terms
+from src.util import STORE_PATH, as_utc, parse_iso
+
+COMMIT_COLUMNS = STORED_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    repo TEXT PRIMARY KEY,
+    meta TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS languages (
+    repo TEXT NOT NULL,
+    language TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (repo, language)
+);
+CREATE TABLE IF NOT EXISTS contributors (
+    repo TEXT NOT NULL,
+    login TEXT NOT NULL,
+    contributions INTEGER NOT NULL,
+    PRIMARY KEY (repo, login)
+);
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    date TEXT,
+    committed_at TEXT,
+    author_name TEXT,
+    author_email TEXT,
+    author_login TEXT,
+    committer_name TEXT,
+    committer_email TEXT,
+    committer_login TEXT,
+    message TEXT,
+    url TEXT,
+    additions INTEGER,
+    deletions INTEGER,
+    changed_files INTEGER,
+    PRIMARY KEY (repo, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_repo_date ON commits (repo, date);
+CREATE INDEX IF NOT EXISTS commits_repo_committed ON commits (repo, committed_at);
+CREATE INDEX IF NOT EXISTS commits_author_login ON commits (author_login COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS commits_author_email ON commits (author_email COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS commits_sha ON commits (sha);
+CREATE TABLE IF NOT EXISTS commit_rollups (
+    repo TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    author TEXT NOT NULL,
+    commits INTEGER NOT NULL,
+    PRIMARY KEY (repo, period, bucket, author)
+);
+CREATE TABLE IF NOT EXISTS author_identities (
+    repo TEXT NOT NULL,
+    author TEXT NOT NULL,
+    login TEXT NOT NULL,
+    email TEXT NOT NULL,
+    name TEXT NOT NULL,
+    commits INTEGER NOT NULL,
+    PRIMARY KEY (repo, author, login, email, name)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repo TEXT PRIMARY KEY,
+    since TEXT,
+    until TEXT,
+    hwm_date TEXT,
+    hwm_sha TEXT
+);
+"""
+
+
+# Rollup buckets by author date: SQL expression of the bucket start, and the same in Python.
+ROLLUP_PERIODS: Dict[str, str] = {
+    "day": "substr({d}, 1, 10)",
+    "week": "date({d}, '-6 days', 'weekday 1')",  # Monday on or before
+    "month": "substr({d}, 1, 7) || '-01'",
+}
+# Per-author rollups are keyed on login, else email, else name (identity.author_key); author ''
+# holds the all-authors totals, so an empty value must never become the key.
+ROLLUP_AUTHOR = (
+    "COALESCE(NULLIF({r}.author_login, ''), NULLIF(lower({r}.author_email), ''), "
+    "NULLIF({r}.author_name, ''), 'unknown')"
+)
+
+
+def _rollup_upsert(r: str, delta: int) -> str:
+    values = []
+    for period, bucket in ROLLUP_PERIODS.items():
+        bucket = bucket.format(d=f"{r}.date")
+        values.append(f"({r}.repo, '{period}', {bucket}, '', {delta})")
+        values.append(f"({r}.repo, '{period}', {bucket}, {ROLLUP_AUTHOR.format(r=r)}, {delta})")
+    return (
+        "INSERT INTO commit_rollups (repo, period, bucket, author, commits) VALUES "
+        + ", ".join(values)
+        + " ON CONFLICT (repo, period, bucket, author) DO UPDATE SET commits = commits + excluded.commits;"
+    )
+
+
+# Rollups follow every change to `commits`, whoever writes it.
+ROLLUP_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS commits_rollup_insert AFTER INSERT ON commits
+WHEN NEW.date IS NOT NULL BEGIN
+    {_rollup_upsert("NEW", 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS commits_rollup_delete AFTER DELETE ON commits
+WHEN OLD.date IS NOT NULL BEGIN
+    {_rollup_upsert("OLD", -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS commits_rollup_update AFTER UPDATE OF date, author_login, author_email, author_name ON commits
+WHEN OLD.date IS NOT NEW.date OR OLD.author_login IS NOT NEW.author_login
+    OR OLD.author_email IS NOT NEW.author_email OR OLD.author_name IS NOT NEW.author_name BEGIN
+    {_rollup_upsert("OLD", -1)}
+    {_rollup_upsert("NEW", 1)}
+END;
+"""
+
+
+# Every distinct (login, email, name) an author key committed under, with its commit count:
+# the links identity.resolve_contributors() merges keys along. Kept by triggers like the rollups.
+IDENTITY_COLUMNS = (
+    "{r}.repo, " + ROLLUP_AUTHOR + ", COALESCE({r}.author_login, ''), lower(COALESCE({r}.author_email, '')), "
+    "COALESCE({r}.author_name, '')"
+)
+
+
+def _identity_upsert(r: str, delta: int) -> str:
+    return (
+        f"INSERT INTO author_identities (repo, author, login, email, name, commits) "
+        f"VALUES ({IDENTITY_COLUMNS.format(r=r)}, {delta}) "
+        f"ON CONFLICT (repo, author, login, email, name) DO UPDATE SET commits = commits + excluded.commits;"
+    )
+
+
+IDENTITY_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS commits_identity_insert AFTER INSERT ON commits BEGIN
+    {_identity_upsert("NEW", 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS commits_identity_delete AFTER DELETE ON commits BEGIN
+    {_identity_upsert("OLD", -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS commits_identity_update AFTER UPDATE OF author_login, author_email, author_name ON commits
+WHEN OLD.author_login IS NOT NEW.author_login OR OLD.author_email IS NOT NEW.author_email
+    OR OLD.author_name IS NOT NEW.author_name BEGIN
+    {_identity_upsert("OLD", -1)}
+    {_identity_upsert("NEW", 1)}
+END;
+"""
+
+
+# Trigram full-text index over commit messages (FTS5, SQLite >= 3.34), external-content: it
+# holds only the index and reads messages from `commits` by rowid. Triggers keep it current;
+# a VACUUM can renumber the rowids of `commits`, so rebuild_message_index() after one.
+MESSAGE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS commit_messages USING fts5(
+    message, content='commits', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS commits_messages_insert AFTER INSERT ON commits BEGIN
+    INSERT INTO commit_messages (rowid, message) VALUES (NEW.rowid, NEW.message);
+END;
+CREATE TRIGGER IF NOT EXISTS commits_messages_delete AFTER DELETE ON commits BEGIN
+    INSERT INTO commit_messages (commit_messages, rowid, message) VALUES ('delete', OLD.rowid, OLD.message);
+END;
+CREATE TRIGGER IF NOT EXISTS commits_messages_update AFTER UPDATE OF message ON commits
+WHEN OLD.message IS NOT NEW.message BEGIN
+    INSERT INTO commit_messages (commit_messages, rowid, message) VALUES ('delete', OLD.rowid, OLD.message);
+    INSERT INTO commit_messages (rowid, message) VALUES (NEW.rowid, NEW.message);
+END;
+"""
+
+
+def _fts_query(alternatives: List[List[str]]) -> str:
+    quote = lambda t: '"' + t.replace('"', '""') + '"'  # noqa: E731
+    return " OR ".join("(" + " AND ".join(quote(t) for t in terms) + ")" for terms in alternatives)
+
+
+def bucket_start(dt: datetime, period: str) -> date:
+    """Start of the rollup bucket holding `dt` (UTC), as ROLLUP_PERIODS computes it."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    d = dt.date()
+    if period == "week":
+        return d - timedelta(days=d.weekday())
+    if period == "month":
+        return d.replace(day=1)
+    return d
+
+
+def _dt(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else parse_iso(str(value))
+
+
+def _iso(value: Any) -> Optional[str]:
+    """
+    Normalize timestamps to 'YYYY-MM-DDTHH:MM:SSZ' (UTC) so string order is
+    time order and range queries can use the indexes.
+    """
+    if value is None:
+        return None
+    dt = as_utc(value)
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ") if dt else None
+
+
+class CommitStore:
+    """
+    Local SQLite store of everything fetched for every analyzed repo: repo
+    metadata, languages, contributors and flattened commit rows, plus the
+    incremental-sync state. Repos are keyed as 'owner/repo'.
+
+    One connection shared across threads, serialized by a lock; WAL mode keeps
+    readers in other processes unblocked.
+    """
+
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            have = {r["name"] for r in self.conn.execute("PRAGMA table_info(commits)")}
+            for c in STAT_FIELDS:
+                if c not in have:  # stores created before commit stats were kept
+                    self.conn.execute(f"ALTER TABLE commits ADD COLUMN {c} INTEGER")
+            fresh_rollups = self.conn.execute("SELECT 1 FROM commit_rollups LIMIT 1").fetchone() is None
+            if self._drop_stale_triggers():
+                fresh_rollups = True  # counted under an older author key
+            self.conn.executescript(ROLLUP_TRIGGERS)
+            fresh_identities = self.conn.execute("SELECT 1 FROM author_identities LIMIT 1").fetchone() is None
+            self.conn.executescript(IDENTITY_TRIGGERS)
+            fresh_index = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'commit_messages'"
+            ).fetchone() is None
+            try:
+                self.conn.executescript(MESSAGE_INDEX)
+                self.message_index = True
+            except sqlite3.OperationalError:  # SQLite without FTS5 or its trigram tokenizer
+                self.message_index = False
+        if fresh_rollups:
+            self.rebuild_rollups()  # stores created before rollups existed
+        elif fresh_identities:
+            self.rebuild_identities()  # ... or before author identities were kept
+        if fresh_index and self.message_index:
+            self.rebuild_message_index()  # ... or before the message index
+
+    def _drop_stale_triggers(self) -> bool:
+        """Drop rollup/identity triggers built with another ROLLUP_AUTHOR; True if there were any."""
+        row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'commits_rollup_insert'").fetchone()
+        if row is None or ROLLUP_AUTHOR.format(r="NEW") in row["sql"]:
+            return False
+        for table in ("rollup", "identity"):
+            for event in ("insert", "delete", "update"):
+                self.conn.execute(f"DROP TRIGGER IF EXISTS commits_{table}_{event}")
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    # ----- repo metadata -----
+    def save_repo(self, repo: str, meta: Dict) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repos (repo, meta, updated_at) VALUES (?, ?, ?)",
+                (repo, json.dumps(meta), time.time()),
+            )
+
+    def repo_meta(self, repo: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT meta FROM repos WHERE repo = ?", (repo,)).fetchone()
+        return json.loads(row["meta"]) if row else None
+
+    def repos(self) -> List[str]:
+        with self._lock:
+            return [r["repo"] for r in self.conn.execute("SELECT DISTINCT repo FROM commits ORDER BY repo")]
+
+    def save_languages(self, repo: str, languages: Dict[str, int]) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM languages WHERE repo = ?", (repo,))
+            self.conn.executemany(
+                "INSERT INTO languages (repo, language, bytes) VALUES (?, ?, ?)",
+                [(repo, k, int(v)) for k, v in languages.items()],
+            )
+
+    def languages(self, repo: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT language, bytes FROM languages WHERE repo = ? ORDER BY bytes DESC", (repo,)
+            ).fetchall()
+        return {r["language"]: r["bytes"] for r in rows}
+
+    def save_contributors(self, repo: str, contributors: Iterable[Dict]) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM contributors WHERE repo = ?", (repo,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO contributors (repo, login, contributions) VALUES (?, ?, ?)",
+                [
+                    (repo, c.get("login"), int(c.get("contributions") or 0))
+                    for c in contributors if c.get("login")
+                ],
+            )
+
+    def contributors(self, repo: str) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT login, contributions FROM contributors WHERE repo = ? ORDER BY contributions DESC",
+                (repo,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ----- commits -----
+    def add_commits(self, repo: str, rows: Iterable[Dict], batch: int = 1000) -> int:
+        """
+        Upsert flattened commit rows (RepoAnalyzer.iter_rows); returns how many
+        rows were written. Rows are consumed in batches, so a stream works.
+        """
+        with self.writer(repo, batch) as w:
+            for r in rows:
+                w.write(r)
+        return w.count
+
+    def writer(self, repo: str, batch: int = 1000) -> "CommitWriter":
+        return CommitWriter(self, repo, batch)
+
+    def insert_values(self, values: Iterable[tuple]) -> None:
+        """Raw upsert of (repo, *COMMIT_COLUMNS) tuples, dates already normalized."""
+        # an upsert rather than INSERT OR REPLACE: the replace path would skip the rollup triggers;
+        # stats survive a re-sync from a source without them (REST list pages)
+        sql = (
+            f"INSERT INTO commits (repo, {', '.join(COMMIT_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' for _ in COMMIT_COLUMNS)}) "
+            f"ON CONFLICT (repo, sha) DO UPDATE SET "
+            + ", ".join(
+                f"{c} = COALESCE(excluded.{c}, {c})" if c in STAT_FIELDS else f"{c} = excluded.{c}"
+                for c in COMMIT_COLUMNS if c != "sha"
+            )
+        )
+        with self._lock, self.conn:
+            self.conn.executemany(sql, values)
+
+    def query_commits(
+        self,
+        repo: Optional[str] = None,
+        since: Any = None,
+        until: Any = None,
+        author: Optional[str] = None,
+        by: str = "date",
+    ) -> List[CommitRow]:
+        """
+        Commits by window and author, newest first, straight from the indexes.
+        `repo=None` searches every stored repo; `author` is an exact login or
+        email (case-insensitive); `by` picks the date column ('date' = author
+        date, as exported; 'committed_at' = what the API's since/until use).
+        """
+        where, args = self._commit_where([repo] if repo else None, since, until, author, by)
+        sql = f"SELECT repo, {', '.join(COMMIT_COLUMNS)} FROM commits"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {by} DESC, sha DESC"
+        with self._lock:
+            return [CommitRow.from_mapping(r) for r in self.conn.execute(sql, args).fetchall()]
+
+    @staticmethod
+    def _commit_where(repos: Optional[List[str]], since: Any, until: Any, author: Optional[str], by: str):
+        if by not in ("date", "committed_at"):
+            raise ValueError(f"Unknown date column: {by}")
+        where, args = [], []
+        if repos:
+            where.append(f"repo IN ({', '.join('?' for _ in repos)})")
+            args.extend(repos)
+        if since is not None:
+            where.append(f"{by} >= ?")
+            args.append(_iso(since))
+        if until is not None:
+            where.append(f"{by} <= ?")
+            args.append(_iso(until))
+        if author:
+            where.append("(author_login = ? COLLATE NOCASE OR author_email = ? COLLATE NOCASE)")
+            args.extend([author, author])
+        return where, args
+
+    def search_commits(
+        self,
+        message_regex: str,
+        repos: Optional[List[str]] = None,
+        since: Any = None,
+        until: Any = None,
+        author: Optional[str] = None,
+        by: str = "committed_at",
+        limit: Optional[int] = None,
+        flags: int = re.IGNORECASE,
+    ) -> List[CommitRow]:
+        """
+        Commits whose message matches `message_regex`, across every stored repo
+        (or `repos`), newest first; other arguments as in query_commits. The
+        trigram index narrows the rows to those containing the substrings the
+        regex requires (planner.message_terms), and the regex only runs on
+        those; patterns without such substrings scan the window.
+        """
+        rx = compile_regex(message_regex, flags, "message")
+        where, args = self._commit_where(repos, since, until, author, by)
+        terms = message_terms(message_regex) if self.message_index and not flags & re.VERBOSE else None
+        if terms:
+            where.insert(0, "rowid IN (SELECT rowid FROM commit_messages WHERE commit_messages MATCH ?)")
+            args.insert(0, _fts_query(terms))
+        sql = f"SELECT repo, {', '.join(COMMIT_COLUMNS)} FROM commits"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {by} DESC, sha DESC"
+        found: List[CommitRow] = []
+        with self._lock:
+            for r in self.conn.execute(sql, args):
+                if rx.search(r["message"] or ""):
+                    found.append(CommitRow.from_mapping(r))
+                    if limit and len(found) >= limit:
+                        break
+        return found
+
+    def rebuild_message_index(self) -> None:
+        """Reindex every stored message (normally the triggers keep the index current)."""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO commit_messages (commit_messages) VALUES ('rebuild')")
+
+    def newest_commit(self, repo: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sha, committed_at FROM commits WHERE repo = ? "
+                "ORDER BY committed_at DESC, sha DESC LIMIT 1",
+                (repo,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    # ----- rollups -----
+    def rebuild_rollups(self, repo: Optional[str] = None) -> None:
+        """Recompute rollups from the commits table (normally the triggers keep them current)."""
+        where = "WHERE date IS NOT NULL" + (" AND repo = ?" if repo else "")
+        args = [repo] if repo else []
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM commit_rollups" + (" WHERE repo = ?" if repo else ""), args)
+            for period, bucket in ROLLUP_PERIODS.items():
+                bucket = bucket.format(d="date")
+                for author in ("''", ROLLUP_AUTHOR.format(r="commits")):
+                    self.conn.execute(
+                        f"INSERT INTO commit_rollups (repo, period, bucket, author, commits) "
+                        f"SELECT repo, '{period}', {bucket}, {author}, COUNT(*) FROM commits {where} "
+                        f"GROUP BY 1, 2, 3, 4",
+                        args,
+                    )
+
+        self.rebuild_identities(repo)
+
+    def rebuild_identities(self, repo: Optional[str] = None) -> None:
+        """Recompute author_identities from the commits table (normally the triggers keep it current)."""
+        where = " WHERE repo = ?" if repo else ""
+        args = [repo] if repo else []
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM author_identities" + where, args)
+            self.conn.execute(
+                f"INSERT INTO author_identities (repo, author, login, email, name, commits) "
+                f"SELECT {IDENTITY_COLUMNS.format(r='commits')}, COUNT(*) FROM commits{where} GROUP BY 1, 2, 3, 4, 5",
+                args,
+            )
+
+    def _bucket_range(self, period: str, since: Any, until: Any):
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown rollup period: {period}")
+        where, args = [], []
+        if since is not None:
+            where.append("bucket >= ?")
+            args.append(bucket_start(_dt(since), period).isoformat())
+        if until is not None:
+            where.append("bucket <= ?")
+            args.append(bucket_start(_dt(until), period).isoformat())
+        return where, args
+
+    def rollup(
+        self,
+        repo: str,
+        period: str = "day",
+        since: Any = None,
+        until: Any = None,
+        author: Optional[str] = None,
+    ) -> Dict[datetime, int]:
+        """
+        Commits per bucket (naive UTC bucket start -> count) for the buckets
+        overlapping [since, until], read from the rollups: cost is per bucket,
+        not per commit. Edge week/month buckets are counted whole.
+        """
+        where, args = self._bucket_range(period, since, until)
+        sql = (
+            "SELECT bucket, commits FROM commit_rollups WHERE repo = ? AND period = ? AND author = ? "
+            "AND commits > 0" + "".join(f" AND {w}" for w in where) + " ORDER BY bucket"
+        )
+        # author: a login or an email (stored lower-cased); None = all authors
+        key = (author.lower() if "@" in author else author) if author else ""
+        with self._lock:
+            rows = self.conn.execute(sql, [repo, period, key, *args]).fetchall()
+        return {datetime.fromisoformat(r["bucket"]): r["commits"] for r in rows}
+
+    def rollup_authors(
+        self,
+        repo: str,
+        since: Any = None,
+        until: Any = None,
+        limit: Optional[int] = None,
+        period: str = "day",
+    ) -> List[Dict]:
+        """Commit counts per author over the window, most active first (login or email as 'login')."""
+        where, args = self._bucket_range(period, since, until)
+        sql = (
+            "SELECT author AS login, SUM(commits) AS contributions FROM commit_rollups "
+            "WHERE repo = ? AND period = ? AND author != ''" + "".join(f" AND {w}" for w in where)
+            + " GROUP BY author HAVING contributions > 0 ORDER BY contributions DESC, author"
+        )
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(r) for r in self.conn.execute(sql, [repo, period, *args]).fetchall()]
+
+    def author_counts(self, repo: str, since: Any = None, until: Any = None) -> Dict[str, int]:
+        """
+        Commits per author key (login, else email, else name) with author date
+        in [since, until]: whole days from the day rollups, the two partial edge
+        days counted from the commits themselves, so the window is exact while
+        the cost stays per day, not per commit.
+        """
+        lo, hi = (as_utc(v) if v is not None else None for v in (since, until))
+        where, args = ["repo = ?", "period = 'day'", "author != ''"], [repo]
+        edges = []
+        if lo is not None:
+            where.append("bucket > ?")
+            args.append(bucket_start(lo, "day").isoformat())
+            edges.append(bucket_start(lo, "day"))
+        if hi is not None:
+            where.append("bucket < ?")
+            args.append(bucket_start(hi, "day").isoformat())
+            edges.append(bucket_start(hi, "day"))
+        author = ROLLUP_AUTHOR.format(r="commits")
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for r in self.conn.execute(
+                f"SELECT author, SUM(commits) AS n FROM commit_rollups WHERE {' AND '.join(where)} GROUP BY author",
+                args,
+            ):
+                counts[r["author"]] = r["n"]
+            for day in sorted(set(edges)):
+                start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+                first = max(start, lo) if lo is not None else start
+                last = min(start + timedelta(days=1), hi) if hi is not None else start + timedelta(days=1)
+                sql = (
+                    f"SELECT {author} AS author, COUNT(*) AS n FROM commits WHERE repo = ? AND date >= ? AND "
+                    + ("date <= ?" if hi is not None and day == bucket_start(hi, "day") else "date < ?")
+                    + " GROUP BY 1"
+                )
+                for r in self.conn.execute(sql, (repo, _iso(first), _iso(last))):
+                    counts[r["author"]] = counts.get(r["author"], 0) + r["n"]
+        return {k: n for k, n in counts.items() if n > 0}
+
+    def author_identities(self, repo: str) -> List[Identity]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT author, login, email, name, commits FROM author_identities WHERE repo = ? AND commits > 0",
+                (repo,),
+            ).fetchall()
+        return [Identity(*r) for r in rows]
+
+    def contributor_stats(
+        self,
+        repo: str,
+        since: Any = None,
+        until: Any = None,
+        mailmap: Optional[Mailmap] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        People who authored commits in [since, until], most active first, with
+        their several logins/emails/names merged (identity.resolve_contributors).
+        Both inputs are kept current by triggers: no rescan of the commits.
+        """
+        people = resolve_contributors(self.author_counts(repo, since, until), self.author_identities(repo), mailmap)
+        return people[:limit] if limit else people
+
+    # ----- sync state -----
+    def sync_state(self, repo: str) -> Dict[str, Optional[str]]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM sync_state WHERE repo = ?", (repo,)).fetchone()
+        return dict(row) if row else {}
+
+    def save_sync_state(
+        self,
+        repo: str,
+        since: Any,
+        until: Any,
+        hwm_date: Any = None,
+        hwm_sha: Optional[str] = None,
+    ) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (repo, since, until, hwm_date, hwm_sha) VALUES (?, ?, ?, ?, ?)",
+                (repo, _iso(since), _iso(until), _iso(hwm_date), hwm_sha),
+            )
+
+
+class CommitWriter:
+    """
+    Streaming sink (write(row) / close()) that batches commit rows into the
+    store, for use with util.fan_out next to the CSV sinks.
+    """
+
+    def __init__(self, store: CommitStore, repo: str, batch: int = 1000):
+        self.store = store
+        self.repo = repo
+        self.batch = batch
+        self.count = 0
+        self._buf: List[tuple] = []
+
+    def write(self, r: Dict) -> None:
+        self._buf.append((self.repo, *[
+            _iso(r.get(k)) if k in ("date", "committed_at") else r.get(k) for k in COMMIT_COLUMNS
+        ]))
+        self.count += 1
+        if len(self._buf) >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            self.store.insert_values(self._buf)
+            self._buf = []
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "CommitWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # rows that made it through are real commits; keep them even if the stream failed
+        self.close()
@@ -1,15 +1,21 @@
 from __future__ import annotations
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 
 from types import SimpleNamespace
 from src.controller import AppController
+from src.github_client import Cancelled
+
+MAX_MATCHES = 500  # matching commits listed live; the CSV export has them all
+POLL_MS = 100
 
 
 def launch_gui():
     app = tk.Tk()
     app.title("GitHub Repository Analyzer")
-    app.geometry("560x360")
+    app.geometry("760x600")
 
     frm = ttk.Frame(app, padding=12)
     frm.pack(fill="both", expand=True)
@@ -21,6 +27,7 @@ def launch_gui():
     msg_var = tk.StringVar()
     author_var = tk.StringVar()
     charts_var = tk.BooleanVar(value=True)
+    status_var = tk.StringVar(value="Idle.")
 
     def row(label, var, row_i):
         ttk.Label(frm, text=label).grid(column=0, row=row_i, sticky="w", pady=4)
@@ -38,32 +45,146 @@ def launch_gui():
     row("author regex", author_var, 4)
     ttk.Checkbutton(frm, text="Render charts", variable=charts_var).grid(column=1, row=5, sticky="w", pady=4)
 
+    bar = ttk.Frame(frm)
+    bar.grid(column=0, row=6, columnspan=2, sticky="we", pady=6)
+    bar.grid_columnconfigure(0, weight=1)
+    progress = ttk.Progressbar(bar, mode="indeterminate")
+    progress.grid(column=0, row=0, sticky="we", padx=(0, 8))
+    ttk.Label(frm, textvariable=status_var).grid(column=0, row=7, columnspan=2, sticky="w")
+
+    # Matching commits, listed as they stream through the export
+    matches = ttk.Treeview(frm, columns=("sha", "date", "author", "message"), show="headings", height=8)
+    for col, width in (("sha", 80), ("date", 90), ("author", 120), ("message", 400)):
+        matches.heading(col, text=col)
+        matches.column(col, width=width, stretch=col == "message")
+    matches.grid(column=0, row=8, columnspan=2, sticky="nsew", pady=(8, 0))
+
     out_text = tk.Text(frm, height=8)
-    out_text.grid(column=0, row=7, columnspan=2, sticky="nsew", pady=8)
-    frm.grid_rowconfigure(7, weight=1)
+    out_text.grid(column=0, row=9, columnspan=2, sticky="nsew", pady=8)
+    frm.grid_rowconfigure(8, weight=1)
+    frm.grid_rowconfigure(9, weight=1)
+
+    # The analysis runs on a worker thread; everything it reports (log lines from the
+    # controller, metrics events from the client) goes through this queue, and the Tk
+    # thread drains it every POLL_MS. Tk widgets are only ever touched from the Tk thread.
+    events: "queue.Queue" = queue.Queue()
+    ctrl = AppController(log=lambda msg: events.put(("log", msg)))
+    state = {"running": False, "listed": 0}
+    counts: dict = {}
+
+    def on_event(name, data):
+        # runs on whichever thread produced the event: only enqueue
+        if name == "match":
+            if state["listed"] >= MAX_MATCHES:
+                return
+            state["listed"] += 1
+        if name in ("page", "rows", "match", "cache", "retry", "rate_limit_wait"):
+            events.put((name, data))
+
+    ctrl.metrics.add_hook(on_event)
+
+    def show_status():
+        status_var.set(
+            f"pages {counts['pages']} · commits {counts['rows']} · matches {counts['filtered']} · "
+            f"cache hits {counts['cache_hits']}/{counts['cache_hits'] + counts['cache_misses']} · "
+            f"retries {counts['retries']} · rate-limit wait {counts['waited']:.1f}s"
+        )
+
+    def handle(name, data):
+        if name == "log":
+            out_text.insert(tk.END, data.lstrip("\n") + "\n")
+            out_text.see(tk.END)
+        elif name == "page":
+            counts["pages"] += 1
+        elif name == "rows":
+            counts["rows"] = data["rows"]
+            if data["filtered"] is not None:
+                counts["filtered"] = data["filtered"]
+        elif name == "match":
+            r = data["row"]
+            matches.insert("", tk.END, values=(
+                r.sha[:8], (r.date or "")[:10], r.author_login or r.author_name or "", r.message
+            ))
+        elif name == "cache":
+            counts["cache_hits" if data["hit"] else "cache_misses"] += 1
+        elif name == "retry":
+            counts["retries"] += 1
+        elif name == "rate_limit_wait":
+            counts["waited"] += data["seconds"]
+        elif name in ("done", "cancelled", "error"):
+            finish(name, data)
 
-    ctrl = AppController()
+    def poll():
+        try:
+            while True:
+                handle(*events.get_nowait())
+        except queue.Empty:
+            pass
+        if state["running"]:
+            show_status()
+        app.after(POLL_MS, poll)
+
+    def work(args):
+        try:
+            events.put(("done", ctrl.run_with_args(args)))
+        except Cancelled:
+            events.put(("cancelled", None))
+        except Exception as e:
+            events.put(("error", str(e)))
 
     def analyze():
         out_text.delete("1.0", tk.END)
+        matches.delete(*matches.get_children())
+        counts.update(pages=0, rows=0, filtered=0, cache_hits=0, cache_misses=0, retries=0, waited=0.0)
+        state.update(running=True, listed=0)
         args = SimpleNamespace(
             repo=repo_var.get().strip(),
             since=since_var.get().strip() or None,
             until=until_var.get().strip() or None,
             msg=msg_var.get().strip() or None,
             author=author_var.get().strip() or None,
-            path=None,        # future
+            path=None,
             charts=charts_var.get(),
             gui=False,
         )
-        try:
-            # Capture prints by temporarily redirecting stdout? Keep it simple: run and inform user
-            ctrl.run_with_args(args)
+        ctrl.client.reset_cancel()
+        analyze_btn.state(["disabled"])
+        cancel_btn.state(["!disabled"])
+        progress.start(15)
+        threading.Thread(target=work, args=(args,), name="analysis", daemon=True).start()
+
+    def cancel():
+        cancel_btn.state(["disabled"])
+        status_var.set("Cancelling ...")
+        ctrl.cancel()
+
+    def finish(outcome, data):
+        state["running"] = False
+        progress.stop()
+        analyze_btn.state(["!disabled"])
+        cancel_btn.state(["disabled"])
+        show_status()
+        if outcome == "done" and data.get("ok"):
             out_text.insert(tk.END, "Done. Check data/exports/ for outputs.\n")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        elif outcome == "done":
+            messagebox.showerror("Error", data.get("error") or "Analysis failed")
+        elif outcome == "cancelled":
+            # commits already exported are in the local store; pages fetched are cached for a rerun
+            out_text.insert(tk.END, f"Cancelled after {counts['rows']} commits ({counts['filtered']} matches).\n")
+        else:
+            messagebox.showerror("Error", data)
+        out_text.see(tk.END)
+
+    def on_close():
+        ctrl.cancel()
+        ctrl.close()
+        app.destroy()
 
-    btn = ttk.Button(frm, text="Analyze", command=analyze)
-    btn.grid(column=1, row=6, sticky="e", pady=6)
+    analyze_btn = ttk.Button(bar, text="Analyze", command=analyze)
+    analyze_btn.grid(column=1, row=0, padx=(0, 4))
+    cancel_btn = ttk.Button(bar, text="Cancel", command=cancel, state="disabled")
+    cancel_btn.grid(column=2, row=0)
 
+    app.protocol("WM_DELETE_WINDOW", on_close)
+    app.after(POLL_MS, poll)
     app.mainloop()
@@ -1,17 +1,25 @@
 from __future__ import annotations
+import csv
 import json
+import os
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 
 DATA_DIR = Path("data")
 CACHE_DIR = DATA_DIR / "cache"
+HTTP_CACHE_DIR = CACHE_DIR / "http"
 EXPORTS_DIR = DATA_DIR / "exports"
+STATE_DIR = DATA_DIR / "state"
+STORE_PATH = DATA_DIR / "store.sqlite3"
+MAILMAP_PATH = DATA_DIR / "mailmap"  # git .mailmap format: merges contributor identities
 
 
 def ensure_dirs() -> None:
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
     EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
 
 
 def cache_subdir(owner: str, repo: str) -> Path:
@@ -20,10 +28,40 @@ def cache_subdir(owner: str, repo: str) -> Path:
     return p
 
 
-def save_json(path: Path, obj: Any) -> None:
+def save_json(path: Path, obj: Any, indent: Optional[int] = None) -> None:
+    # compact by default (state files are read by code, not people); pass indent for pretty output
     path.parent.mkdir(parents=True, exist_ok=True)
+    separators = (",", ":") if indent is None else None
     with path.open("w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+        json.dump(obj, f, ensure_ascii=False, indent=indent, separators=separators)
+
+
+def load_json(path: Path, default: Any = None) -> Any:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def parse_iso(value: str) -> Optional[datetime]:
+    """
+    Parse GitHub-style ISO 8601 ('...Z' suffix allowed). Naive values are taken
+    as UTC so they compare cleanly with API timestamps.
+    """
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def as_utc(value: Any) -> Optional[datetime]:
+    """A datetime or ISO string as an aware UTC datetime (naive = UTC, as in parse_iso)."""
+    dt = value if isinstance(value, datetime) else parse_iso(str(value))
+    if dt is None:
+        return None
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
 
 
 def parse_link_header(link_header: str | None) -> Dict[str, str]:
@@ -53,10 +91,60 @@ def parse_link_header(link_header: str | None) -> Dict[str, str]:
 
 
 def write_csv(path: Path, rows: Iterable[Dict[str, Any]], field_order: Tuple[str, ...]) -> None:
-    import csv
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=list(field_order))
         w.writeheader()
         for r in rows:
             w.writerow({k: r.get(k) for k in field_order})
+
+
+class CsvSink:
+    """
+    Incremental CSV writer for streaming exports. Rows go to `<path>.part` and
+    the file is moved into place on a clean close, so a failed run never
+    leaves a truncated export behind.
+    """
+
+    def __init__(self, path: Path, field_order: Tuple[str, ...]):
+        self.path = path
+        self.field_order = field_order
+        self.count = 0
+        self._tmp = path.with_name(path.name + ".part")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self._tmp.open("w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        self._w.writerow(field_order)
+
+    def write(self, r: Any) -> None:
+        # dicts and models.CommitRow both answer .get()
+        self._w.writerow([r.get(k) for k in self.field_order])
+        self.count += 1
+
+    def close(self, ok: bool = True) -> None:
+        self._f.close()
+        if ok:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "CsvSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(ok=exc_type is None)
+
+
+def fan_out(rows: Iterable[Dict[str, Any]], routes: List[Tuple[Optional[Callable[[Dict], bool]], Any]]) -> int:
+    """
+    Single pass over `rows`, handing each row to every sink whose predicate
+    accepts it (None = take everything). Sinks only need a `write(row)` method.
+    Returns the number of rows seen.
+    """
+    n = 0
+    for r in rows:
+        n += 1
+        for pred, sink in routes:
+            if pred is None or pred(r):
+                sink.write(r)
+    return n
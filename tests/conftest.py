@@ -0,0 +1,36 @@
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fake_github import FakeGitHub, serve
+
+END = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Every test in its own directory: data/ (cache, store, state, exports) is relative to it."""
+    monkeypatch.chdir(tmp_path)
+    for var in ("GITHUB_TOKEN", "GITHUB_TOKENS"):
+        monkeypatch.setenv(var, "")  # set, so load_dotenv won't fill in real credentials
+    return tmp_path
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """Start a fake GitHub API (benchmarks/fake_github.py): github(**FakeGitHub kwargs) -> FakeGitHub."""
+    servers = []
+
+    def start(commits: int = 500, step: timedelta = timedelta(hours=6), end: datetime = END, **kw) -> FakeGitHub:
+        gh = FakeGitHub(commits=commits, step=step, end=end, **kw)
+        srv, base = serve(gh)
+        servers.append(srv)
+        monkeypatch.setenv("GITHUB_API_URL", base)
+        return gh
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
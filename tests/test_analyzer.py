@@ -0,0 +1,72 @@
+from __future__ import annotations
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.analyzer import RepoAnalyzer
+from src.github_client import GitHubClient
+
+SINCE, UNTIL = datetime(2024, 5, 1, tzinfo=timezone.utc), datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+
+def track_in_flight(client: GitHubClient) -> dict:
+    """Wrap client._fetch to record the most requests it ever had in flight at once."""
+    fetch, lock, seen = client._fetch, threading.Lock(), {"now": 0, "max": 0}
+
+    def counted(*args, **kwargs):
+        with lock:
+            seen["now"] += 1
+            seen["max"] = max(seen["max"], seen["now"])
+        try:
+            return fetch(*args, **kwargs)
+        finally:
+            with lock:
+                seen["now"] -= 1
+
+    client._fetch = counted
+    return seen
+
+
+def test_sharded_fetch_keeps_at_most_workers_requests_in_flight(github):
+    gh = github(commits=6000, step=timedelta(minutes=15), latency=0.005)  # 7 pages per weekly shard
+    client = GitHubClient(max_workers=4)
+    seen = track_in_flight(client)
+    commits = RepoAnalyzer(client, "o", "r").fetch_commits_sharded(SINCE, UNTIL, "weekly")
+    assert seen["max"] <= 4
+    expected = gh.window({"since": [SINCE.isoformat()], "until": [UNTIL.isoformat()]})
+    assert [c["sha"] for c in commits] == ["%040x" % k for k in expected]
+
+
+def test_files_are_filled_in_order_once_per_sha(github):
+    gh = github(commits=300)
+    a = RepoAnalyzer(GitHubClient(max_workers=4), "o", "r")
+    rows = a.commits_to_rows(a.fetch_commits())
+    want = lambda r: int(r.sha, 16) % 3 == 0  # noqa: E731
+    before = gh.stats()["requests"]
+    out = list(a.iter_with_files(rows, want=want, chunk=40))
+    assert [r.sha for r in out] == [r.sha for r in rows]
+    for r in out:
+        k = int(r.sha, 16)
+        assert r.files == (tuple(gh.files(k)) if want(r) else None)
+    assert gh.stats()["requests"] - before == 100
+
+    # file lists are kept per sha: a later run (new analyzer) asks for none of them again
+    again = RepoAnalyzer(GitHubClient(), "o", "r")
+    assert list(again.iter_with_files(rows, want=want)) == out
+    assert gh.stats()["requests"] - before == 100
+
+
+def test_files_are_fetched_one_chunk_at_a_time(github):
+    github(commits=300)
+    a = RepoAnalyzer(GitHubClient(), "o", "r")
+    rows = a.commits_to_rows(a.fetch_commits())
+    pulled = []
+
+    def source():
+        for r in rows:
+            pulled.append(r.sha)
+            yield r
+
+    out = a.iter_with_files(source(), chunk=25)
+    next(out)
+    assert len(pulled) == 25  # the rest of the input is not read (or fetched) yet
+    assert len(list(out)) == 299
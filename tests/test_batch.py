@@ -0,0 +1,60 @@
+from __future__ import annotations
+import csv
+from types import SimpleNamespace
+
+import pytest
+
+from src.controller import AppController
+from src.util import EXPORTS_DIR
+
+REPOS = ["o/a", "not-a-repo", "o/b", "o/c"]
+
+
+def batch_args(**kw) -> SimpleNamespace:
+    args = dict(
+        repo=None, since="2024-06-01T00:00:00Z", until="2024-07-01T00:00:00Z", msg="fix", author=None, path=None,
+        charts=False, parquet=False, incremental=False, local=False, shard=None, engine="rows", backend="rest",
+    )
+    args.update(kw)
+    return SimpleNamespace(**args)
+
+
+@pytest.fixture
+def batch(github):
+    """(fake API, controller): the controller's client is built after the fake is up."""
+    gh = github()
+    controllers = []
+
+    def controller() -> AppController:
+        controllers.append(AppController(log=lambda msg: None))
+        return controllers[-1]
+
+    yield gh, controller
+    for c in controllers:
+        c.close()
+
+
+@pytest.mark.parametrize("backend", ["rest", "graphql"])
+def test_batch_reports_every_repo_in_order_and_isolates_failures(batch, backend):
+    gh, controller = batch
+    results = controller().run_batch(batch_args(backend=backend), REPOS, workers=3)
+    assert [r["repo"] for r in results] == REPOS
+    assert [r["ok"] for r in results] == [True, False, True, True]
+    window = len(gh.window({"since": ["2024-06-01T00:00:00Z"], "until": ["2024-07-01T00:00:00Z"]}))
+    assert {r["commits"] for r in results if r["ok"]} == {window}
+    assert "owner/repo" in results[1]["error"]
+    for name in ("a", "b", "c"):
+        assert (EXPORTS_DIR / f"o_{name}_commits.csv").exists()
+    with open(EXPORTS_DIR / "batch_summary.csv", newline="", encoding="utf-8") as f:
+        summary = list(csv.DictReader(f))
+    assert [(r["repo"], r["ok"]) for r in summary] == [(r, str(r != "not-a-repo")) for r in REPOS]
+
+
+def test_graphql_batch_fetches_repo_metadata_in_one_query(batch):
+    _, controller = batch
+    many, one = controller(), controller()
+    many.run_batch(batch_args(backend="graphql"), ["o/a", "o/b", "o/c"], workers=3)
+    one.run_batch(batch_args(backend="graphql"), ["o/d"], workers=1)
+    count = lambda c: c.metrics.snapshot()["requests"]["count"]  # noqa: E731
+    # one shared metadata query for the three repos instead of one each
+    assert count(many) == 1 + 3 * (count(one) - 1)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from src import cache as cache_mod
+from src.cache import ResponseCache, _Segment, canonical_url, endpoint_of
+from src.github_client import GitHubClient
+
+KEYS = ["%040x" % i for i in range(4)]
+
+
+@pytest.fixture
+def segment(tmp_path) -> _Segment:
+    return _Segment(tmp_path / "s.seg")
+
+
+def test_segment_append_read_and_reopen(segment):
+    segment.append(KEYS[0], b"first")
+    segment.append(KEYS[1], b"second")
+    segment.append(KEYS[0], b"first, rewritten")
+    assert segment.read(KEYS[0]) == b"first, rewritten"
+    assert segment.read(KEYS[1]) == b"second"
+    assert segment.read(KEYS[2]) is None
+    reopened = _Segment(segment.path)
+    assert reopened.index == segment.index
+    assert (reopened.size, reopened.live) == (segment.size, segment.live)
+    assert reopened.live < reopened.size  # the first record is dead
+
+
+def test_segment_rebuilds_a_lost_index_and_drops_a_torn_record(segment):
+    segment.append(KEYS[0], b"kept")
+    segment.append(KEYS[1], b"torn")
+    with segment.path.open("r+b") as f:
+        f.truncate(segment.size - 2)
+    segment.idx_path.unlink()
+    reopened = _Segment(segment.path)
+    assert reopened.read(KEYS[0]) == b"kept"
+    assert KEYS[1] not in reopened.index
+    assert reopened.path.stat().st_size == reopened.size
+
+
+def test_segment_compaction_keeps_only_live_records(segment, monkeypatch):
+    monkeypatch.setattr(cache_mod, "COMPACT_MIN_BYTES", 100)
+    segment.append(KEYS[0], b"x" * 60)
+    assert not segment.needs_compaction()  # under the minimum size
+    segment.append(KEYS[1], b"z" * 10)
+    segment.append(KEYS[0], b"y" * 60)
+    assert not segment.needs_compaction()  # not yet half dead
+    segment.append(KEYS[0], b"w" * 60)
+    assert segment.needs_compaction()
+    segment.compact()
+    assert segment.size == segment.live == segment.path.stat().st_size
+    assert segment.read(KEYS[0]) == b"w" * 60
+    assert segment.read(KEYS[1]) == b"z" * 10
+    assert _Segment(segment.path).index == segment.index
+
+
+def test_segment_expiry_follows_its_record(segment, monkeypatch):
+    monkeypatch.setattr(cache_mod, "COMPACT_MIN_BYTES", 0)
+    segment.append(KEYS[0], b"x" * 60)
+    segment.append(KEYS[1], b"y" * 60)
+    segment.append(KEYS[1], b"z" * 60)
+    size = segment.size
+    segment.set_expiry(KEYS[0], 123.5)
+    segment.set_expiry(KEYS[1], None)
+    assert segment.size == size  # no record written
+    segment.compact()
+    assert segment.override(KEYS[0]) == (segment.index[KEYS[0]][0], 123.5)
+    assert _Segment(segment.path).override(KEYS[1]) == (segment.index[KEYS[1]][0], None)
+    segment.append(KEYS[0], b"w" * 60)  # a new body brings its own expiry
+    assert segment.override(KEYS[0]) is None
+    assert _Segment(segment.path).override(KEYS[0]) is None
+
+
+def test_keys_and_segments_ignore_param_order():
+    a = canonical_url("https://api/repos/o/r/commits?page=2", {"per_page": 100, "since": None})
+    b = canonical_url("https://api/repos/o/r/commits?per_page=100&page=2")
+    assert a == b
+    assert endpoint_of("https://api/repos/o/r/commits/abc") == endpoint_of(a) == "/repos/o/r/commits"
+
+
+def test_ttl_for_endpoints_and_closed_windows(tmp_path):
+    c = ResponseCache(tmp_path / "cache")
+    commits = "https://api/repos/o/r/commits"
+    assert c.ttl_for(f"{commits}/{'a' * 40}") is None
+    assert c.ttl_for("https://api/repos/o/r") == 6 * 3600
+    assert c.ttl_for(commits, {"since": "2024-01-01T00:00:00Z"}) == 600
+    assert c.ttl_for(commits, {"until": "2024-01-01T00:00:00Z"}) is None  # closed: can't change
+    assert c.ttl_for(commits, {"until": "2999-01-01T00:00:00Z"}) == 600
+
+
+def test_entries_survive_a_new_cache_instance(tmp_path):
+    url, params = "https://api/repos/o/r/commits", {"page": 1}
+    ResponseCache(tmp_path / "cache").put(url, params, [{"sha": "a"}], links={"next": "n"}, etag='"t"')
+    entry = ResponseCache(tmp_path / "cache").get(url, params)
+    assert entry["body"] == [{"sha": "a"}]
+    assert (entry["links"], entry["etag"]) == ({"next": "n"}, '"t"')
+    assert ResponseCache.is_fresh(entry)
+
+
+def test_stale_entries_are_revalidated_with_their_etag(github):
+    gh = github()
+    stale = ResponseCache(Path("data/cache"), ttls=[(r".*", 0)])  # every entry stale as soon as stored
+    client = GitHubClient(cache=stale)
+    first = client.get("/repos/o/r")
+    assert client.get("/repos/o/r") == first
+    assert gh.stats()["requests"] == 2 and gh.stats()["not_modified"] == 1
+    assert client.metrics.snapshot()["cache"]["revalidated"] == 1
+
+
+def test_fresh_entries_cost_no_request(github):
+    gh = github()
+    client = GitHubClient()
+    first = client.get("/repos/o/r")
+    assert GitHubClient().get("/repos/o/r") == first  # a new client, same on-disk cache
+    assert gh.stats()["requests"] == 1
+
+
+def test_revalidation_restarts_the_ttl_without_rewriting_the_body(github):
+    gh = github()
+    root = Path("data/cache")
+    GitHubClient(cache=ResponseCache(root, ttls=[(r".*", 0)])).get("/repos/o/r")  # stored already stale
+    seg_bytes = sum(p.stat().st_size for p in root.glob("*.seg"))
+
+    cache = ResponseCache(root, ttls=[(r".*", 3600)])
+    first = GitHubClient(cache=cache).get("/repos/o/r")
+    assert gh.stats()["not_modified"] == 1
+    assert sum(p.stat().st_size for p in root.glob("*.seg")) == seg_bytes
+    assert cache.size() == sum(p.stat().st_size for p in root.iterdir() if p.is_file())
+
+    cache.compact()
+    assert GitHubClient(cache=ResponseCache(root, ttls=[(r".*", 3600)])).get("/repos/o/r") == first
+    assert gh.stats()["requests"] == 2  # fresh again: served from the cache
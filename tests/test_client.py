@@ -0,0 +1,95 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.cache import ResponseCache
+from src.github_client import CURSORS_DIR, GitHubClient
+
+COMMITS = "/repos/o/r/commits"
+PARAMS = {"per_page": "100"}
+
+
+def shas(pages):
+    return [c["sha"] for page in pages for c in page]
+
+
+def stale_client(workers: int) -> GitHubClient:
+    # every cached page is stale at once: only a resume may use one without asking the API
+    return GitHubClient(cache=ResponseCache(Path("data/cache/http"), ttls=[(r".*", 0)]), max_workers=workers)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_interrupted_walk_resumes_after_the_last_completed_page(github, workers):
+    gh = github(commits=1000)  # 10 pages
+    expected = ["%040x" % k for k in range(1000)]
+
+    walk = stale_client(workers).iter_pages(COMMITS, PARAMS)
+    done = [next(walk) for _ in range(4)]
+    walk.close()  # the run dies after page 4
+    assert len(list(CURSORS_DIR.glob("*.json"))) == 1
+
+    before = gh.stats()["requests"]
+    resumed = list(stale_client(workers).iter_pages(COMMITS, PARAMS))
+    assert shas(resumed) == expected  # nothing skipped, nothing twice
+    assert resumed[:4] == done
+    assert gh.stats()["requests"] - before == 6  # pages 5..10 only; 1..4 replayed from the cache
+    assert list(CURSORS_DIR.glob("*.json")) == []
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_a_completed_walk_leaves_no_cursor_to_resume(github, workers):
+    gh = github(commits=1000)
+    list(stale_client(workers).iter_pages(COMMITS, PARAMS))
+    before = gh.stats()["requests"]
+    assert len(shas(stale_client(workers).iter_pages(COMMITS, PARAMS))) == 1000
+    assert gh.stats()["requests"] - before == 10  # stale pages are all revalidated
+    assert gh.stats()["not_modified"] == 10
+
+
+def jittered(client: GitHubClient) -> dict:
+    """Make page fetches finish out of order; record the most in flight at once."""
+    fetch, lock, seen = client._fetch, threading.Lock(), {"now": 0, "max": 0}
+
+    def slow(*args, **kwargs):
+        with lock:
+            seen["now"] += 1
+            seen["max"] = max(seen["max"], seen["now"])
+        try:
+            time.sleep(random.uniform(0, 0.02))
+            return fetch(*args, **kwargs)
+        finally:
+            with lock:
+                seen["now"] -= 1
+
+    client._fetch = slow
+    return seen
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_prefetched_pages_arrive_in_order_and_complete(github, workers):
+    gh = github(commits=1234)  # 13 pages, the last one short
+    client = GitHubClient(max_workers=workers)
+    seen = jittered(client)
+    pages = list(client.iter_pages(COMMITS, PARAMS))
+    assert [len(p) for p in pages] == [100] * 12 + [34]
+    assert shas(pages) == ["%040x" % k for k in range(1234)]
+    assert gh.stats()["requests"] == 13
+    assert seen["max"] <= workers
+
+
+def test_prefetch_stays_within_a_window_of_pages(github):
+    github(commits=2000)  # 20 pages
+    client = GitHubClient(max_workers=3)
+    seen = jittered(client)
+    walk = client.iter_pages(COMMITS, PARAMS)
+    next(walk)
+    next(walk)
+    time.sleep(0.1)  # let every submitted fetch finish
+    requested = client.metrics.snapshot()["requests"]["count"]
+    assert requested <= 2 + 3  # the pages taken plus at most one window ahead, not all 20
+    walk.close()
+    assert seen["max"] <= 3
@@ -0,0 +1,37 @@
+from __future__ import annotations
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from src.controller import AppController  # noqa: E402
+from src.util import EXPORTS_DIR  # noqa: E402
+
+
+def run(engine: str, backend: str, **kw) -> dict:
+    args = dict(
+        repo="o/r", since="2024-05-01T00:00:00Z", until="2024-07-01T00:00:00Z", msg="fix|feat", author=None,
+        path=None, charts=False, parquet=False, incremental=False, local=False, shard=None, engine=engine,
+        backend=backend,
+    )
+    args.update(kw)
+    controller = AppController(log=lambda msg: None)
+    try:
+        assert controller.run_with_args(SimpleNamespace(**args))["ok"]
+    finally:
+        controller.close()
+    return {
+        name: (EXPORTS_DIR / f"o_r_{name}.csv").read_bytes() for name in ("commits", "commits_filtered")
+    }
+
+
+@pytest.mark.parametrize("backend", ["rest", "graphql"])
+def test_pandas_engine_writes_the_same_bytes_as_the_row_engine(github, backend):
+    github(commits=600)
+    rows = run("rows", backend)
+    frames = run("pandas", backend)
+    assert rows["commits"].count(b"\r\n") > 200
+    assert frames == rows
+    header = rows["commits"].split(b"\r\n", 1)[0]
+    assert header.endswith(b",url,additions,deletions,changed_files" if backend == "graphql" else b",url")
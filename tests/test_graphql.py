@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+
+from src.analyzer import RepoAnalyzer
+from src.github_client import GitHubClient
+from src.graphql_backend import GraphQLRepoAnalyzer, prefetch_repos
+from src.models import STAT_FIELDS
+
+SINCE, UNTIL = "2024-05-01T00:00:00Z", "2024-06-15T00:00:00Z"
+
+
+@pytest.fixture
+def backends(github):
+    gh = github(commits=600)
+    client = GitHubClient()
+    return gh, RepoAnalyzer(client, "o", "r"), GraphQLRepoAnalyzer(client, "o", "r")
+
+
+def rows(analyzer, **kw):
+    """Commit rows without the stats, which only GraphQL list pages carry."""
+    out = []
+    for r in analyzer.commits_to_rows(analyzer.iter_commits(**kw)):
+        d = r._asdict()
+        for f in STAT_FIELDS:
+            d.pop(f)
+        out.append(d)
+    return out
+
+
+def test_history_pages_match_rest(backends):
+    gh, rest, graphql = backends
+    pages = list(graphql.iter_commit_pages())
+    assert [len(p) for p in pages] == [100] * 6
+    assert rows(graphql) == rows(rest)
+    assert len(rows(graphql)) == gh.commits
+
+
+def test_since_until_window_matches_rest(backends):
+    gh, rest, graphql = backends
+    got = rows(graphql, since=SINCE, until=UNTIL)
+    assert got == rows(rest, since=SINCE, until=UNTIL)
+    assert len(got) == len(gh.window({"since": [SINCE], "until": [UNTIL]})) > 100
+
+
+@pytest.mark.parametrize("author", ["dev3", "dev3@example.com"])
+def test_author_maps_to_the_same_commits(backends, author):
+    _, rest, graphql = backends
+    got = rows(graphql, since=SINCE, until=UNTIL, author=author)
+    assert got and all(r["author_login"] == "dev3" for r in got)
+    assert got == rows(rest, since=SINCE, until=UNTIL, author=author)
+
+
+def test_unknown_login_has_no_commits_and_no_history_request(backends):
+    gh, _, graphql = backends
+    before = gh.stats()["requests"]
+    assert rows(graphql, author="nobody") == []
+    assert gh.stats()["requests"] == before + 1  # the user lookup only
+
+
+def test_repo_metadata_matches_rest(backends):
+    gh, rest, graphql = backends
+    info, rest_info = graphql.fetch_repo(), rest.fetch_repo()
+    assert {k: info[k] for k in rest_info} == rest_info
+    before = gh.stats()["requests"]
+    assert graphql.fetch_languages() == rest.fetch_languages()
+    assert gh.stats()["requests"] == before + 1  # the REST call; GraphQL's came with the repo query
+
+
+def test_prefetch_batches_repos_and_skips_bad_names(backends):
+    gh, _, _ = backends
+    client = GitHubClient()
+    before = gh.stats()["requests"]
+    found = prefetch_repos(client, ["o/r", "o/s", "not-a-repo", "o/t"], batch=2)
+    assert sorted(found) == ["o/r", "o/s", "o/t"]
+    assert gh.stats()["requests"] == before + 2
+    analyzer = GraphQLRepoAnalyzer(client, "o", "s", prefetched=found["o/s"])
+    assert analyzer.fetch_repo()["full_name"] == "o/s"
+    assert gh.stats()["requests"] == before + 2
@@ -0,0 +1,136 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from src.identity import ContributorTally, Identity, Mailmap, author_key, resolve_contributors
+from src.models import CommitRow
+from src.store import CommitStore
+
+MAILMAP = """
+# comment line
+Jane Doe <jane@example.com>
+<jane@example.com> <jdoe@old.example.com>
+Jane Doe <jane@example.com> Janie <janie@laptop.local>
+Proper Bob <bob@example.com> Bobby <bob@WORK.example.com>  # trailing comment
+not a mailmap line
+"""
+
+
+def ident(login="", email="", name="", commits=1) -> Identity:
+    return Identity(author_key(login, email, name), login, email, name, commits)
+
+
+def test_mailmap_line_forms():
+    mm = Mailmap.parse(MAILMAP)
+    assert len(mm) == 4
+    assert mm.lookup("J", "jane@example.com") == ("Jane Doe", None)  # name only
+    assert mm.lookup("J", "JDOE@old.example.com") == (None, "jane@example.com")  # email only
+    assert mm.lookup("janie", "janie@laptop.local") == ("Jane Doe", "jane@example.com")
+    assert mm.lookup("Someone", "janie@laptop.local") == (None, None)  # name + email entry needs both
+    assert mm.lookup("BOBBY", "bob@work.example.com") == ("Proper Bob", "bob@example.com")
+    assert mm.lookup("x", None) == (None, None)
+
+
+def test_mailmap_load_of_a_missing_file_is_empty(tmp_path):
+    assert len(Mailmap.load(tmp_path / "missing")) == 0
+
+
+def test_login_links_all_its_emails():
+    people = resolve_contributors(
+        {"jane": 3, "jane@home.example.com": 2, "jane@work.example.com": 1},
+        [
+            ident("jane", "jane@home.example.com", "Jane", 3),
+            ident("", "jane@home.example.com", "Jane", 2),
+            ident("", "jane@work.example.com", "J. Doe", 1),
+            ident("jane", "jane@work.example.com", "J. Doe", 1),  # the link is outside the window
+        ],
+    )
+    assert people == [{
+        "login": "jane", "name": "Jane", "emails": ["jane@home.example.com", "jane@work.example.com"],
+        "contributions": 6,
+    }]
+
+
+def test_noreply_email_names_its_login():
+    people = resolve_contributors(
+        {"bob": 1, "123+bob@users.noreply.github.com": 4},
+        [ident("bob", "bob@example.com", "Bob"), ident("", "123+bob@users.noreply.github.com", "Bob", 4)],
+    )
+    assert [(p["login"], p["contributions"]) for p in people] == [("bob", 5)]
+
+
+def test_names_alone_never_merge():
+    people = resolve_contributors(
+        {"a@example.com": 2, "b@example.com": 1},
+        [ident("", "a@example.com", "Sam", 2), ident("", "b@example.com", "Sam", 1)],
+    )
+    assert [p["emails"] for p in people] == [["a@example.com"], ["b@example.com"]]
+
+
+def test_mailmap_merges_and_names_people():
+    counts = {"jane@example.com": 1, "jdoe@old.example.com": 2, "janie@laptop.local": 3}
+    identities = [
+        ident("", "jane@example.com", "jane", 1),
+        ident("", "jdoe@old.example.com", "JD", 2),
+        ident("", "janie@laptop.local", "Janie", 3),
+    ]
+    assert len(resolve_contributors(counts, identities)) == 3
+    people = resolve_contributors(counts, identities, Mailmap.parse(MAILMAP))
+    assert len(people) == 1
+    assert (people[0]["name"], people[0]["contributions"]) == ("Jane Doe", 6)
+    assert people[0]["emails"] == ["jane@example.com", "janie@laptop.local", "jdoe@old.example.com"]
+
+
+def test_tally_counts_rows_per_identity():
+    tally = ContributorTally()
+    for r in [
+        CommitRow(sha="1", author_login="jane", author_email="Jane@Example.com", author_name="Jane"),
+        CommitRow(sha="2", author_email="jane@example.com", author_name="Jane"),
+        CommitRow(sha="3", author_name="Anon"),
+    ]:
+        tally.write(r)
+    people = tally.contributors()
+    assert [(p["login"], p["contributions"]) for p in people] == [("jane", 2), ("Anon", 1)]
+
+
+@pytest.fixture
+def store():
+    s = CommitStore(Path("data/store.sqlite3"))
+    yield s
+    s.close()
+
+
+def commit(sha: str, date: str, login: str = "", email: str = "", name: str = "") -> CommitRow:
+    return CommitRow(sha=sha, date=date, author_login=login, author_email=email, author_name=name)
+
+
+def test_author_counts_are_exact_on_partial_edge_days(store):
+    store.add_commits("o/r", [
+        commit("1", "2024-01-01T08:00:00Z", "a"),
+        commit("2", "2024-01-01T18:00:00Z", "a"),
+        commit("3", "2024-01-02T12:00:00Z", "b"),
+        commit("4", "2024-01-03T06:00:00Z", "a"),
+        commit("5", "2024-01-03T23:00:00Z", "b"),
+    ])
+    assert store.author_counts("o/r") == {"a": 3, "b": 2}
+    assert store.author_counts("o/r", "2024-01-01T12:00:00Z", "2024-01-03T06:00:00Z") == {"a": 2, "b": 1}
+    assert store.author_counts("o/r", "2024-01-02T00:00:00+02:00", "2024-01-02T12:00:00Z") == {"b": 1}
+    assert store.author_counts("o/r", "2024-01-03T07:00:00Z", "2024-01-03T08:00:00Z") == {}
+
+
+def test_contributor_stats_follow_new_and_updated_commits(store):
+    store.add_commits("o/r", [
+        commit("1", "2024-01-01T00:00:00Z", "", "jane@example.com", "Jane"),
+        commit("2", "2024-01-02T00:00:00Z", "", "jane@example.com", "Jane"),
+    ])
+    assert [p["login"] for p in store.contributor_stats("o/r")] == ["Jane"]
+    # a later commit with a login links the email to it
+    store.add_commits("o/r", [commit("3", "2024-01-03T00:00:00Z", "jane", "jane@example.com", "Jane")])
+    assert [(p["login"], p["contributions"]) for p in store.contributor_stats("o/r")] == [("jane", 3)]
+    # re-syncing a commit under another author moves its count
+    store.add_commits("o/r", [commit("1", "2024-01-01T00:00:00Z", "bob", "bob@example.com", "Bob")])
+    people = store.contributor_stats("o/r")
+    assert [(p["login"], p["contributions"]) for p in people] == [("jane", 2), ("bob", 1)]
+    assert store.contributor_stats("o/r", limit=1) == people[:1]
+    assert store.contributor_stats("o/r", since="2024-01-02T00:00:00Z")[0]["contributions"] == 2
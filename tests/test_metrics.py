@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from src.metrics import Metrics
+
+
+def budget_headers(remaining: int, reset: int = 1000) -> dict:
+    return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(reset), "Content-Length": "100"}
+
+
+def test_rate_limit_budgets_are_tracked_per_token():
+    m = Metrics()
+    # two tokens, same resource and reset time: 3 requests on token 0, 2 on token 1
+    for remaining in (4999, 4998, 4997):
+        m.request("u", 200, 0.01, 300, budget_headers(remaining), token=0)
+    for remaining in (4999, 4998):
+        m.request("u", 200, 0.01, 300, budget_headers(remaining), token=1)
+    assert m.snapshot()["rate_limit"]["budget_used"] == 5
+
+
+def test_bytes_are_reported_decoded_and_on_the_wire():
+    m = Metrics()
+    m.request("u", 200, 0.01, 300, budget_headers(10))
+    m.request("u", 0, 0.01, 0)  # connection error: no response at all
+    report = m.snapshot()["requests"]
+    assert (report["body_bytes"], report["wire_bytes"]) == (300, 100)
+
+
+def test_client_reports_wire_bytes(github):
+    from src.github_client import GitHubClient
+
+    github(commits=50)
+    client = GitHubClient(cache=None)
+    client.get("/repos/o/r")
+    report = client.metrics.snapshot()["requests"]
+    assert report["count"] == 1 and report["wire_bytes"] > 0 and report["body_bytes"] > 0
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.models import CommitRow, STORED_FIELDS  # noqa: E402
+from src.parquet_export import ParquetSink  # noqa: E402
+
+ROOT = Path("data/exports/o_r_commits.parquet")
+
+
+def row(k: int, **kw) -> CommitRow:
+    return CommitRow(
+        sha="%040x" % k, date=f"2024-01-{k:02d}T10:00:00Z", committed_at=f"2024-01-{k:02d}T11:30:00Z",
+        author_name=f"Dev {k % 2}", author_email=f"dev{k % 2}@example.com", author_login=f"dev{k % 2}",
+        message=f"change {k}", **kw,
+    )
+
+
+def export(rows, append: bool) -> ParquetSink:
+    with ParquetSink(ROOT, append=append, batch=2) as sink:
+        for r in rows:
+            sink.write(r)
+    return sink
+
+
+def dataset():
+    return pq.read_table(ROOT).sort_by("sha")
+
+
+def test_round_trip_keeps_types_and_values():
+    export([row(1, additions=3, deletions=1, changed_files=2), row(2), row(3)], append=False)
+    table = dataset()
+    assert table.column_names == list(STORED_FIELDS)
+    date_type = table.schema.field("date").type  # written as timestamp[s]; Parquet keeps it in ms
+    assert pa.types.is_timestamp(date_type) and date_type.tz == "UTC"
+    assert str(table.schema.field("author_login").type) == "dictionary<values=string, indices=int32, ordered=0>"
+    first = table.slice(0, 1).to_pylist()[0]
+    assert first["date"] == datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+    assert first["committed_at"] == datetime(2024, 1, 1, 11, 30, tzinfo=timezone.utc)
+    assert (first["author_login"], first["additions"], first["changed_files"]) == ("dev1", 3, 2)
+    assert table.column("additions").to_pylist()[1:] == [None, None]
+
+
+def test_replace_mode_drops_earlier_parts():
+    export([row(1), row(2)], append=False)
+    sink = export([row(3)], append=False)
+    assert sink.parts() == [sink.path]
+    assert dataset().column("message").to_pylist() == ["change 3"]
+
+
+def test_append_mode_adds_only_new_shas():
+    first = export([row(1), row(2)], append=True)
+    second = export([row(2), row(3), row(3), row(4)], append=True)
+    assert (first.count, second.count) == (2, 2)
+    assert len(second.parts()) == 2
+    assert dataset().column("message").to_pylist() == ["change 1", "change 2", "change 3", "change 4"]
+    nothing_new = export([row(4)], append=True)
+    assert (nothing_new.count, len(nothing_new.parts())) == (0, 2)
+
+
+def test_a_failed_run_leaves_the_dataset_alone():
+    export([row(1)], append=False)
+    with pytest.raises(RuntimeError):
+        with ParquetSink(ROOT, append=False) as sink:
+            sink.write(row(2))
+            raise RuntimeError("interrupted")
+    assert dataset().column("message").to_pylist() == ["change 1"]
+    assert not list(ROOT.glob("_*.tmp"))
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+from src.models import CommitRow
+from src.planner import api_author_for, api_path_for, message_terms, plan_query
+from src.store import CommitStore
+
+
+@pytest.mark.parametrize("regex, terms", [
+    ("CVE-2026-\\d+", [["CVE-2026-"]]),
+    ("fix|feat", [["fix"], ["feat"]]),
+    ("foo\\.bar", [["foo.bar"]]),
+    ("abc\\ def", [["abc def"]]),
+    ("colou?r", [["colo"]]),
+    ("fix(es)? the bug", [["fix", " the bug"]]),
+])
+def test_message_terms(regex, terms):
+    assert message_terms(regex) == terms
+
+
+@pytest.mark.parametrize("regex, terms", [
+    ("\\x41bc", None),  # 'Abc': no literal of 3+ characters, not '41bc'
+    ("fix|\\x41bc", None),
+    ("\\x41bcd", [["bcd"]]),
+    ("\\u00e9tude", [["tude"]]),
+    ("\\U0001F600 party", [[" party"]]),
+    ("\\N{LATIN SMALL LETTER A}bcd", [["bcd"]]),
+    ("\\0123abc", [["3abc"]]),  # octal \012, then a literal '3abc'
+    ("(a)\\1xyz", [["xyz"]]),
+])
+def test_message_terms_skip_whole_escapes(regex, terms):
+    assert message_terms(regex) == terms
+
+
+def test_message_terms_give_up_without_a_usable_literal():
+    assert message_terms("\\d+") is None
+    assert message_terms("(?i)fix") is None  # inline flags: leave it to a scan
+    assert message_terms("fix|ab") is None  # one branch has no 3-char term
+
+
+def test_search_commits_matches_escaped_characters():
+    store = CommitStore(Path("data/store.sqlite3"))
+    if not store.message_index:
+        pytest.skip("SQLite without FTS5 trigram")
+    store.add_commits("o/r", [
+        CommitRow(sha="1", date="2024-01-01T00:00:00Z", message="Abc def"),
+        CommitRow(sha="2", date="2024-01-02T00:00:00Z", message="AAbc ok"),
+        CommitRow(sha="3", date="2024-01-03T00:00:00Z", message="fix typo"),
+        CommitRow(sha="4", date="2024-01-04T00:00:00Z", message="abc"),
+    ])
+    found = lambda regex: sorted(r.sha for r in store.search_commits(regex, flags=0))  # noqa: E731
+    assert found("\\x41bc") == ["1", "2"]
+    assert found("fix|\\x41bc") == ["1", "2", "3"]
+    store.close()
+
+
+@pytest.mark.parametrize("regex, pushed", [
+    ("^jane$", "jane"),
+    ("^jane@example.com$", "jane@example.com"),
+    ("^jane@example\\.com$", "jane@example.com"),
+    ("jane@example.com", None),  # would also match mary-jane@example.com
+    ("^jane@example.com", None),
+    ("jane@example.com$", None),
+    ("jane", None),
+    ("^jane", None),
+    ("^(jane|joe)$", None),
+    ("^Jane Doe$", None),  # a name, not a login
+    (None, None),
+])
+def test_api_author_for(regex, pushed):
+    assert api_author_for(regex) == pushed
+
+
+@pytest.mark.parametrize("regex, pushed", [
+    ("^pandas/io/", "pandas/io"),
+    ("^setup\\.py$", "setup.py"),
+    ("^setup.py$", None),  # '.' is any character
+    ("^docs/$", None),  # matches no file path; 'docs' would mean everything under it
+    ("pandas/io/", None),
+    ("^pandas/io", None),
+    ("^pandas/.*\\.py$", None),
+    ("^/", None),
+])
+def test_api_path_for(regex, pushed):
+    assert api_path_for(regex) == pushed
+
+
+def test_plan_query_keeps_every_regex_in_the_residual_filter():
+    plan = plan_query(message_regex="fix", author_regex="^jane$", path_regex="^docs/")
+    assert plan.api_params == {"author": "jane", "path": "docs"}
+    assert plan.residual.message_re and plan.residual.author_re and plan.residual.path_pushed_down
+    assert plan_query(author_regex="^jane$", pushdown=False).api_params == {}
+
+
+@pytest.mark.parametrize("pushdown", [True, False])
+def test_exact_author_patterns_match_accounts_not_names(pushdown):
+    residual = plan_query(author_regex="^jane$", pushdown=pushdown).residual
+    assert residual.matches(CommitRow(sha="1", author_name="Jane Doe", author_login="jane"))
+    assert residual.matches(CommitRow(sha="2", author_email="JANE"))
+    assert not residual.matches(CommitRow(sha="3", author_name="jane", author_login="mary"))
+    # anything not pushed down still matches names, anchored or not
+    for regex, name in [("^jane", "jane"), ("^(jane|joe)$", "jane"), ("^Jane Doe$", "Jane Doe")]:
+        residual = plan_query(author_regex=regex, pushdown=pushdown).residual
+        assert residual.matches(CommitRow(sha="4", author_name=name, author_login="mary"))
+
+
+def test_path_regexes_are_case_sensitive_like_the_api():
+    plan = plan_query(path_regex="^Docs/")
+    assert plan.api_params == {"path": "Docs"}
+    residual = plan_query(path_regex="^Docs/", pushdown=False).residual
+    assert not residual.matches(CommitRow(sha="1", files=("docs/index.md",)))
+    assert residual.matches(CommitRow(sha="2", files=("Docs/index.md",)))
+    assert plan_query(message_regex="FIX").residual.matches(CommitRow(sha="3", message="fix: x"))
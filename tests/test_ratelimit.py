@@ -0,0 +1,162 @@
+from __future__ import annotations
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import pytest
+
+from src import ratelimit
+from src.github_client import GitHubClient
+from src.ratelimit import RateLimiter
+
+
+class Clock:
+    """Stand-in for the time module: sleeping moves the clock instead of waiting."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+        self.slept: List[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    c = Clock()
+    monkeypatch.setattr(ratelimit, "time", c)
+    return c
+
+
+def headers(remaining: int, reset_at: float, limit: int = 5000) -> Dict[str, str]:
+    return {
+        "X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(int(reset_at)),
+        "X-RateLimit-Limit": str(limit),
+    }
+
+
+def test_nothing_is_paced_before_the_first_response(clock):
+    limiter = RateLimiter(sleep=clock.sleep)
+    for _ in range(100):
+        limiter.acquire()
+    assert clock.slept == []
+
+
+def test_requests_are_spread_over_the_remaining_window(clock):
+    limiter = RateLimiter(burst=1, sleep=clock.sleep)
+    limiter.update(limiter.budgets[0], headers(10, clock.now + 100))
+    for _ in range(5):
+        limiter.acquire()
+    # the burst permit goes at once; then each request gets an even share of the time left
+    assert clock.slept == [pytest.approx(100 / 9)] * 4
+    assert limiter.waited == pytest.approx(sum(clock.slept))
+
+
+def test_spent_budget_waits_for_the_reset(clock):
+    limiter = RateLimiter(sleep=clock.sleep)
+    limiter.update(limiter.budgets[0], headers(0, clock.now + 30))
+    limiter.acquire()
+    assert clock.slept == [pytest.approx(31)]  # reset + 1 s of slack
+
+
+def test_tokens_rotate_to_the_one_with_budget_left(clock):
+    limiter = RateLimiter(["a", "b", "c"], sleep=clock.sleep)
+    a, b, c = limiter.budgets
+    limiter.update(a, headers(0, clock.now + 600))
+    limiter.update(b, headers(4000, clock.now + 600))
+    assert limiter.acquire() is c  # unknown budgets are tried first
+    limiter.update(c, headers(100, clock.now + 600))
+    assert limiter.acquire() is b
+    limiter.update(b, headers(0, clock.now + 300))
+    limiter.update(c, headers(0, clock.now + 900))
+    assert limiter.acquire() is b  # all spent: the one that resets first, once it has
+    assert clock.slept == [pytest.approx(301)]
+
+
+def test_backoff_is_jittered_and_capped():
+    waits = [RateLimiter.backoff(n, base=1, cap=8) for n in range(10) for _ in range(20)]
+    assert all(0 <= w <= 8 for w in waits)
+    assert max(RateLimiter.backoff(0, base=1) for _ in range(50)) <= 1
+
+
+# ----- GitHubClient._send against scripted responses -----
+
+Response = Tuple[int, Dict[str, str]]
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    """A server answering from a list of (status, headers); records each request's Authorization."""
+    script: List[Response] = []
+    seen: List[str] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            seen.append(self.headers.get("Authorization") or "")
+            status, hdrs = script.pop(0) if script else (200, {})
+            body = json.dumps({"ok": status == 200}).encode("utf-8")
+            self.send_response(status)
+            for k, v in hdrs.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("GITHUB_API_URL", f"http://127.0.0.1:{srv.server_address[1]}")
+    yield script, seen
+    srv.shutdown()
+    srv.server_close()
+
+
+def client_with(clock: Clock, **kw) -> GitHubClient:
+    client = GitHubClient(**kw)
+    client.limiter.sleep = clock.sleep
+    return client
+
+
+def test_secondary_limit_waits_retry_after(scripted, clock):
+    script, seen = scripted
+    script.append((429, {"Retry-After": "7"}))
+    client = client_with(clock)
+    assert client.get("/x", use_cache=False) == {"ok": True}
+    assert len(seen) == 2
+    assert clock.slept == [7.0]
+    assert client.metrics.snapshot()["retries"] == {"count": 1, "wait_s": 7.0}
+
+
+def test_primary_limit_waits_for_reset_then_retries(scripted, clock):
+    script, seen = scripted
+    script.append((403, headers(0, clock.now + 60)))
+    client = client_with(clock)
+    assert client.get("/x", use_cache=False) == {"ok": True}
+    assert len(seen) == 2
+    assert clock.slept == [pytest.approx(61)]
+
+
+def test_primary_limit_moves_to_the_next_token(scripted, clock, monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKENS", "a,b")
+    script, seen = scripted
+    script.append((403, headers(0, clock.now + 3600)))
+    client = client_with(clock)
+    assert client.get("/x", use_cache=False) == {"ok": True}
+    assert seen == ["token a", "token b"]
+    assert clock.slept == []
+
+
+def test_without_waiting_a_spent_limit_fails(scripted, clock):
+    script, _ = scripted
+    script.append((403, headers(0, clock.now + 60)))
+    with pytest.raises(RuntimeError, match="Rate limit exceeded"):
+        client_with(clock, wait_on_limit=False).get("/x", use_cache=False)
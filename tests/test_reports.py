@@ -0,0 +1,45 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from src.reports import ChartPool  # noqa: E402
+
+PNG = b"\x89PNG"
+
+
+def jobs(n: int):
+    return [
+        ("language_share", {"languages": {"Python": 100 * (i + 1), "C": 10}, "out_path": Path(f"charts/lang{i}.png")})
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_all_returns_paths_in_job_order(workers):
+    with ChartPool(workers) as pool:
+        paths = pool.render_all(jobs(4))
+    assert paths == [Path(f"charts/lang{i}.png") for i in range(4)]
+    assert all(p.read_bytes().startswith(PNG) for p in paths)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_a_failing_chart_fails_only_its_future(workers):
+    with ChartPool(workers) as pool:
+        bad = pool.submit(("no_such_chart", {}))
+        good = pool.submit(jobs(1)[0])
+        with pytest.raises(KeyError):
+            bad.result()
+        assert good.result().exists()
+
+
+def test_the_pool_starts_on_first_use_and_can_be_reused_after_close():
+    pool = ChartPool(2)
+    assert pool._pool is None
+    pool.render_all(jobs(1))
+    pool.close()
+    assert pool._pool is None
+    assert pool.render_all(jobs(2))[1].exists()
+    pool.close()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src import metrics as metrics_mod
+from src.metrics import Metrics
+from src.server import AnalysisService, Coalescer, serve
+
+
+@pytest.fixture
+def service(github):
+    from src.controller import AppController
+
+    gh = github(commits=200)
+    controller = AppController(log=lambda msg: None)
+    srv, base = serve(AnalysisService(controller))
+    yield gh, base
+    srv.shutdown()
+    srv.server_close()
+    controller.close()
+
+
+def get(base: str, path: str):
+    try:
+        with urllib.request.urlopen(base + path) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def post(base: str, path: str, body):
+    req = urllib.request.Request(base + path, data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_coalescer_shares_covered_windows_and_forgets_expired_groups():
+    co = Coalescer(ttl=0.05)
+    assert co.run("a", 0, 10, lambda: 1) == (1, False)
+    assert co.run("a", 2, 5, lambda: 2) == (1, True)  # inside a finished call's window, within ttl
+    for i in range(100):
+        co.run(("analyze", i), 0, 0, lambda: i)
+    time.sleep(0.06)
+    co.run("b", 0, 1, lambda: 3)
+    assert list(co._calls) == ["b"]
+
+
+def test_coalescer_drops_failed_calls():
+    co = Coalescer()
+    with pytest.raises(RuntimeError):
+        co.run("a", 0, 1, lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert co._calls == {}
+    assert co.run("a", 0, 1, lambda: 4) == (4, False)
+
+
+@pytest.mark.parametrize("path", [
+    "/commits?repo=o/r&msg=fix(",
+    "/commits?repo=o/r&author=[a-",
+    "/search?q=(unclosed",
+    "/activity?repo=o/r&period=fortnight",
+])
+def test_bad_parameters_are_rejected_before_any_fetch(service, path):
+    gh, base = service
+    status, body = get(base, path)
+    assert status == 400 and body["error"]
+    assert gh.stats()["requests"] == 0
+
+
+def test_metrics_memory_is_bounded(monkeypatch):
+    monkeypatch.setattr(metrics_mod, "MAX_LATENCIES", 100)
+    monkeypatch.setattr(metrics_mod, "MAX_BUDGETS", 4)
+    m = Metrics()
+    for i in range(1000):
+        headers = {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(i // 10), "X-RateLimit-Resource": "core"}
+        m.request("u", 200, (i + 1) / 1000, 10, headers)
+    report = m.snapshot()
+    assert len(m.latencies) == 100 and len(m._budgets) == 4
+    assert report["requests"]["count"] == 1000
+    assert report["requests"]["latency_ms"]["max"] == 1000.0
+    assert report["requests"]["latency_ms"]["mean"] == 500.5
+    assert report["rate_limit"]["budget_used"] == 100  # one request in each of the 100 windows
+
+
+@pytest.mark.parametrize("body", [
+    {"repo": "o/r", "since": ["2024-01-01"]},
+    {"repo": {"name": "o/r"}},
+    ["o/r"],
+])
+def test_analyze_rejects_non_scalar_json_with_400(service, body):
+    gh, base = service
+    status, reply = post(base, "/analyze", body)
+    assert status == 400 and reply["error"]
+    assert gh.stats()["requests"] == 0
+
+
+def test_analyze_takes_json_scalars(service):
+    _, base = service
+    body = {"repo": "o/r", "since": "2024-06-01", "until": None, "charts": False, "incremental": True}
+    status, reply = post(base, "/analyze", body)
+    assert status == 200 and reply["ok"] and reply["commits"] > 0
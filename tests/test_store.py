@@ -0,0 +1,74 @@
+from __future__ import annotations
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src import store as store_mod
+from src.models import CommitRow
+from src.store import CommitStore
+
+PATH = Path("data/store.sqlite3")
+# the author key of older stores, which let an empty email become the totals key ''
+OLD_AUTHOR = "COALESCE(NULLIF({r}.author_login, ''), lower({r}.author_email), {r}.author_name, 'unknown')"
+
+
+@pytest.fixture
+def store():
+    s = CommitStore(PATH)
+    yield s
+    s.close()
+
+
+def commits():
+    return [
+        CommitRow(sha="1", date="2024-01-01T08:00:00Z", author_login="jane", author_email="jane@example.com"),
+        CommitRow(sha="2", date="2024-01-01T09:00:00Z", author_email="", author_name="Anon"),
+        CommitRow(sha="3", date="2024-01-08T09:00:00Z", author_email="Bob@Example.com", author_name="Bob"),
+        CommitRow(sha="4", date="2024-01-09T09:00:00Z"),
+    ]
+
+
+def check(store: CommitStore) -> None:
+    assert store.rollup("o/r", "day") == {
+        datetime(2024, 1, 1): 2, datetime(2024, 1, 8): 1, datetime(2024, 1, 9): 1,
+    }
+    assert store.rollup("o/r", "week") == {datetime(2024, 1, 1): 2, datetime(2024, 1, 8): 2}
+    assert store.rollup("o/r", "month", author="BOB@example.com") == {datetime(2024, 1, 1): 1}
+    assert store.author_counts("o/r") == {"jane": 1, "Anon": 1, "bob@example.com": 1, "unknown": 1}
+    people = {p["login"]: p["contributions"] for p in store.contributor_stats("o/r")}
+    assert people == {"jane": 1, "Anon": 1, "Bob": 1, "unknown": 1}
+
+
+def test_empty_emails_count_under_the_name_not_the_totals(store):
+    store.add_commits("o/r", commits())
+    check(store)
+    store.rebuild_rollups()
+    check(store)
+
+
+def test_rollups_follow_updates(store):
+    store.add_commits("o/r", commits())
+    store.add_commits("o/r", [CommitRow(sha="2", date="2024-01-08T09:00:00Z", author_login="jane")])
+    assert store.rollup("o/r", "day", author="jane") == {datetime(2024, 1, 1): 1, datetime(2024, 1, 8): 1}
+    assert store.rollup("o/r", "day")[datetime(2024, 1, 1)] == 1
+    assert "Anon" not in store.author_counts("o/r")
+
+
+def test_stores_with_the_old_author_key_are_recounted():
+    s = CommitStore(PATH)
+    script = store_mod.ROLLUP_TRIGGERS + store_mod.IDENTITY_TRIGGERS
+    for r in ("NEW", "OLD"):
+        script = script.replace(store_mod.ROLLUP_AUTHOR.format(r=r), OLD_AUTHOR.format(r=r))
+    assert s._drop_stale_triggers() is False
+    for table in ("rollup", "identity"):
+        for event in ("insert", "delete", "update"):
+            s.conn.execute(f"DROP TRIGGER commits_{table}_{event}")
+    s.conn.executescript(script)
+    s.add_commits("o/r", commits())
+    assert s.rollup("o/r", "day")[datetime(2024, 1, 1)] == 3  # the empty-email commit counted twice
+    s.close()
+
+    s = CommitStore(PATH)
+    check(s)
+    s.close()
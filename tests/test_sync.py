@@ -0,0 +1,77 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from src.analyzer import RepoAnalyzer
+from src.github_client import GitHubClient
+from src.store import CommitStore
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def analyzer(github):
+    gh = github(commits=4000, end=utc(2024, 7, 1))  # one commit every 6h back to mid-2021
+    store = CommitStore(Path("data/store.sqlite3"))
+    yield gh, RepoAnalyzer(GitHubClient(), "o", "r", store=store)
+    store.close()
+
+
+def expected(gh, since: datetime, until: datetime) -> int:
+    return len(gh.window({"since": [since.isoformat()], "until": [until.isoformat()]}))
+
+
+def test_first_sync_fetches_the_window(analyzer):
+    gh, a = analyzer
+    rows = a.sync_commits(utc(2024, 1, 1), utc(2024, 2, 1))
+    assert len(rows) == expected(gh, utc(2024, 1, 1), utc(2024, 2, 1))
+    state = a.store.sync_state(a.full_name)
+    assert (state["since"], state["until"]) == ("2024-01-01T00:00:00Z", "2024-02-01T00:00:00Z")
+
+
+def test_window_inside_the_synced_range_is_answered_locally(analyzer):
+    gh, a = analyzer
+    a.sync_commits(utc(2024, 1, 1), utc(2024, 6, 1))
+    before = gh.stats()["requests"]
+    rows = a.sync_commits(utc(2024, 2, 1), utc(2024, 3, 1))
+    assert gh.stats()["requests"] == before
+    assert len(rows) == expected(gh, utc(2024, 2, 1), utc(2024, 3, 1))
+
+
+def test_later_disjoint_window_fetches_the_gap(analyzer):
+    gh, a = analyzer
+    a.sync_commits(utc(2024, 1, 1), utc(2024, 2, 1))
+    a.sync_commits(utc(2024, 6, 1), utc(2024, 7, 1))
+    # February..May was never asked for, but the synced range now claims it: it must have been fetched
+    rows = a.sync_commits(utc(2024, 1, 1), utc(2024, 7, 1))
+    assert len(rows) == expected(gh, utc(2024, 1, 1), utc(2024, 7, 1))
+
+
+def test_earlier_disjoint_window_backfills_up_to_the_synced_range(analyzer):
+    gh, a = analyzer
+    a.sync_commits(utc(2024, 6, 1), utc(2024, 7, 1))
+    a.sync_commits(utc(2024, 1, 1), utc(2024, 2, 1))
+    rows = a.sync_commits(utc(2024, 1, 1), utc(2024, 7, 1))
+    assert len(rows) == expected(gh, utc(2024, 1, 1), utc(2024, 7, 1))
+    state = a.store.sync_state(a.full_name)
+    assert (state["since"], state["until"]) == ("2024-01-01T00:00:00Z", "2024-07-01T00:00:00Z")
+
+
+def test_window_covering_the_synced_range_extends_both_ends(analyzer):
+    gh, a = analyzer
+    a.sync_commits(utc(2024, 3, 1), utc(2024, 4, 1))
+    rows = a.sync_commits(utc(2024, 1, 1), utc(2024, 6, 1))
+    assert len(rows) == expected(gh, utc(2024, 1, 1), utc(2024, 6, 1))
+
+
+def test_rows_are_deduplicated_newest_first(analyzer):
+    gh, a = analyzer
+    a.sync_commits(utc(2024, 1, 1), utc(2024, 3, 1))
+    rows = a.sync_commits(utc(2024, 2, 1), utc(2024, 4, 1))  # 24h overlap re-fetches the mark's day
+    shas = [r.sha for r in rows]
+    assert len(shas) == len(set(shas))
+    assert [r.committed_at for r in rows] == sorted((r.committed_at for r in rows), reverse=True)